@@ -1,12 +1,21 @@
 import os
 import re
+import json
 import workshop
-import vpk
+import vpk_reader
 import shutil
 from logger import log
 import concurrent.futures
+import threading
+import queue
+import time
+import config
 from i18n import tr, translator
 import gameinfo
+import keyvalues
+import path_utils
+import workshop_index
+import metadata_cache
 
 
 def read_addons_from_gameinfo(gameinfo_path):
@@ -19,47 +28,7 @@ def read_addons_from_gameinfo(gameinfo_path):
         return []
     
     try:
-        
-        with open(gameinfo_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        addons = []
-        
-        # Check for markers presence
-        start_marker = "//mounted_addons_start"
-        end_marker = "//mounted_addons_end"
-        
-        start_index = content.find(start_marker)
-        end_index = content.find(end_marker)
-        
-        # If markers found, search for addons only between them
-        if start_index != -1 and end_index != -1 and start_index < end_index:
-            addon_content = content[start_index:end_index]
-        else:
-            # Otherwise search in entire SearchPaths block
-            log.info(tr("Addon markers not found, searching in entire SearchPaths block"))
-            searchpaths_match = re.search(r'SearchPaths\s*\{([^}]+)\}', content, re.DOTALL)
-            if not searchpaths_match:
-                log.warning(tr("SearchPaths block not found in gameinfo.txt"))
-                return []
-            addon_content = searchpaths_match.group(1)
-        
-        # Search for addon blocks
-        pattern = r'//\s*([^\n]+?)\s*\n\s*game\+mod\s+"(.+?)"'
-        matches = re.findall(pattern, addon_content, re.DOTALL)
-        
-        
-        for i, (title, path) in enumerate(matches, 1):
-            clean_title = title.strip()
-            addon_id = extract_addon_id(path)
-            
-            addons.append({
-                'number': i,
-                'title': clean_title,
-                'id': addon_id,
-                'path': path
-            })
-        return addons
+        return gameinfo.GameinfoDocument(gameinfo_path).addons()
     
     except Exception as e:
         log.error(tr("Error reading gameinfo.txt: {}").format(e))
@@ -79,49 +48,43 @@ def extract_addon_id(path):
     
     return tr("Unknown")
 
-def remove_addons_from_gameinfo(gameinfo_path, addon_ids):
+def get_mount_paths(addon_path):
+    """
+    Returns search paths mounted for addon
+    Selectively extracted map folder is mounted together with its VPK, which provides the rest of files
+    """
+    if addon_path.endswith('workshop_dir') and is_selective_extraction(addon_path):
+        return [addon_path, addon_path + '.vpk']
+    return [addon_path]
+
+def format_addon_lines(addon_path, title):
+    """Returns gameinfo.txt lines of one addon: title comment, search paths and empty line"""
+    lines = [f'\t\t// {title}\n']
+    for path in get_mount_paths(addon_path):
+        lines.append(f'\t\tgame+mod\t\t"{path}"\n')
+    lines.append('\n')
+    return lines
+
+def remove_addons_from_gameinfo(gameinfo_path, addon_ids, document=None):
     """
     Removes addons from gameinfo.txt by their IDs
+    document: GameinfoDocument already opened by caller, edited in memory and flushed by caller
     Returns tuple (success, message)
     """
     try:
         log.info(tr("Removing addons from gameinfo.txt..."))
         
-        with open(gameinfo_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        # Get current addons
-        current_addons = read_addons_from_gameinfo(gameinfo_path)
+        flush = document is None
+        if flush:
+            document = gameinfo.GameinfoDocument(gameinfo_path)
         ids_to_remove = set(addon_ids)
         
-        # Find line indices to remove
-        lines_to_remove = set()
-        removed_titles = []
-        
-        for addon in current_addons:
-            if addon['id'] in ids_to_remove:
-                # Find lines of this addon by ID (more reliable than by title)
-                for i, line in enumerate(lines):
-                    clean_line = line.strip()
-                    # Find comment line containing addon title (with or without prefix)
-                    if clean_line.startswith('//') and (addon['title'] in clean_line or addon['title'].replace("MAP   |   ", "") in clean_line):
-                        # Check next line for path
-                        if i + 1 < len(lines) and (addon['path'] in lines[i + 1] or addon['path'].replace('workshop_dir', 'workshop_dir.vpk') in lines[i + 1] or addon['path'].replace('workshop_dir.vpk', 'workshop_dir') in lines[i + 1]):
-                            lines_to_remove.add(i)    # Comment
-                            lines_to_remove.add(i + 1)  # Path
-                            # Check if there's empty line after
-                            if i + 2 < len(lines) and lines[i + 2].strip() == '':
-                                lines_to_remove.add(i + 2)
-                            
-                            removed_titles.append(addon['title'])
-                        break
-        
-        # Remove lines and create new list
-        new_lines = [line for i, line in enumerate(lines) if i not in lines_to_remove]
+        # Entries are matched by ID parsed from their path
+        document.remove_addons(ids_to_remove)
         
         # Write modified file
-        with open(gameinfo_path, 'w', encoding='utf-8') as file:
-            file.writelines(new_lines)
+        if flush:
+            document.flush()
         
         removed_count = len(ids_to_remove)
             
@@ -132,50 +95,27 @@ def remove_addons_from_gameinfo(gameinfo_path, addon_ids):
         log.error(f"Error removing addons: {str(e)}")
         return False, f"Error removing addons: {str(e)}"
 
-def filter_duplicate_addons(gameinfo_path, addons):
-    """
-    Filters duplicate addons
-    Returns tuple (unique addons, duplicates)
-    """
-    existing_addons = read_addons_from_gameinfo(gameinfo_path)
-    
-    # Create set of existing addon IDs (ignoring path)
-    existing_ids = {addon['id'] for addon in existing_addons}
-    
-    unique_addons = []
-    duplicates = []
-    
-    for addon_id, title in addons:
-        if addon_id in existing_ids:
-            duplicates.append((addon_id, title))
-        else:
-            unique_addons.append((addon_id, title))
-    log.info(tr("Filtering duplicates"))
-    return unique_addons, duplicates
-
 def has_addon_markers(gameinfo_path):
     """Checks for the presence of start and end tags of the addons block"""
     if not os.path.exists(gameinfo_path):
         return False, False
     
     try:
-        with open(gameinfo_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        start_marker = "//mounted_addons_start"
-        end_marker = "//mounted_addons_end"
-        
-        has_start = start_marker in content
-        has_end = end_marker in content
-        
-        return has_start, has_end
+        start, end = gameinfo.GameinfoDocument(gameinfo_path).markers()
+        return start is not None, end is not None
     
     except Exception as e:
         print(f"Error checking markers: {e}")
         return False, False
 
-def validate_addon_markers(gameinfo_path):
-    """Checks marker integrity and returns status"""
+def validate_addon_markers(gameinfo_path, document=None):
+    """
+    Checks marker integrity and returns status
+    document: GameinfoDocument already opened by caller
+    """
+    if document is not None:
+        return document.marker_status()
+    
     has_start, has_end = has_addon_markers(gameinfo_path)
     
     if has_start and has_end:
@@ -319,50 +259,22 @@ def create_vr_essential_backup(hl2vr_path):
         log.error(f"Error copying VR resources: {str(e)}")
         return False, f"Error copying VR resources: {str(e)}"
 
-def add_addon_markers(gameinfo_path, hl2vr_path=None, hl2_path=None):
-    """Adds start and end markers for addons block after custom folders"""
+def add_addon_markers(gameinfo_path, hl2vr_path=None, hl2_path=None, document=None):
+    """
+    Adds start and end markers for addons block after custom folders
+    document: GameinfoDocument already opened by caller, edited in memory and flushed by caller
+    """
     try:
-        with open(gameinfo_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        # Find insertion position - after custom folders and before "// mount VR files first"
-        insert_index = -1
-        found_custom = False
+        own_document = document is None
+        if own_document:
+            document = gameinfo.GameinfoDocument(gameinfo_path)
         
-        for i, line in enumerate(lines):
-            # Look for lines with custom folders
-            if 'custom/*' in line and 'game+mod' in line:
-                found_custom = True
-                continue
-            
-            # If we found custom folders and now found "mount VR files", insert before it
-            if found_custom and ('// mount VR files first' in line or '// mount VR files' in line):
-                insert_index = i
-                break
-        
-        # If exact match not found, look after the last custom folder
-        if insert_index == -1 and found_custom:
-            for i, line in enumerate(lines):
-                if 'custom/*' in line and 'game+mod' in line:
-                    insert_index = i + 1  # After the last custom folder
-        
-        # If still not found, use old logic (after SearchPaths {)
-        if insert_index == -1:
-            for i, line in enumerate(lines):
-                if "SearchPaths" in line and i + 1 < len(lines) and "{" in lines[i + 1]:
-                    insert_index = i + 2
-                    break
-        
-        if insert_index == -1:
+        if not document.add_markers():
             return False, tr("gameinfo.txt is corrupted, addons cannot be mounted.")
         
-        # Add markers
-        marker_lines = ['\t\t//mounted_addons_start\n', '\t\t//mounted_addons_end\n']
-        lines[insert_index:insert_index] = marker_lines
-        
         # Write file
-        with open(gameinfo_path, 'w', encoding='utf-8') as file:
-            file.writelines(lines)
+        if own_document:
+            document.flush()
         
         log.info(tr("Addon markers added to gameinfo.txt"))
         
@@ -404,16 +316,18 @@ def read_workshop_txt(hl2_path):
         log.error(f"Error reading workshop.txt: {str(e)}")
         return None, f"Error reading workshop.txt: {str(e)}"
     
-def check_addon_files_exists(addons_with_paths):
+def check_addon_files_exists(addons_with_paths, index=None):
     """
     Checks addon files existence
+    index: WorkshopIndex to answer from instead of checking each file on disk
     Returns tuple (existing_addons, missing_addons)
     """
     existing_addons = []
     missing_addons = []
+    exists = index.exists if index is not None else os.path.exists
     
     for vpk_path, title in addons_with_paths:
-        if os.path.exists(vpk_path):
+        if exists(vpk_path):
             existing_addons.append((vpk_path, title))
         else:
             # Extract ID from path for error message
@@ -425,421 +339,638 @@ def check_addon_files_exists(addons_with_paths):
     
     return existing_addons, missing_addons
 
-def prepare_addons_for_embedding(collection_url, hl2vr_path, hl2_path, check_files=True):
+def get_map_paths(addon_path):
+    """
+    Returns tuple (vpk_path, folder_path) for addon path pointing to workshop_dir.vpk or workshop_dir
+    Both are None for other paths
+    """
+    if addon_path.endswith('.vpk'):
+        return addon_path, addon_path.replace('workshop_dir.vpk', 'workshop_dir')
+    elif addon_path.endswith('workshop_dir'):
+        return addon_path + '.vpk', addon_path
+    return None, None
+
+def is_map_entry(filepath):
+    """Checks if path inside addon is a map file (maps/*.bsp)"""
+    filepath = filepath.replace('\\', '/').lower()
+    return filepath.startswith('maps/') and filepath.endswith('.bsp')
+
+def is_map_critical_entry(filepath):
     """
-    Prepares addons for mounting
-    check_files: whether to check addon files existence
-    Returns tuple (success, data, error_message)
+    Checks if file must be loose for map to load: everything in maps/
+    (.bsp, .nav, graphs/*.ain, .lmp, level sounds and particle manifests)
+    """
+    return filepath.replace('\\', '/').lower().startswith('maps/')
+
+def vpk_contains_map(vpk_path):
+    """
+    Checks if VPK contains maps/*.bsp reading only its directory index
+    Returns True or False, None if VPK cannot be read
     """
     try:
-        log.info(tr("Preparing addons from collection"))
-        
-        # Get addons from collection
-        addons = workshop.get_collection_addons(collection_url)
-        if not addons:
-            return False, None, tr("Failed to find addons in collection.")
-        
-        gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
-        
-        # Filter duplicates
-        unique_addons, duplicates = filter_duplicate_addons(gameinfo_path, addons)
-        
-        if not unique_addons:
-            if duplicates:
-                return False, None, tr("All addons from collection already added.")
-            else:
-                return False, None, tr("Failed to find addons.")
-        
-        # Get workshop path
-        from path_utils import get_workshop_path
-        workshop_path = get_workshop_path(hl2_path)
-        
-        # Form paths to VPK files
-        addons_with_paths = []
-        for addon_id, title in unique_addons:
-            vpk_path = os.path.join(workshop_path, addon_id, "workshop_dir.vpk")
-            addons_with_paths.append((vpk_path, title))
-        
-        # Check files existence if option enabled
-        missing_addons = []
-        final_addons_with_paths = []
-        final_unique_addons = []
-        
-        if check_files:
-            # Separate addons into VPK and folders
-            vpk_addons = [(path, title, addon_id) for (path, title), (addon_id, _) in 
-                         zip(addons_with_paths, unique_addons) if path.endswith('.vpk')]
-            folder_addons = [(path, title, addon_id) for (path, title), (addon_id, _) in 
-                           zip(addons_with_paths, unique_addons) if not path.endswith('.vpk')]
-            
-            # Check VPK files
-            existing_vpk_addons = []
-            missing_vpk_addons = []
-            
-            for vpk_path, title, addon_id in vpk_addons:
-                if os.path.exists(vpk_path):
-                    existing_vpk_addons.append((vpk_path, title))
-                    final_unique_addons.append((addon_id, title))
-                else:
-                    missing_vpk_addons.append((addon_id, title, vpk_path))
-            
-            # Folders always considered existing (they are created during extraction)
-            existing_folder_addons = [(path, title) for path, title, addon_id in folder_addons]
-            final_unique_addons.extend([(addon_id, title) for path, title, addon_id in folder_addons])
-            
-            # Combine existing addons
-            final_addons_with_paths = existing_vpk_addons + existing_folder_addons
-            missing_addons = missing_vpk_addons
-            
-            if not final_addons_with_paths and missing_addons:
-                return False, None, tr("Addon files missing.")
-        else:
-            # If file check disabled, add all addons
-            final_addons_with_paths = addons_with_paths
-            final_unique_addons = unique_addons
-        
-        # Prepare data for return
-        result_data = {
-            'unique_addons': final_unique_addons,  # Only those that will be added
-            'duplicates': duplicates,
-            'missing_addons': missing_addons,
-            'addons_with_paths': final_addons_with_paths,  # Only existing paths
-            'gameinfo_path': gameinfo_path
-        }
-        
-        log.info(tr("Prepared {} addons for mounting").format(len(final_unique_addons)))
-        return True, result_data, ""
-        
+        with vpk_reader.open_vpk(vpk_path) as pak:
+            return any(is_map_entry(filepath) for filepath in pak)
     except Exception as e:
-        log.error(f"Error preparing addons: {str(e)}")
-        return False, None, f"An unexpected error occurred:\n{str(e)}"
+        log.warning(tr("Failed to read VPK index {}: {}").format(vpk_path, e))
+        return None
+
+def folder_contains_map(folder_path):
+    """Checks if extracted addon folder contains maps/*.bsp"""
+    maps_path = os.path.join(folder_path, "maps")
+    try:
+        with os.scandir(maps_path) as entries:
+            return any(entry.is_file() and entry.name.lower().endswith('.bsp') for entry in entries)
+    except OSError:
+        return False
+
+# Addon description file in root of addon VPK, its title key is used when Steam is not available
+ADDON_INFO_FILE = "addoninfo.txt"
+ADDON_INFO_TITLE_KEYS = ('addontitle', 'title')
 
-def prepare_single_addon_for_embedding(addon_url, hl2vr_path, hl2_path, check_files=True):
+def read_local_title(addon_path):
     """
-    Prepares single addon for mounting
-    check_files: whether to check addon files existence
-    Returns tuple (success, data, error_message)
+    Reads addon title from addoninfo.txt of addon VPK or extracted folder without network
+    Returns title or None if addon files or title are missing
     """
+    vpk_path, folder_path = get_map_paths(addon_path)
+    if not vpk_path:
+        return None
+    
+    text = None
     try:
-        log.info(tr("Preparing single addon"))
-        
-        # Get addon information
-        addon_id, title = workshop.get_single_addon(addon_url)
-        if not addon_id:
-            return False, None, tr("Failed to get addon information.")
-        
-        gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
-        
-        # Check duplicates
-        existing_ids = {addon['id'] for addon in read_addons_from_gameinfo(gameinfo_path)}
-        if addon_id in existing_ids:
-            return False, None, tr("Addon '{}' already added.").format(title)
-        
-        # Get workshop path
-        from path_utils import get_workshop_path
-        workshop_path = get_workshop_path(hl2_path)
-        
-        # Form path to VPK file
-        vpk_path = os.path.join(workshop_path, addon_id, "workshop_dir.vpk")
-        
-        # Instead use VPK path directly
-        final_path = vpk_path
-        final_title = title
-        # Check file existence if option enabled
-        missing_addons = []
-        final_unique_addons = []
-        final_addons_with_paths = []
-        
-        if check_files and final_path.endswith('.vpk') and not os.path.exists(final_path):
-            missing_addons = [(addon_id, title, final_path)]
-            return False, None, tr("Addon file '{}' not found.").format(title)
-        else:
-            # File exists or check disabled
-            final_unique_addons = [(addon_id, final_title)]
-            final_addons_with_paths = [(final_path, final_title)]
-        
-        # Prepare data for return
-        result_data = {
-            'unique_addons': final_unique_addons,  # Only if will be added
-            'duplicates': [],
-            'missing_addons': missing_addons,
-            'addons_with_paths': final_addons_with_paths,  # Only if exists
-            'gameinfo_path': gameinfo_path
-        }
-        
-        log.info(tr("Addon '{}' prepared for mounting").format(title))
-        return True, result_data, ""
-        
+        if os.path.isfile(vpk_path) and os.path.getsize(vpk_path):
+            with vpk_reader.open_vpk(vpk_path) as pak:
+                name = next((path for path in pak if path.lower() == ADDON_INFO_FILE), None)
+                if name:
+                    text = pak.read(name).decode('utf-8', 'replace')
+        if text is None and os.path.isdir(folder_path):
+            name = next((name for name in os.listdir(folder_path) if name.lower() == ADDON_INFO_FILE), None)
+            if name:
+                with open(os.path.join(folder_path, name), 'r', encoding='utf-8', errors='replace') as file:
+                    text = file.read()
     except Exception as e:
-        log.error(f"Error preparing single addon: {str(e)}")
-        return False, None, f"An unexpected error occurred:\n{str(e)}"
+        log.warning(tr("Failed to read addon info {}: {}").format(addon_path, e))
+        return None
+    
+    if text is None:
+        return None
+    try:
+        document = keyvalues.parse(text)
+    except keyvalues.KeyValuesError:
+        return None
+    
+    for node in keyvalues.iter_nodes(document):
+        if (isinstance(node, keyvalues.Pair) and not isinstance(node.value, keyvalues.Block)
+                and node.key.lower() in ADDON_INFO_TITLE_KEYS and node.value.strip()):
+            return node.value.strip()
+    return None
 
-def prepare_addons_from_workshop_txt(hl2vr_path, hl2_path, check_files=True):
+def detect_map_locally(addon_path):
     """
-    Prepares addons from workshop.txt for mounting
+    Determines if addon is a map from its files without network
+    Returns True or False, None if addon files are not available
     """
-    try:
-        log.info(tr("Starting preparation of addons from workshop.txt"))
-        
-        # Read addon IDs from workshop.txt
-        addon_ids, error_message = read_workshop_txt(hl2_path)
-        if error_message:
-            return False, None, error_message
-        
-        if not addon_ids:
-            return False, None, tr("Installed addons not found.")
-        
-        gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
-        
-        # MULTITHREADED PROCESSING - get addon titles in parallel BUT PRESERVE ORDER
-        unique_addons = []
-        failed_addons = []
-        
-        def fetch_addon_info(addon_id):
-            """Function to get information about one addon"""
+    vpk_path, folder_path = get_map_paths(addon_path)
+    if not vpk_path:
+        return None
+    
+    if os.path.exists(vpk_path):
+        result = vpk_contains_map(vpk_path)
+        if result is not None:
+            return result
+    
+    if os.path.isdir(folder_path) and os.listdir(folder_path):
+        return folder_contains_map(folder_path)
+    
+    return None
+
+def is_map_addon(addon, refresh=False):
+    """
+    Checks if addon is a map: by local VPK index, or by Steam page if files are missing
+    refresh: ignore metadata cache for Steam page check
+    """
+    is_map = detect_map_locally(addon['path'])
+    if is_map is not None:
+        return is_map
+    
+    return workshop.is_addon_map(workshop.addon_url(addon['id']), refresh=refresh)
+
+def classify_map_addons(addons, refresh=False, progress=None):
+    """
+    Checks many addons for maps: local VPK indexes in parallel, then Steam pages of addons
+    without local files all at once through async resolver
+    refresh: ignore metadata cache for Steam page check
+    progress: callback(addon, done, total), returning False cancels the check
+    Returns dictionary {id: is_map}, None if cancelled
+    """
+    total = len(addons)
+    is_map_by_id = {}
+    remote_addons = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workshop.MAX_WORKERS) as executor:
+        future_to_addon = {executor.submit(detect_map_locally, addon['path']): addon for addon in addons}
+        for future in concurrent.futures.as_completed(future_to_addon):
+            addon = future_to_addon[future]
             try:
-                addon_id_str, title = workshop.get_addon_by_id(addon_id)
-                if addon_id_str and title:
-                    return ('success', addon_id_str, title)
-                else:
-                    return ('failed', addon_id, None)
+                is_map = future.result()
             except Exception as e:
-                return ('error', addon_id, str(e))
-        
-        # Use ThreadPoolExecutor for parallel requests BUT PRESERVE ORDER
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            # Submit all tasks and store futures with their original index
-            future_to_index = {}
-            for index, addon_id in enumerate(addon_ids):
-                future = executor.submit(fetch_addon_info, addon_id)
-                future_to_index[future] = index
-            
-            # Create a list to store results in original order
-            results = [None] * len(addon_ids)
-            
-            # Process results as they complete, but store in correct position
-            for future in concurrent.futures.as_completed(future_to_index):
-                index = future_to_index[future]
-                addon_id = addon_ids[index]
-                
-                try:
-                    result_type, result_id, result_data = future.result()
-                    if result_type == 'success':
-                        log.info(tr("Loaded ({}/{}): {}").format(index + 1, len(addon_ids), result_data))
-                        results[index] = ('success', result_id, result_data)
-                    elif result_type == 'failed':
-                        log.warning(tr("✗ Failed to load ({}/{}): ID {}").format(index + 1, len(addon_ids), result_id))
-                        results[index] = ('failed', result_id, None)
-                    else:
-                        log.error(tr("✗ Error loading ({}/{}): ID {} - {}").format(index + 1, len(addon_ids), result_id, result_data))
-                        results[index] = ('error', result_id, result_data)
-                except Exception as e:
-                    log.error(tr("✗ Unexpected error ({}/{}): ID {} - {}").format(index + 1, len(addon_ids), addon_id, str(e)))
-                    results[index] = ('error', addon_id, str(e))
-        
-        # Process results in original order
-        for result in results:
-            if not result:
+                log.error(tr("Error checking addon {}: {}").format(addon['title'], str(e)))
+                is_map = False
+
+            if is_map is None:
+                remote_addons.append(addon)
                 continue
-            result_type, result_id, result_data = result
-            if result_type == 'success':
-                unique_addons.append((result_id, result_data))
-            else:
-                failed_addons.append(result_id)
-        
-        if not unique_addons:
-            return False, None, tr("Failed to get information about installed addons.")
-        
-        log.info(tr("Successfully processed {} out of {} addons").format(len(unique_addons), len(addon_ids)))
 
-        # Continue with the rest of the function unchanged...
-        # Check duplicates
-        existing_ids = {addon['id'] for addon in read_addons_from_gameinfo(gameinfo_path)}
-        filtered_addons = []
-        duplicates = []
-        
-        for addon_id, title in unique_addons:
-            if addon_id in existing_ids:
-                duplicates.append((addon_id, title))
-            else:
-                filtered_addons.append((addon_id, title))
-        
-        if not filtered_addons:
-            if duplicates:
-                return False, None, tr("All addons already added.")
-            else:
-                return False, None, tr("Failed to find addons to add.")
-        
-        # Get workshop path
-        from path_utils import get_workshop_path
-        workshop_path = get_workshop_path(hl2_path)
-        
-        # Form paths to VPK files
-        addons_with_paths = []
-        for addon_id, title in filtered_addons:
-            vpk_path = os.path.join(workshop_path, addon_id, "workshop_dir.vpk")
-            addons_with_paths.append((vpk_path, title))
-        
-        # Check files existence if option enabled
-        missing_addons = []
-        final_addons_with_paths = []
-        final_unique_addons = []
-        
-        if check_files:
-            log.info(tr("Checking addon files existence"))
-            # Separate addons into VPK and folders
-            vpk_addons = [(path, title, addon_id) for (path, title), (addon_id, _) in 
-                         zip(addons_with_paths, filtered_addons) if path.endswith('.vpk')]
-            folder_addons = [(path, title, addon_id) for (path, title), (addon_id, _) in 
-                           zip(addons_with_paths, filtered_addons) if not path.endswith('.vpk')]
-            
-            # Check VPK files
-            existing_vpk_addons = []
-            missing_vpk_addons = []
-            
-            for vpk_path, title, addon_id in vpk_addons:
-                if os.path.exists(vpk_path):
-                    existing_vpk_addons.append((vpk_path, title))
-                    final_unique_addons.append((addon_id, title))
-                else:
-                    missing_vpk_addons.append((addon_id, title, vpk_path))
-            
-            # Folders always considered existing
-            existing_folder_addons = [(path, title) for path, title, addon_id in folder_addons]
-            final_unique_addons.extend([(addon_id, title) for path, title, addon_id in folder_addons])
-            
-            # Combine existing addons
-            final_addons_with_paths = existing_vpk_addons + existing_folder_addons
-            missing_addons = missing_vpk_addons
-            
-            # FIX: Check if there are any addons to add at all
-            if not final_addons_with_paths:
-                if missing_addons:
-                    return False, None, tr("Addon files missing.")
-                else:
-                    return False, None, tr("Failed to find addons to add.")
-                    
+            is_map_by_id[addon['id']] = is_map
+            if progress and progress(addon, len(is_map_by_id), total) is False:
+                for pending in future_to_addon:
+                    pending.cancel()
+                return None
+
+    if remote_addons:
+        addon_by_id = {addon['id']: addon for addon in remote_addons}
+        local_count = len(is_map_by_id)
+        cancelled = False
+
+        def report(addon_id, record, done, total_remote):
+            nonlocal cancelled
+            if progress and progress(addon_by_id[addon_id], local_count + done, total) is False:
+                cancelled = True
+                return False
+
+        records = workshop.resolve_records(list(addon_by_id), refresh=refresh, fields=('is_map',), progress=report)
+        if cancelled:
+            return None
+        for addon_id, record in zip(addon_by_id, records):
+            is_map_by_id[addon_id] = bool(record and record['is_map'])
+        
+        unknown = sum(1 for record in records if not record or record['is_map'] is None)
+        if workshop.OFFLINE_MODE and unknown:
+            log.warning(tr("Offline mode: {} addons without local files are not checked for maps").format(unknown))
+
+    metadata_cache.log_stats()
+    return is_map_by_id
+
+class ExtractionBudget:
+    """
+    Global I/O limits shared by all map extractions running at the same time:
+    number of maps extracted in parallel, number of writer threads and write rate
+    """
+    def __init__(self, max_parallel_maps=2, max_writers=8, bytes_per_second=0):
+        self.max_parallel_maps = max(1, max_parallel_maps)
+        self.bytes_per_second = bytes_per_second
+        self._writer_slots = threading.BoundedSemaphore(max(1, max_writers))
+        self._rate_lock = threading.Lock()
+        self._next_write_time = time.monotonic()
+
+    @classmethod
+    def from_config(cls):
+        """Creates budget from config.json settings"""
+        app_config = config.load_config()
+        rate_mb = app_config.get("extraction_rate_limit_mb", 0) or 0
+        return cls(
+            max_parallel_maps=app_config.get("max_parallel_extractions", 2),
+            max_writers=EXTRACT_WORKERS,
+            bytes_per_second=int(rate_mb * 1024 * 1024)
+        )
+
+    def writer_slot(self):
+        """Context manager limiting total number of writing threads"""
+        return self._writer_slots
+
+    def consume(self, size):
+        """Waits until size bytes may be written without exceeding write rate"""
+        if not self.bytes_per_second:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_write_time)
+            self._next_write_time = start + size / self.bytes_per_second
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+# Threads writing extracted files
+EXTRACT_WORKERS = 8
+
+# Entries of one archive are split into batches of about this size,
+# each batch is read sequentially by one thread
+EXTRACT_BATCH_BYTES = 8 * 1024 * 1024
+EXTRACT_BATCH_FILES = 256
+
+def _make_extraction_batches(pak, paths):
+    """
+    Groups entries by source archive, sorted by offset, and splits them into batches
+    Returns list of lists of entry paths
+    """
+    by_archive = {}
+    for filepath in paths:
+        by_archive.setdefault(pak.entries[filepath].archive_index, []).append(filepath)
+    
+    batches = []
+    for archive_paths in by_archive.values():
+        archive_paths.sort(key=lambda filepath: pak.entries[filepath].offset)
+        
+        batch = []
+        batch_bytes = 0
+        for filepath in archive_paths:
+            batch.append(filepath)
+            batch_bytes += pak.entry_size(pak.entries[filepath])
+            if batch_bytes >= EXTRACT_BATCH_BYTES or len(batch) >= EXTRACT_BATCH_FILES:
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+        if batch:
+            batches.append(batch)
+    
+    # Largest batches first so threads finish at about the same time
+    batches.sort(key=lambda batch: sum(pak.entry_size(pak.entries[filepath]) for filepath in batch), reverse=True)
+    return batches
+
+def _extract_batch(pak, batch, output_dir, cancel_event, done_queue, budget):
+    """Writes batch entries to output_dir in archive order, reports each file to done_queue"""
+    with budget.writer_slot():
+        for filepath in batch:
+            if cancel_event.is_set():
+                return
+            try:
+                pak.extract(filepath, os.path.join(output_dir, filepath), budget.consume)
+                done_queue.put((filepath, None))
+            except Exception as e:
+                done_queue.put((filepath, e))
+                return
+
+# Manifest of extracted entries is stored next to extraction folder (workshop_dir.manifest.json)
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Manifest is rewritten at most this often during extraction (seconds)
+MANIFEST_SAVE_INTERVAL = 2.0
+
+def get_manifest_path(output_dir):
+    """Returns path of extraction manifest for workshop_dir folder"""
+    return output_dir + MANIFEST_SUFFIX
+
+def _vpk_signature(vpk_path):
+    """Returns (size, mtime) of VPK file, used to notice workshop updates without reading index"""
+    stat = os.stat(vpk_path)
+    return stat.st_size, int(stat.st_mtime)
+
+def load_manifest(output_dir):
+    """Returns manifest dictionary of extraction folder or None if missing/corrupted"""
+    try:
+        with open(get_manifest_path(output_dir), 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        if manifest.get('version') != MANIFEST_VERSION or not isinstance(manifest.get('entries'), dict):
+            return None
+        return manifest
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(output_dir, vpk_path, entries, complete, selective=False):
+    """
+    Writes manifest with extracted entries {path: [size, crc]}
+    selective: only map-critical entries are extracted, VPK is mounted alongside folder
+    """
+    size, mtime = _vpk_signature(vpk_path)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'vpk_size': size,
+        'vpk_mtime': mtime,
+        'complete': complete,
+        'selective': selective,
+        'entries': entries
+    }
+    # Rewritten every few seconds during extraction, backup is not needed
+    path_utils.atomic_write_text(get_manifest_path(output_dir), json.dumps(manifest), backup=False)
+
+def remove_manifest(output_dir):
+    """Deletes manifest of extraction folder if exists"""
+    try:
+        os.remove(get_manifest_path(output_dir))
+    except FileNotFoundError:
+        pass
+
+# Extraction folder -> (manifest modification time, selective), so gameinfo writes do not parse manifests
+_selective_cache = {}
+
+def is_selective_extraction(output_dir):
+    """Checks if folder contains only map-critical files of its VPK"""
+    try:
+        mtime = os.stat(get_manifest_path(output_dir)).st_mtime_ns
+    except OSError:
+        return False
+    
+    cached = _selective_cache.get(output_dir)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    manifest = load_manifest(output_dir)
+    selective = bool(manifest and manifest.get('selective'))
+    _selective_cache[output_dir] = (mtime, selective)
+    return selective
+
+def is_extraction_complete(vpk_path, output_dir, selective=False):
+    """
+    Checks by manifest that folder contains complete extraction of current VPK in given mode
+    VPK index is not read, changed VPK file is detected by size and modification time
+    """
+    manifest = load_manifest(output_dir)
+    if not manifest or not manifest.get('complete') or not os.path.isdir(output_dir):
+        return False
+    if bool(manifest.get('selective')) != selective:
+        return False
+    try:
+        return (manifest.get('vpk_size'), manifest.get('vpk_mtime')) == _vpk_signature(vpk_path)
+    except OSError:
+        return False
+
+def _plan_extraction(pak, paths, output_dir, manifest):
+    """
+    Compares VPK entries with manifest and files on disk
+    Returns tuple (pending paths, {path: [size, crc]} of entries already extracted, stale paths)
+    Without manifest (folder extracted by older version) files with matching size are accepted
+    """
+    known = manifest['entries'] if manifest else None
+    pending = []
+    done = {}
+    
+    for filepath in paths:
+        entry = pak.entries[filepath]
+        expected = [pak.entry_size(entry), entry.crc32]
+        if known is not None and known.get(filepath) != expected:
+            pending.append(filepath)
+            continue
+        try:
+            on_disk = os.path.getsize(os.path.join(output_dir, filepath))
+        except OSError:
+            on_disk = -1
+        if on_disk == expected[0]:
+            done[filepath] = expected
         else:
-            # FIX: With file check disabled, use ALL addons from filtered_addons
-            # regardless of whether their files exist or not
-            final_addons_with_paths = addons_with_paths
-            final_unique_addons = filtered_addons
-            
-            # FIX: Check that list is not empty
-            if not final_addons_with_paths:
-                return False, None, tr("Failed to find addons to add.")
-        
-        # Prepare data for return
-        result_data = {
-            'unique_addons': final_unique_addons,  # Only those that will be added
-            'duplicates': duplicates,
-            'failed_addons': failed_addons,
-            'missing_addons': missing_addons,
-            'addons_with_paths': final_addons_with_paths,  # Only existing paths
-            'gameinfo_path': gameinfo_path
-        }
-        
-        log.info(tr("Prepared {} addons from workshop.txt").format(len(final_unique_addons)))
-        return True, result_data, ""
-        
-    except Exception as e:
-        log.error(f"Error preparing addons from workshop.txt: {str(e)}")
-        return False, None, f"An unexpected error occurred:\n{str(e)}"
+            pending.append(filepath)
     
-def extract_map_vpk(vpk_path, output_dir, progress_callback=None, check_cancel=None):
+    wanted = set(paths)
+    stale = [filepath for filepath in (known or {}) if filepath not in wanted]
+    return pending, done, stale
+
+def extract_map_vpk(vpk_path, output_dir, progress_callback=None, check_cancel=None, budget=None, selective=False):
     """
     Extracts map VPK file to specified directory
+    Files are written by several threads, progress and cancel are handled in calling thread
+    Extracted entries are recorded in manifest, so interrupted extraction continues from where it stopped
+    and updated VPK only re-extracts changed entries
     progress_callback: function to update progress (current, total, filename) returns False if need to cancel
+    budget: ExtractionBudget shared with other extractions (no limits if not given)
+    selective: extract only map-critical entries, the rest is loaded from VPK mounted alongside
     Returns tuple (success, message)
     """
+    if budget is None:
+        budget = ExtractionBudget(max_writers=EXTRACT_WORKERS)
+    
     try:
         # Check VPK file existence
         if not os.path.exists(vpk_path):
             return False, tr("VPK file not found: {}").format(vpk_path)
         
-        # Check if addon already extracted
-        if os.path.exists(output_dir):
-            # Check if folder is not empty
-            try:
-                folder_contents = os.listdir(output_dir)
-                if len(folder_contents) > 0:
-                    return True, tr("Folder already exists and not empty")
-                else:
-                    # If folder is empty, delete it and extract again
-                    shutil.rmtree(output_dir)
-            except:
-                pass
-        
-        # Create directory for extraction
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Open VPK
-        pak = vpk.open(vpk_path)
-        
-        # Get list of all files to count total
-        all_files = list(pak)
-        total_files = len(all_files)
-        
-        if total_files == 0:
-            # If VPK is empty, delete created folder and return error
-            os.rmdir(output_dir)
-            return False, tr("VPK file is empty")
-        
-        log.info(tr("Starting map extraction: ({} files)").format(total_files))
-        
-        # Extract all files
-        extracted_count = 0
-        for i, filepath in enumerate(all_files):
-            # Check cancellation via callback
-            if check_cancel and check_cancel():
-                # Delete partially extracted folder
-                if os.path.exists(output_dir):
-                    shutil.rmtree(output_dir)
-                return False, tr("Extraction cancelled")
-                
-            try:
-                pak_file = pak.get_file(filepath)
-                save_path = os.path.join(output_dir, filepath)
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                pak_file.save(save_path)
-                extracted_count += 1
-                
-                # Call callback to update progress
-                if progress_callback:
-                    # If callback returns False - interrupt extraction
-                    should_continue = progress_callback(i + 1, total_files, filepath)
-                    if not should_continue:
-                        # Delete partially extracted folder
-                        if os.path.exists(output_dir):
-                            shutil.rmtree(output_dir)
-                        return False, tr("Extraction cancelled")
-                    
-            except Exception as e:
-                # In case of error, try to delete empty folder
-                try:
-                    if os.path.exists(output_dir) and not os.listdir(output_dir):
-                        shutil.rmtree(output_dir)
-                except:
-                    pass
-                return False, tr("Error extracting {}: {}").format(filepath, e)
-        
-        log.info(tr("Map extracted: {}/{} files").format(extracted_count, total_files))
-        return True, tr("Successfully extracted {} files").format(extracted_count)
+        # Read VPK directory index
+        with vpk_reader.open_vpk(vpk_path) as pak:
+            return _extract_entries(pak, vpk_path, output_dir, progress_callback, check_cancel, budget, selective)
         
     except Exception as e:
         # In case of error, try to delete empty folder
         try:
             if os.path.exists(output_dir) and not os.listdir(output_dir):
                 shutil.rmtree(output_dir)
+                remove_manifest(output_dir)
         except:
             pass
         log.error(tr("Error extracting map: {}").format(e))
         return False, tr("Error extracting map: {}. For possible solution see Help (Maps tab).").format(e)
 
-def check_and_extract_maps(gameinfo_path, current_addons, progress_callback=None, specific_addons=None):
+def _extract_entries(pak, vpk_path, output_dir, progress_callback, check_cancel, budget, selective):
+    """Extracts entries of opened VPK missing from output_dir, returns tuple (success, message)"""
+    paths = list(pak)
+    
+    if not paths:
+        return False, tr("VPK file is empty")
+    
+    if selective:
+        critical_paths = [filepath for filepath in paths if is_map_critical_entry(filepath)]
+        # Nothing to extract selectively - extract whole addon
+        if critical_paths:
+            paths = critical_paths
+        else:
+            selective = False
+    
+    manifest = load_manifest(output_dir) if os.path.isdir(output_dir) else None
+    pending, done_entries, stale = _plan_extraction(pak, paths, output_dir, manifest)
+    
+    # Remove files that are no longer in updated VPK (or not extracted in current mode)
+    stale_directories = set()
+    for filepath in stale:
+        try:
+            os.remove(os.path.join(output_dir, filepath))
+        except OSError:
+            pass
+        directory = os.path.dirname(filepath)
+        while directory:
+            stale_directories.add(directory)
+            directory = os.path.dirname(directory)
+    # Deepest first, non-empty directories are kept
+    for directory in sorted(stale_directories, key=len, reverse=True):
+        try:
+            os.rmdir(os.path.join(output_dir, directory))
+        except OSError:
+            pass
+    
+    if not pending:
+        save_manifest(output_dir, vpk_path, done_entries, True, selective)
+        return True, tr("Map already extracted")
+    
+    total_files = len(pending)
+    if done_entries:
+        log.info(tr("Resuming map extraction: {} of {} files already extracted").format(len(done_entries), len(paths)))
+    log.info(tr("Starting map extraction: ({} files)").format(total_files))
+    
+    # Create all directories in one pass
+    directories = {os.path.dirname(os.path.join(output_dir, filepath)) for filepath in pending}
+    directories.add(output_dir)
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+    
+    # Record progress before writing so interrupted run is detected as incomplete
+    save_manifest(output_dir, vpk_path, done_entries, False, selective)
+    
+    def record(filepath):
+        entry = pak.entries[filepath]
+        done_entries[filepath] = [pak.entry_size(entry), entry.crc32]
+    
+    batches = _make_extraction_batches(pak, pending)
+    cancel_event = threading.Event()
+    done_queue = queue.Queue()
+    
+    extracted_count = 0
+    cancelled = False
+    error = None
+    last_save = time.monotonic()
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as executor:
+        for batch in batches:
+            executor.submit(_extract_batch, pak, batch, output_dir, cancel_event, done_queue, budget)
+        
+        while extracted_count < total_files:
+            # Check cancellation via callback
+            if check_cancel and check_cancel():
+                cancelled = True
+                break
+            
+            try:
+                filepath, file_error = done_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            
+            if file_error:
+                error = (filepath, file_error)
+                break
+            
+            extracted_count += 1
+            record(filepath)
+            
+            if time.monotonic() - last_save >= MANIFEST_SAVE_INTERVAL:
+                save_manifest(output_dir, vpk_path, done_entries, False, selective)
+                last_save = time.monotonic()
+            
+            # Call callback to update progress
+            if progress_callback:
+                # If callback returns False - interrupt extraction
+                should_continue = progress_callback(extracted_count, total_files, filepath)
+                if not should_continue:
+                    cancelled = True
+                    break
+        
+        # Stop remaining writers, files they finish meanwhile are still recorded below
+        cancel_event.set()
+    
+    # Collect files written after main loop stopped
+    while True:
+        try:
+            filepath, file_error = done_queue.get_nowait()
+        except queue.Empty:
+            break
+        if not file_error:
+            record(filepath)
+    
+    complete = not cancelled and not error
+    # Partial folder is kept with its manifest, next run extracts only the rest
+    save_manifest(output_dir, vpk_path, done_entries, complete, selective)
+    
+    if cancelled:
+        return False, tr("Extraction cancelled")
+    if error:
+        return False, tr("Error extracting {}: {}").format(error[0], error[1])
+    
+    log.info(tr("Map extracted: {}/{} files").format(extracted_count, total_files))
+    return True, tr("Successfully extracted {} files").format(extracted_count)
+
+def _mark_as_map(updated_addon, output_dir):
+    """Points addon to extracted folder and adds MAP prefix to title"""
+    updated_addon['path'] = output_dir
+    if not updated_addon['title'].startswith("MAP   |   "):
+        updated_addon['title'] = "MAP   |   " + updated_addon['title']
+
+def _process_map_addon(addon, updated_addon, file_progress, budget=None, selective=False):
+    """
+    Extracts map addon if needed and updates its path and title
+    Returns tuple (status, message), status is 'extracted', 'ready', 'failed' or 'cancelled'
+    """
+    vpk_path, output_dir = get_map_paths(addon['path'])
+
+    # Check VPK file existence
+    vpk_exists = vpk_path and os.path.exists(vpk_path)
+    
+    # Folder is complete if its manifest matches current VPK
+    if vpk_exists and is_extraction_complete(vpk_path, output_dir, selective):
+        _mark_as_map(updated_addon, output_dir)
+        return 'ready', ""
+
+    # Without VPK only non-empty folder can be used
+    folder_exists = False
+    if output_dir and os.path.exists(output_dir):
+        try:
+            folder_contents = os.listdir(output_dir)
+            folder_exists = len(folder_contents) > 0
+            if not folder_exists:
+                # Folder exists but empty - delete it
+                shutil.rmtree(output_dir)
+        except Exception as e:
+            folder_exists = False
+    
+    # If VPK file exists, extract missing or changed files (resumes partial folder)
+    if vpk_exists:
+        success, message = extract_map_vpk(vpk_path, output_dir, file_progress, budget=budget, selective=selective)
+        if success:
+            _mark_as_map(updated_addon, output_dir)
+            return 'extracted', message
+        if tr("cancelled") in message:
+            return 'cancelled', message
+        return 'failed', message
+    
+    # If non-empty folder already exists - all good, check prefix
+    if folder_exists:
+        _mark_as_map(updated_addon, output_dir)
+        return 'ready', ""
+    
+    # Neither VPK nor non-empty folder exist
+    error_msg = tr("VPK file and non-empty extraction folder not found")
+    if vpk_path:
+        error_msg += tr(" (VPK: {})").format(vpk_path)
+    return 'failed', error_msg
+
+class _MapProgress:
+    """
+    Combines file progress of maps extracted in parallel into one progress_callback stream
+    Reports: finished maps + 1, total maps, files done / total of maps being extracted, status
+    """
+    def __init__(self, progress_callback):
+        self.progress_callback = progress_callback
+        self.total_maps = 0
+        self.finished_maps = 0
+        self.active = {}
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def report(self, status, map_id=None, current_file=0, total_files=0):
+        """Passes progress to callback, returns False if extraction must stop"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            if map_id is not None:
+                self.active[map_id] = (current_file, total_files)
+            
+            files_done = sum(done for done, total in self.active.values())
+            files_total = sum(total for done, total in self.active.values())
+            current_map = min(self.finished_maps + 1, max(self.total_maps, 1))
+            
+            if self.progress_callback:
+                if not self.progress_callback(current_map, self.total_maps, files_done, files_total, status):
+                    self.cancelled = True
+                    return False
+            return True
+
+    def finish(self, map_id):
+        with self._lock:
+            self.active.pop(map_id, None)
+            self.finished_maps += 1
+
+def check_and_extract_maps(gameinfo_path, current_addons, progress_callback=None, specific_addons=None, budget=None, selective=None):
     """
     Checks addons for maps and extracts them
+    Each addon is classified once, in parallel; found maps are extracted while
+    the remaining addons are still being classified, several maps at once within budget
     progress_callback: function to update progress (current_map, total_maps, current_file, total_files, status) returns False if need to cancel
+    budget: ExtractionBudget, read from config if not given
+    selective: extract only map-critical files and mount VPK alongside, read from config if not given
     """
     try:
         map_addons = []
@@ -848,124 +979,103 @@ def check_and_extract_maps(gameinfo_path, current_addons, progress_callback=None
         updated_addons = []
         for addon in current_addons:
             updated_addons.append(addon.copy())
+        updated_by_id = {addon['id']: addon for addon in updated_addons}
 
         addons_to_process = current_addons
         if specific_addons is not None:
             addons_to_process = specific_addons
 
+        if budget is None:
+            budget = ExtractionBudget.from_config()
+        if selective is None:
+            selective = config.load_config().get("selective_map_extraction", False)
+
         log.info(tr("Checking maps: {} addons to process").format(len(addons_to_process)))
 
-        # Find all maps among addons to process
-        for addon in addons_to_process:
-            addon_url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={addon['id']}"
-            if workshop.is_addon_map(addon_url):
-                map_addons.append(addon)
+        progress = _MapProgress(progress_callback)
 
-        total_maps = len(map_addons)
-        current_map = 0
+        def extract_map(addon, updated_addon):
+            def file_progress(current_file, total_files, filename):
+                return progress.report(tr("{}: {}").format(addon['title'], filename), addon['id'], current_file, total_files)
+            try:
+                return _process_map_addon(addon, updated_addon, file_progress, budget, selective)
+            finally:
+                progress.finish(addon['id'])
 
-        log.info(tr("Maps found: {}").format(total_maps))
+        future_to_addon = {}
+        extraction_futures = {}
+        classify_executor = concurrent.futures.ThreadPoolExecutor(max_workers=workshop.MAX_WORKERS)
+        extract_executor = concurrent.futures.ThreadPoolExecutor(max_workers=budget.max_parallel_maps)
+        try:
+            future_to_addon = {classify_executor.submit(is_map_addon, addon): addon for addon in addons_to_process}
+            pending = len(future_to_addon)
 
-        for i, addon in enumerate(addons_to_process):
-            # Check cancellation before processing each addon
-            if progress_callback:
-                should_continue = progress_callback(current_map, total_maps, 0, 0, tr("Checking addon: {}").format(addon['title']))
-                if not should_continue:
-                    return True, map_addons, {
-                        'extracted': extracted_addons,
-                        'failed': failed_addons,
-                        'total_maps': len(map_addons),
-                        'updated_addons': updated_addons,
-                        'cancelled': True
-                    }
-            
-            addon_url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={addon['id']}"
-            is_map = workshop.is_addon_map(addon_url)
-            
-            if is_map:
-                current_map += 1
-                
-                updated_addon = None
-                for ua in updated_addons:
-                    if ua['id'] == addon['id']:
-                        updated_addon = ua
-                        break
-                
+            for future in concurrent.futures.as_completed(future_to_addon):
+                addon = future_to_addon[future]
+                pending -= 1
+
+                try:
+                    is_map = future.result()
+                except Exception as e:
+                    log.error(tr("Error checking addon {}: {}").format(addon['title'], str(e)))
+                    is_map = False
+
+                if is_map:
+                    map_addons.append(addon)
+
+                # Total is not known until classification ends: maps found so far plus unchecked addons
+                progress.total_maps = len(map_addons) + pending
+
+                # Check cancellation after each classified addon
+                if not progress.report(tr("Checking addon: {}").format(addon['title'])):
+                    break
+
+                if not is_map:
+                    continue
+
+                updated_addon = updated_by_id.get(addon['id'])
                 if not updated_addon:
                     continue
 
-                current_path = addon['path']
-                current_title = addon['title']
-                
-                vpk_path = None
-                output_dir = None
-                
-                if current_path.endswith('.vpk'):
-                    vpk_path = current_path
-                    output_dir = current_path.replace('workshop_dir.vpk', 'workshop_dir')
-                elif current_path.endswith('workshop_dir'):
-                    vpk_path = current_path + '.vpk'
-                    output_dir = current_path
-
-                # Check not only folder existence but also its contents
-                folder_exists = False
-                if output_dir and os.path.exists(output_dir):
-                    try:
-                        folder_contents = os.listdir(output_dir)
-                        folder_exists = len(folder_contents) > 0
-                        if not folder_exists:
-                            # Folder exists but empty - delete it
-                            
-                            shutil.rmtree(output_dir)
-                    except Exception as e:
-                        folder_exists = False
-
-                # Check VPK file existence
-                vpk_exists = vpk_path and os.path.exists(vpk_path)
-                
-                # If VPK file exists and no NON-EMPTY folder, extract
-                if vpk_exists and not folder_exists:
-                    def file_progress(current_file, total_files, filename):
-                        if progress_callback:
-                            return progress_callback(current_map, total_maps, current_file, total_files, tr("{}: {}").format(addon['title'], filename))
-                        return True
-
-                    success, message = extract_map_vpk(vpk_path, output_dir, file_progress)
-                    if success:
-                        updated_addon['path'] = output_dir
-                        if not current_title.startswith("MAP   |   "):
-                            updated_addon['title'] = "MAP   |   " + current_title
-                        extracted_addons.append(updated_addon)
-                    else:
-                        if tr("cancelled") in message:
-                            # Extraction was cancelled
-                            return True, map_addons, {
-                                'extracted': extracted_addons,
-                                'failed': failed_addons,
-                                'total_maps': len(map_addons),
-                                'updated_addons': updated_addons,
-                                'cancelled': True
-                            }
-                        failed_addons.append((updated_addon, message))
-                        continue
-                # If folder already exists AND NOT EMPTY, check prefix
-                elif folder_exists:
-                    updated_addon['path'] = output_dir
-                    if not current_title.startswith("MAP   |   "):
-                        updated_addon['title'] = "MAP   |   " + current_title
-                # If VPK doesn't exist, but non-empty folder exists - all good
-                elif not vpk_exists and folder_exists:
-                    updated_addon['path'] = output_dir
-                    if not current_title.startswith("MAP   |   "):
-                        updated_addon['title'] = "MAP   |   " + current_title
-                else:
-                    # Neither VPK nor non-empty folder exist
-                    error_msg = tr("VPK file and non-empty extraction folder not found")
-                    if vpk_path:
-                        error_msg += tr(" (VPK: {})").format(vpk_path)
-                    failed_addons.append((updated_addon, error_msg))
+                extraction_futures[extract_executor.submit(extract_map, addon, updated_addon)] = updated_addon
+
+            if progress.cancelled:
+                for future in extraction_futures:
+                    future.cancel()
+
+            # Wait for extractions still running
+            for future in concurrent.futures.as_completed(extraction_futures):
+                if future.cancelled():
                     continue
+                updated_addon = extraction_futures[future]
+                try:
+                    status, message = future.result()
+                except Exception as e:
+                    status, message = 'failed', str(e)
+                
+                if status == 'extracted':
+                    extracted_addons.append(updated_addon)
+                elif status == 'failed':
+                    failed_addons.append((updated_addon, message))
+        finally:
+            # Don't start work that is not needed anymore after cancel or error
+            for future in list(future_to_addon) + list(extraction_futures):
+                future.cancel()
+            classify_executor.shutdown(wait=True)
+            extract_executor.shutdown(wait=True)
+
+        if progress.cancelled:
+            # Partial folders stay with their manifests, next run resumes them; finished maps are kept
+            return True, map_addons, {
+                'extracted': extracted_addons,
+                'failed': failed_addons,
+                'total_maps': len(map_addons),
+                'updated_addons': updated_addons,
+                'cancelled': True
+            }
 
+        log.info(tr("Maps found: {}").format(len(map_addons)))
+        metadata_cache.log_stats()
         log.info(tr("Map check completed: {} extracted, {} errors").format(len(extracted_addons), len(failed_addons)))
         return True, map_addons, {
             'extracted': extracted_addons,
@@ -986,6 +1096,8 @@ def check_and_update_map_paths(hl2_path, addons_with_paths):
     """
     try:
         updated_addons = []
+        workshop_path = path_utils.get_workshop_path(hl2_path)
+        exists = workshop_index.get_index(workshop_path).exists if workshop_path else os.path.exists
         
         for vpk_path, title in addons_with_paths:
             updated_path = vpk_path
@@ -993,7 +1105,7 @@ def check_and_update_map_paths(hl2_path, addons_with_paths):
             # If path points to VPK file, check for unpacked folder
             if vpk_path.endswith('.vpk'):
                 output_dir = vpk_path.replace('workshop_dir.vpk', 'workshop_dir')
-                if os.path.exists(output_dir):
+                if exists(output_dir):
                     # Use folder path instead of VPK
                     updated_path = output_dir
                     # Do NOT add prefix here - this will only be done after is_addon_map check
@@ -1006,9 +1118,10 @@ def check_and_update_map_paths(hl2_path, addons_with_paths):
         print(f"Error checking unpacked maps: {e}")
         return addons_with_paths
     
-def clear_extracted_maps(workshop_path, gameinfo_path):
+def clear_extracted_maps(workshop_path, gameinfo_path, document=None):
     """
     Deletes all extracted workshop_dir folders and returns paths to .vpk in gameinfo.txt
+    document: GameinfoDocument already opened by caller, edited in memory and flushed by caller
     Returns tuple (success, message)
     """
     try:
@@ -1018,40 +1131,38 @@ def clear_extracted_maps(workshop_path, gameinfo_path):
         updated_paths = 0
         
         # 1. Delete all workshop_dir folders in workshop folder
-        if os.path.exists(workshop_path):
-            for item in os.listdir(workshop_path):
-                addon_path = os.path.join(workshop_path, item)
-                if os.path.isdir(addon_path):
-                    workshop_dir_path = os.path.join(addon_path, "workshop_dir")
-                    if os.path.exists(workshop_dir_path):
-                        try:
-                            shutil.rmtree(workshop_dir_path)
-                            deleted_folders += 1
-                        except Exception as e:
-                            print(f"Error deleting {workshop_dir_path}: {e}")
-        
-        # 2. Update paths in gameinfo.txt - FIXED LOGIC
-        if os.path.exists(gameinfo_path):
-            with open(gameinfo_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
+        index = workshop_index.get_index(workshop_path)
+        for addon_id, workshop_dir_path in index.extracted_folders():
+            try:
+                shutil.rmtree(workshop_dir_path)
+                remove_manifest(workshop_dir_path)
+                deleted_folders += 1
+            except Exception as e:
+                print(f"Error deleting {workshop_dir_path}: {e}")
+        index.refresh()
+        
+        # 2. Point extracted addons back to their .vpk in gameinfo.txt
+        flush = document is None
+        if flush and os.path.exists(gameinfo_path):
+            document = gameinfo.GameinfoDocument(gameinfo_path)
+        if document is not None:
+            block, entries = document.find_entries()
             
-            # Find lines with paths to workshop_dir (without .vpk)
-            new_lines = []
-            for line in lines:
-                original_line = line
-                # Find lines with game+mod and path ending with workshop_dir (without .vpk)
-                if 'game+mod' in line and 'workshop_dir' in line and '.vpk' not in line:
-                    # Replace folder path with .vpk path
-                    line = line.replace('workshop_dir"', 'workshop_dir.vpk"')
-                    if line != original_line:
-                        updated_paths += 1
-                
-                new_lines.append(line)
+            companion_spans = []
+            for entry in entries:
+                if entry['path'].endswith('workshop_dir'):
+                    entry['node'].value = entry['path'] + '.vpk'
+                    # VPK already mounted with selectively extracted folder is replaced by this line
+                    if entry['companion']:
+                        companion_spans.append(entry['companion'])
+                    updated_paths += 1
+            gameinfo.remove_spans(block, companion_spans)
             
             # Write changes only if there are any
             if updated_paths > 0:
-                with open(gameinfo_path, 'w', encoding='utf-8') as file:
-                    file.writelines(new_lines)
+                document.changed()
+                if flush:
+                    document.flush()
         
         log.info(tr("Clearing completed: {} folders deleted, {} paths updated").format(deleted_folders, updated_paths))
         return True, tr("Deleted folders: {}").format(deleted_folders)
@@ -1060,14 +1171,18 @@ def clear_extracted_maps(workshop_path, gameinfo_path):
         log.error(f"Error clearing maps: {str(e)}")
         return False, f"Error clearing maps: {str(e)}"
     
-def reverse_addons_order(gameinfo_path):
+def reverse_addons_order(gameinfo_path, document=None):
     """
     Reverses the order of addons in gameinfo.txt
+    document: GameinfoDocument already opened by caller, edited in memory and flushed by caller
     Returns tuple (success, message)
     """
     try:
         # Read current addons
-        current_addons = read_addons_from_gameinfo(gameinfo_path)
+        flush = document is None
+        if flush:
+            document = gameinfo.GameinfoDocument(gameinfo_path)
+        current_addons = document.addons()
         if not current_addons:
             return False, tr("No addons to reverse")
         
@@ -1076,7 +1191,9 @@ def reverse_addons_order(gameinfo_path):
         
         # Update gameinfo.txt with reversed order
         addons_with_paths = [(addon['path'], addon['title']) for addon in reversed_addons]
-        success, message = gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths)
+        success, message = gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths, document)
+        if success and flush:
+            document.flush()
         
         if success:
             log.info(tr("Addons order reversed"))
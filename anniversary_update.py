@@ -1,6 +1,7 @@
 import os
 import shutil
 from path_utils import validate_paths
+import path_utils
 from logger import log
 from i18n import tr, translator
 
@@ -307,8 +308,7 @@ class AnniversaryUpdateManager:
             updated_count = 0
             for game_type, gameinfo_path in gameinfo_paths.items():
                 content = self.get_gameinfo_content(game_type)
-                with open(gameinfo_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                path_utils.atomic_write_text(gameinfo_path, content)
                 updated_count += 1
             
             return True, ""
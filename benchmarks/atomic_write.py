@@ -0,0 +1,107 @@
+"""
+Compares path_utils.atomic_write_text with a plain write of gameinfo.txt-sized files
+Usage: python benchmarks/atomic_write.py [--addons 1000 5000] [--runs 15] [--dir PATH]
+--dir: folder on the drive to measure (fsync cost depends on file system), temp folder by default
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import addon_manager
+import gameinfo
+import path_utils
+
+WORKSHOP_PATH = "C:\\Steam\\steamapps\\workshop\\content\\220"
+
+GAMEINFO_TEMPLATE = """"GameInfo"
+{{
+\tgame\t"Half-Life 2: VR Mod"
+\tFileSystem
+\t{{
+\t\tSteamAppId\t\t658920
+\t\tSearchPaths
+\t\t{{
+\t\t\tgame+mod\t\t\thlvr/custom/*
+\t\t{start}
+{addons}\t\t{end}
+\t\t\tgame\t\t\t\t|gameinfo_path|.
+\t\t\tgame\t\t\t\thl2
+\t\t}}
+\t}}
+}}
+"""
+
+def make_addons(count):
+    return [(f"{WORKSHOP_PATH}\\{number}\\workshop_dir.vpk", f"Addon title {number}") for number in range(count)]
+
+def make_gameinfo_text(addons_with_paths):
+    lines = []
+    for path, title in addons_with_paths:
+        lines.extend(addon_manager.format_addon_lines(path, title))
+    return GAMEINFO_TEMPLATE.format(start=gameinfo.START_MARKER, end=gameinfo.END_MARKER, addons=''.join(lines))
+
+def measure(function, runs):
+    """Returns median duration of function in milliseconds"""
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+def run(addon_counts, runs, directory):
+    print(f"{'addons':>7} {'file':>8} {'plain':>9} {'plain+fsync':>12} {'atomic':>9} {'atomic, no .bak':>16} {'update_gameinfo_order':>22}  (median, ms)")
+    for count in addon_counts:
+        addons_with_paths = make_addons(count)
+        text = make_gameinfo_text(addons_with_paths)
+        path = os.path.join(directory, "gameinfo.txt")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+        def plain():
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(text)
+
+        def plain_fsync():
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+
+        # Reversed order rewrites every addon line, the atomic write is a small part of it
+        reordered = list(reversed(addons_with_paths))
+        def update_order():
+            gameinfo.update_gameinfo_order(path, reordered)
+            reordered.reverse()
+
+        results = [measure(function, runs) for function in (
+            plain,
+            plain_fsync,
+            lambda: path_utils.atomic_write_text(path, text),
+            lambda: path_utils.atomic_write_text(path, text, backup=False),
+            update_order
+        )]
+        size = f"{len(text.encode('utf-8')) // 1024} KB"
+        print(f"{count:>7} {size:>8} " + " ".join(f"{value:>{width}.2f}" for value, width in zip(results, (9, 12, 9, 16, 22))))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of atomic gameinfo.txt writes")
+    parser.add_argument('--addons', type=int, nargs='+', default=[1000, 5000], help="numbers of mounted addons")
+    parser.add_argument('--runs', type=int, default=15, help="runs of each write, median is printed")
+    parser.add_argument('--dir', help="folder to write files in")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(dir=args.dir)
+    try:
+        run(args.addons, args.runs, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
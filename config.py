@@ -1,6 +1,7 @@
 import os
 import json
 from logger import log
+import path_utils
 
 CONFIG_FILE = "config.json"
 
@@ -13,7 +14,12 @@ def load_config():
         "check_addon_files": True,
         "auto_check_maps": True,
         "embed_into_episodes": True,
-        "language": "en"
+        "language": "en",
+        "max_parallel_extractions": 2,
+        "extraction_rate_limit_mb": 0,
+        "selective_map_extraction": False,
+        "metadata_backend": "api",
+        "offline_mode": False
     }
     
     if not os.path.exists(CONFIG_FILE):
@@ -33,8 +39,11 @@ def load_config():
         return default_config
 
 def save_config(collection_url, single_addon_url, hl2vr_path, hl2_path, 
-                check_addon_files, auto_check_maps, embed_into_episodes, language="en"):
-    config = {
+                check_addon_files, auto_check_maps, embed_into_episodes, language="en",
+                selective_map_extraction=False, offline_mode=False):
+    # Keep settings that are not edited from the interface
+    config = load_config()
+    config.update({
         "collection_url": collection_url,
         "single_addon_url": single_addon_url, 
         "hl2vr_path": hl2vr_path,
@@ -42,12 +51,13 @@ def save_config(collection_url, single_addon_url, hl2vr_path, hl2_path,
         "check_addon_files": check_addon_files,
         "auto_check_maps": auto_check_maps,
         "embed_into_episodes": embed_into_episodes,
-        "language": language
-    }
+        "language": language,
+        "selective_map_extraction": selective_map_extraction,
+        "offline_mode": offline_mode
+    })
     
     try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as file:
-            json.dump(config, file, ensure_ascii=False, indent=2)
+        path_utils.atomic_write_text(CONFIG_FILE, json.dumps(config, ensure_ascii=False, indent=2))
         return True
     except Exception as e:
         log.error(f"Error saving configuration: {e}")
@@ -0,0 +1,196 @@
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QThread, QTimer, pyqtSignal
+import workshop_index
+from logger import log
+from i18n import tr
+
+# Events are collected for this long before files are checked (ms)
+DEBOUNCE_INTERVAL = 500
+
+# Check interval when paths cannot be watched by the system (ms)
+POLL_INTERVAL = 3000
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+class IndexRefreshWorker(QThread):
+    """Refreshes workshop index outside of GUI thread"""
+    def __init__(self, index, rescan, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.rescan = rescan
+
+    def run(self):
+        self.index.refresh(self.rescan)
+
+class GameFilesWatcher(QObject):
+    """
+    Watches gameinfo.txt files and workshop folder with QFileSystemWatcher
+    (inotify on Linux, change notifications on Windows). If a path cannot be watched,
+    falls back to polling: stat of gameinfo files and incremental scandir of workshop index
+    Events are debounced, signals report only files that actually changed
+    Events of workshop folder itself only tell about added or removed addon folders,
+    so folders and workshop_dir.vpk of mounted addons are watched too: Steam updates
+    an addon inside its folder. Workshop index is refreshed in a worker thread
+    """
+    gameinfo_changed = pyqtSignal(str)  # path of gameinfo.txt
+    workshop_changed = pyqtSignal(list)  # IDs of addons whose folder was added, removed or changed
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.gameinfo_paths = []
+        self.workshop_path = None
+        self._signatures = {}
+        self.addon_ids = []
+        self._index = None
+        self._snapshot = {}
+        self._touched = set()
+        self._refresh_worker = None
+        self._refresh_again = False
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_event)
+        self._watcher.directoryChanged.connect(self._on_event)
+
+        self._debounce_timer = QTimer(self)
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.timeout.connect(self.check)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self.check)
+
+    def watch(self, gameinfo_paths, workshop_path=None):
+        """Replaces watched gameinfo files and workshop folder"""
+        gameinfo_paths = [path for path in gameinfo_paths if path]
+        if not workshop_path or not os.path.isdir(workshop_path):
+            workshop_path = None
+        if gameinfo_paths == self.gameinfo_paths and workshop_path == self.workshop_path:
+            return
+
+        watched = self._watcher.files() + self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+
+        self.gameinfo_paths = gameinfo_paths
+        self.workshop_path = workshop_path
+        self._signatures = {path: _signature(path) for path in gameinfo_paths}
+        self._index = workshop_index.get_index(workshop_path) if workshop_path else None
+        self._snapshot = self._index.addons if self._index else {}
+        self._touched = set()
+        self._add_watches()
+
+    def watch_addons(self, addon_ids):
+        """Replaces mounted addons whose folders are watched for updates"""
+        addon_ids = sorted({str(addon_id) for addon_id in addon_ids if str(addon_id).isdigit()})
+        if addon_ids == self.addon_ids:
+            return
+
+        removed = set(self._addon_paths(self.addon_ids)) - set(self._addon_paths(addon_ids))
+        watched = removed & set(self._watcher.files() + self._watcher.directories())
+        if watched:
+            self._watcher.removePaths(list(watched))
+
+        self.addon_ids = addon_ids
+        self._add_watches()
+
+    def _addon_paths(self, addon_ids):
+        """Returns folders and workshop_dir.vpk files of addons"""
+        if not self.workshop_path:
+            return []
+        paths = []
+        for addon_id in addon_ids:
+            folder = os.path.join(self.workshop_path, addon_id)
+            paths.extend([folder, os.path.join(folder, workshop_index.VPK_NAME)])
+        return paths
+
+    def stop(self):
+        self._debounce_timer.stop()
+        self._poll_timer.stop()
+        if self._refresh_worker is not None:
+            self._refresh_worker.wait()
+            self._refresh_worker = None
+        watched = self._watcher.files() + self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self.gameinfo_paths = []
+        self.workshop_path = None
+
+    def _add_watches(self):
+        """Adds paths dropped by the watcher (file replaced by rename), polls if some cannot be watched"""
+        wanted = []
+        for path in self.gameinfo_paths:
+            # Folder is watched too: atomic save replaces the file and removes its watch
+            wanted.extend([path, os.path.dirname(path)])
+        if self.workshop_path:
+            wanted.append(self.workshop_path)
+            wanted.extend(self._addon_paths(self.addon_ids))
+
+        watched = set(self._watcher.files() + self._watcher.directories())
+        missing = [path for path in dict.fromkeys(wanted) if path not in watched and os.path.exists(path)]
+        failed = self._watcher.addPaths(missing) if missing else []
+
+        if failed and not self._poll_timer.isActive():
+            log.info(tr("File changes cannot be watched, checking every {} s").format(POLL_INTERVAL // 1000))
+            self._poll_timer.start(POLL_INTERVAL)
+        elif not failed and self._poll_timer.isActive():
+            self._poll_timer.stop()
+
+    def _on_event(self, path):
+        if self.workshop_path:
+            # Addon folder or file inside it: folder is rescanned even if its mtime did not change
+            relative = os.path.relpath(path, self.workshop_path)
+            addon_id = relative.split(os.sep)[0]
+            if addon_id.isdigit():
+                self._touched.add(addon_id)
+        self._debounce_timer.start(DEBOUNCE_INTERVAL)
+
+    def check(self):
+        """Compares watched files with last known state and emits signals for changes"""
+        self._add_watches()
+
+        for path in self.gameinfo_paths:
+            signature = _signature(path)
+            if signature != self._signatures.get(path):
+                self._signatures[path] = signature
+                if signature is not None:
+                    self.gameinfo_changed.emit(path)
+
+        if self._index is not None:
+            self._refresh_index()
+
+    def _refresh_index(self):
+        """Starts refresh of workshop index in worker, or repeats it after the running one"""
+        if self._refresh_worker is not None:
+            self._refresh_again = True
+            return
+
+        worker = IndexRefreshWorker(self._index, self._touched, self)
+        self._touched = set()
+        worker.finished.connect(lambda: self._on_index_refreshed(worker))
+        self._refresh_worker = worker
+        worker.start()
+
+    def _on_index_refreshed(self, worker):
+        worker.deleteLater()
+        if worker is not self._refresh_worker:
+            return
+        self._refresh_worker = None
+
+        # Result is dropped if watch() replaced the index while worker was running
+        if worker.index is self._index:
+            previous = self._snapshot
+            current = self._index.addons
+            # Records of folders that did not change are reused by refresh
+            changed = [addon_id for addon_id in previous.keys() | current.keys()
+                       if previous.get(addon_id) is not current.get(addon_id)]
+            self._snapshot = current
+            if changed:
+                self.workshop_changed.emit(sorted(changed))
+
+        if self._refresh_again and self._index is not None:
+            self._refresh_again = False
+            self._refresh_index()
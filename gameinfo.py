@@ -1,17 +1,579 @@
+import os
+import bisect
 import addon_manager
+import keyvalues
+import path_utils
 from logger import log
 from i18n import tr, translator
 
-def update_gameinfo(gameinfo_path, addons_with_paths):
+START_MARKER = "//mounted_addons_start"
+END_MARKER = "//mounted_addons_end"
+
+def get_search_paths(document):
+    """Returns SearchPaths block of document or None"""
+    return document.find("GameInfo", "FileSystem", "SearchPaths")
+
+def find_markers(document):
+    """
+    Finds addons block marker comments anywhere in document
+    Returns tuple (start, end), each is (block, index in block.children) or None
+    """
+    found = {}
+    
+    def visit(block):
+        for index, child in enumerate(block.children):
+            if isinstance(child, keyvalues.Comment):
+                for marker in (START_MARKER, END_MARKER):
+                    if marker in child.text and marker not in found:
+                        found[marker] = (block, index)
+            elif isinstance(child, keyvalues.Pair) and isinstance(child.value, keyvalues.Block):
+                visit(child.value)
+    
+    visit(document)
+    return found.get(START_MARKER), found.get(END_MARKER)
+
+def _get_addon_region(document):
+    """Returns tuple (block, first child after start marker, index of end marker) or None"""
+    start, end = find_markers(document)
+    if not start or not end or start[0] is not end[0] or start[1] >= end[1]:
+        return None
+    return start[0], start[1] + 1, end[1]
+
+def _is_addon_path_line(nodes):
+    return (len(nodes) == 1 and isinstance(nodes[0], keyvalues.Pair) and nodes[0].key.lower() == 'game+mod'
+            and isinstance(nodes[0].value, str) and nodes[0].value_quoted)
+
+def _find_entries(children, start, end):
+    """
+    Finds addon entries in children[start:end]: title comment line, game+mod line with quoted path,
+    VPK line of selectively extracted folder and one empty line after
+    Returns list of dictionaries with title, path, path node and child index spans
+    """
+    lines = keyvalues.split_lines(children, start, end)
+    entries = []
+    i = 0
+    while i < len(lines):
+        nodes = lines[i][2]
+        if len(nodes) == 1 and isinstance(nodes[0], keyvalues.Comment):
+            # Path may be separated from title by empty lines
+            j = i + 1
+            while j < len(lines) and not lines[j][2]:
+                j += 1
+            if j < len(lines) and _is_addon_path_line(lines[j][2]):
+                path_node = lines[j][2][0]
+                last = j + 1
+                
+                companion = None
+                if (last < len(lines) and _is_addon_path_line(lines[last][2]) and path_node.value.endswith('workshop_dir')
+                        and lines[last][2][0].value == path_node.value + '.vpk'):
+                    companion = (lines[last][0], lines[last][1])
+                    last += 1
+                
+                # One empty line after addon belongs to it
+                if last < len(lines) and not lines[last][2] and children[lines[last][1] - 1].ends_line:
+                    last += 1
+                
+                entries.append({
+                    'title': nodes[0].body,
+                    'path': path_node.value,
+                    'node': path_node,
+                    'companion': companion,
+                    'span': (lines[i][0], lines[last - 1][1])
+                })
+                i = last
+                continue
+        i += 1
+    return entries
+
+def find_addon_entries(document):
+    """
+    Finds addon entries between markers, or in whole SearchPaths block if markers are missing
+    Returns tuple (block, entries), block is None if SearchPaths not found
+    """
+    region = _get_addon_region(document)
+    if region:
+        block, start, end = region
+        return block, _find_entries(block.children, start, end)
+    
+    log.info(tr("Addon markers not found, searching in entire SearchPaths block"))
+    block = get_search_paths(document)
+    if block is None:
+        log.warning(tr("SearchPaths block not found in gameinfo.txt"))
+        return None, []
+    return block, _find_entries(block.children, 0, len(block.children))
+
+def _render_addon(vpk_path, title):
+    return keyvalues.parse_fragment(''.join(addon_manager.format_addon_lines(vpk_path, title)))
+
+def _replace_region(document, nodes):
+    """
+    Replaces everything between markers with nodes, keeping the rest of start marker line
+    and indentation of end marker line. Returns False if markers not found
+    """
+    region = _get_addon_region(document)
+    if not region:
+        return False
+    block, start, end = region
+    
+    lines = keyvalues.split_lines(block.children, start, end)
+    head = [keyvalues.Whitespace('\n')]
+    tail = []
+    if lines and block.children[lines[0][1] - 1].ends_line:
+        head = block.children[lines[0][0]:lines[0][1]]
+    if lines and not block.children[lines[-1][1] - 1].ends_line:
+        tail = block.children[lines[-1][0]:lines[-1][1]]
+    
+    block.children[start:end] = head + nodes + tail
+    return True
+
+def _longest_increasing_run(values):
+    """Returns positions of longest strictly increasing subsequence of values (O(n log n))"""
+    tail_positions = []
+    tail_values = []
+    previous = [-1] * len(values)
+    for position, value in enumerate(values):
+        length = bisect.bisect_left(tail_values, value)
+        if length:
+            previous[position] = tail_positions[length - 1]
+        if length == len(tail_values):
+            tail_positions.append(position)
+            tail_values.append(value)
+        else:
+            tail_positions[length] = position
+            tail_values[length] = value
+    
+    positions = []
+    position = tail_positions[-1] if tail_positions else -1
+    while position != -1:
+        positions.append(position)
+        position = previous[position]
+    positions.reverse()
+    return positions
+
+def plan_addon_edits(entries, addons_with_paths):
+    """
+    Computes minimal edit turning current entries into list of (path, title)
+    Entries keeping path, title and mount mode are reused; the longest run of them
+    already in the right relative order stays in place, others are moved.
+    Remaining addons are rendered as new lines, remaining entries are removed
+    Returns dictionary: sources (entry index or None for each addon), kept (set of entry indices),
+    moved, added, removed (lists of titles) and changed flag
+    """
+    candidates = {}
+    for index, entry in enumerate(entries):
+        candidates.setdefault((entry['path'], entry['title']), []).append(index)
+    for indices in candidates.values():
+        indices.reverse()
+    
+    sources = []
+    for vpk_path, title in addons_with_paths:
+        source = None
+        indices = candidates.get((vpk_path, title))
+        if indices:
+            index = indices.pop()
+            # Mounted paths must match mode of extracted folder
+            mounted = [vpk_path] + ([vpk_path + '.vpk'] if entries[index]['companion'] else [])
+            if mounted == addon_manager.get_mount_paths(vpk_path):
+                source = index
+        sources.append(source)
+    
+    matched = [source for source in sources if source is not None]
+    kept = {matched[position] for position in _longest_increasing_run(matched)}
+    used = set(matched)
+    
+    plan = {
+        'sources': sources,
+        'kept': kept,
+        'moved': [entries[source]['title'] for source in matched if source not in kept],
+        'added': [title for (vpk_path, title), source in zip(addons_with_paths, sources) if source is None],
+        'removed': [entry['title'] for index, entry in enumerate(entries) if index not in used]
+    }
+    plan['changed'] = bool(plan['moved'] or plan['added'] or plan['removed'])
+    return plan
+
+def describe_addon_edits(plan):
+    return tr("{} moved, {} added, {} removed").format(len(plan['moved']), len(plan['added']), len(plan['removed']))
+
+def set_addon_entries(document, addons_with_paths):
+    """
+    Replaces addons between markers with given list of (path, title) applying plan_addon_edits:
+    entries that stay in place and text around them are not touched, moved entries keep their original text
+    Returns the plan, None if markers not found
+    """
+    region = _get_addon_region(document)
+    if not region:
+        return None
+    block, start, end = region
+    children = block.children
+    
+    entries = _find_entries(children, start, end)
+    plan = plan_addon_edits(entries, addons_with_paths)
+    if not plan['changed']:
+        return plan
+    
+    # Nodes placed before kept entry (key: its index) or after the last entry (key: None), collected backwards
+    placed = {}
+    anchor = None
+    for (vpk_path, title), source in zip(reversed(addons_with_paths), reversed(plan['sources'])):
+        if source in plan['kept']:
+            anchor = source
+            continue
+        if source is None:
+            nodes = _render_addon(vpk_path, title)
+        else:
+            first, last = entries[source]['span']
+            nodes = children[first:last]
+        placed.setdefault(anchor, []).append(nodes)
+    
+    # New entries go after the last one, or after start marker line if there are none
+    if entries:
+        end_position = entries[-1]['span'][1]
+    else:
+        lines = keyvalues.split_lines(children, start, end)
+        end_position = lines[0][1] if lines and children[lines[0][1] - 1].ends_line else start
+    
+    result = children[:start]
+    position = start
+    for index, entry in enumerate(entries):
+        first, last = entry['span']
+        result.extend(children[position:first])
+        for nodes in reversed(placed.get(index, [])):
+            result.extend(nodes)
+        if index in plan['kept']:
+            result.extend(children[first:last])
+        position = last
+    result.extend(children[position:end_position])
+    for nodes in reversed(placed.get(None, [])):
+        result.extend(nodes)
+    result.extend(children[end_position:])
+    
+    block.children = result
+    return plan
+
+def set_addon_block_text(document, text):
+    """Replaces addons block with text in gameinfo.txt format, returns False if markers not found"""
+    return _replace_region(document, keyvalues.parse_fragment(text))
+
+def index_entries(entries):
+    """Returns dictionary {addon ID: [entries]} built in one pass over entries"""
+    index = {}
+    for entry in entries:
+        index.setdefault(addon_manager.extract_addon_id(entry['path']), []).append(entry)
+    return index
+
+def remove_spans(block, spans):
+    """Removes sorted, non-overlapping spans of block children in one pass"""
+    if not spans:
+        return
+    kept = []
+    position = 0
+    for first, last in spans:
+        kept.extend(block.children[position:first])
+        position = last
+    kept.extend(block.children[position:])
+    block.children = kept
+
+def remove_addon_entries(document, addon_ids, found=None, index=None):
+    """
+    Removes addons with given IDs in time linear in file size
+    found: (block, entries) from find_addon_entries, index: index_entries(entries) - computed if not given
+    Returns list of removed titles
+    """
+    block, entries = found if found is not None else find_addon_entries(document)
+    if index is None:
+        index = index_entries(entries)
+    
+    removed = []
+    for addon_id in set(addon_ids):
+        removed.extend(index.get(addon_id, []))
+    # Entries are ordered by position, spans do not overlap
+    removed.sort(key=lambda entry: entry['span'][0])
+    
+    remove_spans(block, [entry['span'] for entry in removed])
+    return [entry['title'] for entry in removed]
+
+def insert_markers(document):
+    """
+    Adds empty addons block after custom folders in SearchPaths
+    Returns False if SearchPaths block not found
+    """
+    block = get_search_paths(document)
+    if block is None:
+        return False
+    
+    lines = keyvalues.split_lines(block.children)
+    if not lines:
+        return False
+    
+    def line_text(line):
+        return ''.join(node.dump() for node in block.children[line[0]:line[1]])
+    
+    # Find insertion position - after custom folders and before "// mount VR files first"
+    insert_index = None
+    found_custom = False
+    
+    for line in lines:
+        text = line_text(line)
+        # Look for lines with custom folders
+        if 'custom/*' in text and 'game+mod' in text:
+            found_custom = True
+            continue
+        
+        # If we found custom folders and now found "mount VR files", insert before it
+        if found_custom and '// mount VR files' in text:
+            insert_index = line[0]
+            break
+    
+    # If exact match not found, look after the last custom folder
+    if insert_index is None and found_custom:
+        for line in lines:
+            text = line_text(line)
+            if 'custom/*' in text and 'game+mod' in text:
+                insert_index = line[1]
+    
+    # If still not found, insert at the beginning of SearchPaths
+    if insert_index is None:
+        insert_index = lines[0][1]
+    
+    block.insert(insert_index, keyvalues.parse_fragment(f'\t\t{START_MARKER}\n\t\t{END_MARKER}\n'))
+    return True
+
+class GameinfoModifiedError(Exception):
+    pass
+
+class GameinfoDocument:
+    """
+    gameinfo.txt session: file is read and parsed once, edits are applied in memory
+    and written by one flush(). Marker status and addon entries are cached until next edit
+    Flush refuses to overwrite the file if it was changed by another program since loading
+    """
+    def __init__(self, gameinfo_path):
+        self.path = gameinfo_path
+        self.reload()
+
+    def reload(self):
+        """Reads file again, discarding unsaved edits"""
+        with open(self.path, 'r', encoding='utf-8') as file:
+            text = file.read()
+        self._signature = self._stat()
+        self._loaded_text = text
+        self.document = keyvalues.parse(text)
+        self.dirty = False
+        self._markers = None
+        self._entries = None
+        self._index = None
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def is_modified_externally(self):
+        try:
+            return self._stat() != self._signature
+        except OSError:
+            return True
+
+    def changed(self):
+        """Marks document as edited (call after modifying nodes directly)"""
+        self.dirty = True
+        self._markers = None
+        self._entries = None
+        self._index = None
+
+    def markers(self):
+        if self._markers is None:
+            self._markers = find_markers(self.document)
+        return self._markers
+
+    def marker_status(self):
+        start, end = self.markers()
+        if start and end:
+            return "ok"
+        elif start:
+            return "missing_end"
+        elif end:
+            return "missing_start"
+        return "no_markers"
+
+    def has_region(self):
+        return _get_addon_region(self.document) is not None
+
+    def find_entries(self):
+        """Returns tuple (block, entries) with node spans, see find_addon_entries"""
+        if self._entries is None:
+            self._entries = find_addon_entries(self.document)
+        return self._entries
+
+    def entry_index(self):
+        """Returns cached dictionary {addon ID: [entries]}"""
+        if self._index is None:
+            self._index = index_entries(self.find_entries()[1])
+        return self._index
+
+    def addons(self):
+        """Returns list of addon dictionaries (number, title, id, path)"""
+        block, entries = self.find_entries()
+        return [{
+            'number': i,
+            'title': entry['title'],
+            'id': addon_manager.extract_addon_id(entry['path']),
+            'path': entry['path']
+        } for i, entry in enumerate(entries, 1)]
+
+    def add_markers(self):
+        """Adds empty addons block, returns False if SearchPaths not found"""
+        if not insert_markers(self.document):
+            return False
+        self.changed()
+        return True
+
+    def set_addons(self, addons_with_paths):
+        """
+        Replaces addons between markers with list of (path, title) editing only what differs
+        Returns plan of applied edits (see plan_addon_edits), None if markers not found
+        """
+        plan = set_addon_entries(self.document, addons_with_paths)
+        if plan is not None and plan['changed']:
+            self.changed()
+        return plan
+
+    def set_block_text(self, text):
+        """Replaces addons block with text in gameinfo.txt format, returns False if markers not found"""
+        if not set_addon_block_text(self.document, text):
+            return False
+        self.changed()
+        return True
+
+    def remove_addons(self, addon_ids):
+        """Removes addons with given IDs, returns list of removed titles"""
+        removed_titles = remove_addon_entries(self.document, addon_ids, self.find_entries(), self.entry_index())
+        if removed_titles:
+            self.changed()
+        return removed_titles
+
+    def flush(self):
+        """Writes edits to file, returns False if there was nothing to write"""
+        return bool(commit_documents([self]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+def commit_documents(documents):
+    """
+    Writes edited documents as one transaction: all files get new contents or none do
+    (e.g. hlvr gameinfo.txt and episodes synced with it)
+    Documents whose text equals the file on disk are not written
+    Nothing is written if any of the files was changed by another program since loading
+    Returns number of written files
+    """
+    texts = {}
+    for document in documents:
+        if not document.dirty:
+            continue
+        text = document.document.dump()
+        if text == document._loaded_text:
+            document.dirty = False
+            continue
+        if document.is_modified_externally():
+            raise GameinfoModifiedError(tr("gameinfo.txt was changed by another program, reload it: {}").format(document.path))
+        texts[document] = text
+    if not texts:
+        return 0
+    
+    path_utils.atomic_write_many({document.path: text for document, text in texts.items()})
+    
+    for document, text in texts.items():
+        document._signature = document._stat()
+        document._loaded_text = text
+        document.dirty = False
+    return len(texts)
+
+def prepare_episode_documents(episode_paths, addons_with_paths, hl2vr_path=None):
+    """
+    Opens episode gameinfo files and applies addons list of main gameinfo in memory
+    Returns tuple (success, message, list of edited GameinfoDocument)
+    """
+    if not episode_paths:
+        return False, tr("Episodes not installed"), []
+    
+    documents = []
+    
+    for episode_path in episode_paths:
+        episode_name = os.path.basename(os.path.dirname(episode_path))
+        
+        # Read episode gameinfo.txt once, markers and addons are written together
+        document = GameinfoDocument(episode_path)
+        
+        # Check markers
+        marker_status = addon_manager.validate_addon_markers(episode_path, document)
+        
+        if marker_status == "missing_start":
+            return False, tr("{}: End marker of addons block (//mounted_addons_end) found, but start marker is missing!\n\nRemove the addons list with marker from gameinfo.txt, or add //mounted_addons_start to the beginning of the list.").format(episode_name), []
+        elif marker_status == "missing_end":
+            return False, tr("{}: Start marker of addons block (//mounted_addons_start) found, but end marker is missing!\n\nRemove the addons list with marker from gameinfo.txt, or add //mounted_addons_end to the end of addons list in gameinfo.txt.").format(episode_name), []
+        elif marker_status == "no_markers":
+            # Add markers on first use
+            success, message = addon_manager.add_addon_markers(episode_path, hl2vr_path, document=document)
+            if not success:
+                return False, tr("Failed to add markers to {}: {}").format(episode_name, message), []
+        
+        # Update addons list in episode
+        success, message = update_gameinfo_order(episode_path, addons_with_paths, document)
+        if not success:
+            return False, tr("Error syncing with {}: {}").format(episode_name, message), []
+        
+        documents.append(document)
+    
+    return True, tr("Synced with Episodes"), documents
+
+def write_addons_order(gameinfo_path, addons_with_paths, episode_paths=None, hl2vr_path=None):
+    """
+    Writes addons order to main gameinfo.txt and episodes in one transaction
+    episode_paths: episode gameinfo files to sync, None if sync is disabled
+    Files already containing this order are not rewritten
+    Returns tuple (success, message, sync success, sync message)
+    """
+    try:
+        document = GameinfoDocument(gameinfo_path)
+        success, message = update_gameinfo_order(gameinfo_path, addons_with_paths, document)
+        if not success:
+            return False, message, True, ""
+        
+        episode_documents = []
+        sync_success, sync_message = True, tr("Sync with episodes disabled")
+        if episode_paths is not None:
+            try:
+                sync_success, sync_message, episode_documents = prepare_episode_documents(episode_paths, addons_with_paths, hl2vr_path)
+            except Exception as e:
+                log.error(tr("Error syncing with episodes: ") + str(e))
+                sync_success, sync_message = False, tr("Error syncing with episodes: {}").format(str(e))
+        
+        commit_documents([document] + episode_documents)
+        return True, message, sync_success, sync_message
+    
+    except Exception as e:
+        log.error(f"Error updating addons order: {str(e)}")
+        return False, f"Error updating addons order: {str(e)}", True, ""
+
+def update_gameinfo(gameinfo_path, addons_with_paths, document=None):
     """
     Adds addon paths to gameinfo.txt file between markers
+    document: GameinfoDocument already opened by caller, edited in memory and flushed by caller
     Returns tuple (success, message)
     """
     try:
         log.info(tr("Updating gameinfo.txt..."))
         
+        flush = document is None
+        if flush:
+            document = GameinfoDocument(gameinfo_path)
+        
         # Check markers
-        marker_status = addon_manager.validate_addon_markers(gameinfo_path)
+        marker_status = document.marker_status()
         
         if marker_status == "missing_start":
             return False, tr("Missing start marker of addons block! Add //mounted_addons_start to the beginning of addons list in gameinfo.txt.")
@@ -19,28 +581,14 @@ def update_gameinfo(gameinfo_path, addons_with_paths):
             return False, tr("Missing end marker of addons block! Add //mounted_addons_end to the end of addons list in gameinfo.txt.")
         elif marker_status == "no_markers":
             # Add markers on first use
-            success, message = addon_manager.add_addon_markers(gameinfo_path)
-            if not success:
-                return False, tr("Failed to add markers: {}").format(message)
-        
-        with open(gameinfo_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        # Find marker positions
-        start_index = -1
-        end_index = -1
-        
-        for i, line in enumerate(lines):
-            if "//mounted_addons_start" in line:
-                start_index = i
-            if "//mounted_addons_end" in line:
-                end_index = i
+            if not document.add_markers():
+                return False, tr("Failed to add markers: {}").format(tr("gameinfo.txt is corrupted, addons cannot be mounted."))
         
-        if start_index == -1 or end_index == -1:
+        if not document.has_region():
             return False, tr("Failed to find addons block markers.")
         
         # Get current addons
-        current_addons = addon_manager.read_addons_from_gameinfo(gameinfo_path)
+        current_addons = document.addons()
         
         # Create dictionary of existing addons by ID for quick search
         existing_addons_by_id = {addon['id']: addon for addon in current_addons}
@@ -66,19 +614,10 @@ def update_gameinfo(gameinfo_path, addons_with_paths):
         for addon_id, addon in existing_addons_by_id.items():
             all_addons_with_paths.append((addon['path'], addon['title']))
         
-        # Create lines to insert between markers
-        insert_lines = []
-        for vpk_path, title in all_addons_with_paths:
-            insert_lines.append(f'\t\t// {title}\n')
-            insert_lines.append(f'\t\tgame+mod\t\t"{vpk_path}"\n')
-            insert_lines.append('\n')
-        
-        # Replace content between markers
-        new_lines = lines[:start_index + 1] + insert_lines + lines[end_index:]
-        
-        # Write modified file
-        with open(gameinfo_path, 'w', encoding='utf-8') as file:
-            file.writelines(new_lines)
+        # Replace content between markers and write file once
+        document.set_addons(all_addons_with_paths)
+        if flush:
+            document.flush()
         
         log.info(tr("Gameinfo.txt updated: {} new addons").format(len(addons_with_paths)))
         return True, tr("Added addons: {}").format(len(addons_with_paths))
@@ -87,99 +626,35 @@ def update_gameinfo(gameinfo_path, addons_with_paths):
         log.error(f"Error updating gameinfo.txt: {str(e)}")
         return False, f"Error updating gameinfo.txt: {str(e)}"
 
-def update_gameinfo_order(gameinfo_path, addons_with_paths):
+def update_gameinfo_order(gameinfo_path, addons_with_paths, document=None):
     """
     Updates addons order in gameinfo.txt between markers
+    document: GameinfoDocument already opened by caller, edited in memory and flushed by caller
     Returns tuple (success, message)
     """
     try:
-        # Check markers
-        marker_status = addon_manager.validate_addon_markers(gameinfo_path)
+        flush = document is None
+        if flush:
+            document = GameinfoDocument(gameinfo_path)
         
-        if marker_status != "ok":
+        # Check markers
+        if document.marker_status() != "ok":
             return False, tr("Addons block markers corrupted.")
         
-        with open(gameinfo_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        # Find marker positions
-        start_index = -1
-        end_index = -1
-        
-        for i, line in enumerate(lines):
-            if "//mounted_addons_start" in line:
-                start_index = i
-            if "//mounted_addons_end" in line:
-                end_index = i
-        
-        if start_index == -1 or end_index == -1:
-            return False, tr("Failed to find addons block markers.")
-        
-        # Create lines to insert between markers
-        insert_lines = []
-        for vpk_path, title in addons_with_paths:
-            insert_lines.append(f'\t\t// {title}\n')
-            insert_lines.append(f'\t\tgame+mod\t\t"{vpk_path}"\n')
-            insert_lines.append('\n')
-        
         # Replace content between markers
-        new_lines = lines[:start_index + 1] + insert_lines + lines[end_index:]
+        plan = document.set_addons(addons_with_paths)
+        if plan is None:
+            return False, tr("Failed to find addons block markers.")
+        if plan['changed']:
+            game_folder = os.path.basename(os.path.dirname(os.path.abspath(gameinfo_path)))
+            log.info(tr("Addons changed in {}: {}").format(game_folder, describe_addon_edits(plan)))
         
         # Write modified file
-        with open(gameinfo_path, 'w', encoding='utf-8') as file:
-            file.writelines(new_lines)
+        if flush:
+            document.flush()
         
-
         return True, tr("Addons order updated")
         
     except Exception as e:
         log.error(f"Error updating addons order: {str(e)}")
-        return False, f"Error updating addons order: {str(e)}"
-
-def remove_existing_addons(lines):
-    """
-    Removes existing addons from list of strings (only between markers)
-    """
-    # Find indices of marker lines
-    start_index = -1
-    end_index = -1
-    
-    for i, line in enumerate(lines):
-        if "//mounted_addons_start" in line:
-            start_index = i
-        if "//mounted_addons_end" in line:
-            end_index = i
-    
-    # If markers found, remove only between them
-    if start_index != -1 and end_index != -1:
-        indices_to_remove = set()
-        i = start_index + 1
-        
-        while i < end_index:
-            line = lines[i]
-            # Look for addon comment lines
-            if line.strip().startswith('//') and i + 1 < len(lines) and 'game+mod' in lines[i + 1]:
-                indices_to_remove.add(i)    # Comment line
-                indices_to_remove.add(i + 1)  # Path line
-                # Check if there's an empty line after
-                if i + 2 < len(lines) and lines[i + 2].strip() == '':
-                    indices_to_remove.add(i + 2)
-            i += 1
-        
-        # Create new list without removed lines
-        return [line for i, line in enumerate(lines) if i not in indices_to_remove]
-    else:
-        # Old logic if no markers found
-        indices_to_remove = set()
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i]
-            if line.strip().startswith('//') and i + 1 < len(lines) and 'game+mod' in lines[i + 1]:
-                indices_to_remove.add(i)
-                indices_to_remove.add(i + 1)
-                if i + 2 < len(lines) and lines[i + 2].strip() == '':
-                    indices_to_remove.add(i + 2)
-            i += 1
-        
-        return [line for i, line in enumerate(lines) if i not in indices_to_remove]
\ No newline at end of file
+        return False, f"Error updating addons order: {str(e)}"
\ No newline at end of file
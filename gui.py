@@ -12,8 +12,12 @@ import gameinfo
 import addon_manager
 import config
 import path_utils
+import workshop_index
+import file_watcher
+import mount_pipeline
 from logger import log
 import concurrent.futures
+import threading
 from i18n import tr, translator
 import re
 import webbrowser
@@ -28,7 +32,8 @@ class AddonWorker(QThread):
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(str)
     
-    def __init__(self, url, hl2vr_path, hl2_path, is_collection=True, check_files=True, execute=False, prepared_data=None):
+    def __init__(self, url, hl2vr_path, hl2_path, is_collection=True, check_files=True, execute=False, prepared_data=None,
+                 map_check=False):
         super().__init__()
         self.url = url
         self.hl2vr_path = hl2vr_path
@@ -37,6 +42,7 @@ class AddonWorker(QThread):
         self.check_files = check_files
         self.execute = execute 
         self.prepared_data = prepared_data
+        self.map_check = map_check
     
     def run(self):
             try:
@@ -44,14 +50,10 @@ class AddonWorker(QThread):
                     # PREPARATION MODE
                     self.progress.emit(tr("Preparing data..."))
                     
-                    if self.is_collection:
-                        success, data, error_message = addon_manager.prepare_addons_for_embedding(
-                            self.url, self.hl2vr_path, self.hl2_path, self.check_files
-                        )
-                    else:
-                        success, data, error_message = addon_manager.prepare_single_addon_for_embedding(
-                            self.url, self.hl2vr_path, self.hl2_path, self.check_files
-                        )
+                    success, data, error_message = mount_pipeline.prepare(
+                        'collection' if self.is_collection else 'addon',
+                        self.url, self.hl2vr_path, self.hl2_path, self.check_files, self.map_check
+                    )
                     
                     self.prepared.emit(success, data, error_message)
                     
@@ -86,13 +88,14 @@ class WorkshopTxtWorker(QThread):
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(str)
     
-    def __init__(self, hl2vr_path, hl2_path, check_files=True, execute=False, prepared_data=None):
+    def __init__(self, hl2vr_path, hl2_path, check_files=True, execute=False, prepared_data=None, map_check=False):
         super().__init__()
         self.hl2vr_path = hl2vr_path
         self.hl2_path = hl2_path
         self.check_files = check_files
         self.execute = execute
         self.prepared_data = prepared_data
+        self.map_check = map_check
     
     def run(self):
             try:
@@ -100,8 +103,8 @@ class WorkshopTxtWorker(QThread):
                     # PREPARATION MODE - only get data for dialog
                     self.progress.emit(tr("Preparing data..."))
                     
-                    success, data, error_message = addon_manager.prepare_addons_from_workshop_txt(
-                        self.hl2vr_path, self.hl2_path, self.check_files
+                    success, data, error_message = mount_pipeline.prepare(
+                        'workshop_txt', self.hl2_path, self.hl2vr_path, self.hl2_path, self.check_files, self.map_check
                     )
                     
                     self.prepared.emit(success, data, error_message)
@@ -133,11 +136,12 @@ class MapExtractionWorker(QThread):
     progress = pyqtSignal(int, int, int, int, str)  # current_map, total_maps, current_file, total_files, status
     finished = pyqtSignal(bool, object)  # success, result
     
-    def __init__(self, gameinfo_path, current_addons, specific_addons=None):
+    def __init__(self, gameinfo_path, current_addons, specific_addons=None, selective=None):
         super().__init__()
         self.gameinfo_path = gameinfo_path
         self.current_addons = current_addons
         self.specific_addons = specific_addons
+        self.selective = selective
         self._is_cancelled = False
     
     def cancel(self):
@@ -160,7 +164,8 @@ class MapExtractionWorker(QThread):
                 self.gameinfo_path, 
                 self.current_addons,
                 progress_callback,
-                self.specific_addons
+                self.specific_addons,
+                selective=self.selective
             )
             
             # If cancellation occurred, return special result
@@ -172,6 +177,95 @@ class MapExtractionWorker(QThread):
         except Exception as e:
             self.finished.emit(False, f"An unexpected error occurred during map extraction:\n{str(e)}")
 
+class MapCheckWorker(QThread):
+    """Map check thread: local VPK indexes, then Steam pages of the rest through async resolver"""
+    progress = pyqtSignal(int, int, str)  # done, total, addon title
+    finished = pyqtSignal(bool, object)  # success, {id: is_map} or None if cancelled
+    
+    def __init__(self, addons, refresh=False):
+        super().__init__()
+        self.addons = addons
+        self.refresh = refresh
+        self._is_cancelled = False
+    
+    def cancel(self):
+        self._is_cancelled = True
+    
+    def is_cancelled(self):
+        return self._is_cancelled
+    
+    def run(self):
+        try:
+            def progress_callback(addon, done, total):
+                if self.is_cancelled():
+                    return False
+                self.progress.emit(done, total, addon['title'])
+                return True
+            
+            is_map_by_id = addon_manager.classify_map_addons(self.addons, self.refresh, progress_callback)
+            self.finished.emit(True, None if self.is_cancelled() else is_map_by_id)
+        
+        except Exception as e:
+            log.error(tr("Error checking maps: {}").format(str(e)))
+            self.finished.emit(False, None)
+
+class OrderSaveWorker(QThread):
+    """
+    Write-behind of addons order: runs for the whole session and writes orders submitted
+    by GUI. Only the latest order is kept while a write is in progress, so a stream
+    of moves results in one write of the final order
+    """
+    saved = pyqtSignal(bool, str, bool, str)  # success, message, sync_success, sync_message
+    
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._stopping = False
+    
+    def submit(self, gameinfo_path, addons_with_paths, episode_paths=None, hl2vr_path=None):
+        """Queues order for writing, replacing order that was not written yet"""
+        with self._condition:
+            self._pending = (gameinfo_path, list(addons_with_paths), episode_paths, hl2vr_path)
+            self._condition.notify_all()
+    
+    def is_idle(self):
+        with self._condition:
+            return self._pending is None and not self._busy
+    
+    def flush(self):
+        """Waits until queued order is written"""
+        with self._condition:
+            while self._pending is not None or self._busy:
+                self._condition.wait()
+    
+    def stop(self):
+        """Writes queued order and stops the thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self.wait()
+    
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopping:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                request = self._pending
+                self._pending = None
+                self._busy = True
+            
+            try:
+                result = gameinfo.write_addons_order(*request)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+            self.saved.emit(*result)
+
 class CheckBoxTableWidgetItem(QTableWidgetItem):
     def __init__(self, checked=False):
         super().__init__()
@@ -468,15 +562,28 @@ class MainWindow(QMainWindow):
         language = self.app_config.get("language", "en")
         translator.set_language(language)
 
-        self.init_ui()
-
-        self.load_config()
-        
         # Adding a timer for delayed saving
         self.save_timer = QTimer()
         self.save_timer.setSingleShot(True)
         self.save_timer.timeout.connect(self.save_addons_order)
         
+        # Order changes are written from background thread
+        self.order_writer = OrderSaveWorker()
+        self.order_writer.saved.connect(self.on_addons_order_saved)
+        self.order_writer.start()
+        # Operations waiting for order write to finish
+        self._after_order_saved = []
+        
+        # External changes of gameinfo files and workshop folder update the list
+        self.missing_addon_paths = set()
+        self.files_watcher = file_watcher.GameFilesWatcher(self)
+        self.files_watcher.gameinfo_changed.connect(self.on_gameinfo_file_changed)
+        self.files_watcher.workshop_changed.connect(self.on_workshop_folder_changed)
+
+        self.init_ui()
+
+        self.load_config()
+        
     def load_icon(self):
         possible_paths = [
             "icon.ico",
@@ -624,6 +731,18 @@ class MainWindow(QMainWindow):
         self.auto_check_maps_checkbox.stateChanged.connect(self.on_auto_check_maps_changed)
         left_layout.addWidget(self.auto_check_maps_checkbox)
 
+        # Checkbox for extracting only map files (VPK is mounted alongside)
+        self.selective_extraction_checkbox = QCheckBox(tr("Extract only map files"))
+        self.selective_extraction_checkbox.setToolTip(tr("Only maps folder is extracted, other files are loaded from addon VPK"))
+        self.selective_extraction_checkbox.stateChanged.connect(self.on_selective_extraction_changed)
+        left_layout.addWidget(self.selective_extraction_checkbox)
+
+        # Checkbox for working without Steam: cache and local files only
+        self.offline_mode_checkbox = QCheckBox(tr("Offline mode"))
+        self.offline_mode_checkbox.setToolTip(tr("Titles and map checks come from cache and installed files, Steam is not contacted"))
+        self.offline_mode_checkbox.stateChanged.connect(self.on_offline_mode_changed)
+        left_layout.addWidget(self.offline_mode_checkbox)
+
         # Separator
         separator2 = QFrame()
         separator2.setFrameShape(QFrame.HLine)
@@ -1021,6 +1140,9 @@ class MainWindow(QMainWindow):
         language = app_config.get("language", "en")
         translator.set_language(language)
 
+        offline_mode = app_config.get("offline_mode", False)
+        workshop.configure_session(backend=app_config.get("metadata_backend", "api"), offline=offline_mode)
+
         # Update language combobox
         current_index = self.language_combo.findData(language)
         if current_index >= 0:
@@ -1038,6 +1160,11 @@ class MainWindow(QMainWindow):
         auto_check_maps = app_config.get("auto_check_maps", True)
         self.auto_check_maps_checkbox.setChecked(auto_check_maps)
         
+        selective_extraction = app_config.get("selective_map_extraction", False)
+        self.selective_extraction_checkbox.setChecked(selective_extraction)
+        
+        self.offline_mode_checkbox.setChecked(offline_mode)
+        
         embed_episodes = app_config.get("embed_into_episodes", True)
         self.embed_episodes_checkbox.setChecked(embed_episodes)
 
@@ -1056,7 +1183,9 @@ class MainWindow(QMainWindow):
             self.check_files_checkbox.isChecked(),
             self.auto_check_maps_checkbox.isChecked(),
             self.embed_episodes_checkbox.isChecked(),
-            translator.current_language
+            translator.current_language,
+            self.selective_extraction_checkbox.isChecked(),
+            self.offline_mode_checkbox.isChecked()
         )
 
     def on_language_changed(self):
@@ -1128,14 +1257,20 @@ class MainWindow(QMainWindow):
         if not hl2vr_path:
             return
         
+        # Do not read order that is still being written
+        self.flush_addons_order()
+        
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         
         if not os.path.exists(gameinfo_path):
             return
         
         try:
+            # Read gameinfo.txt once for markers check and addons list
+            document = gameinfo.GameinfoDocument(gameinfo_path)
+            
             # Check markers
-            marker_status = addon_manager.validate_addon_markers(gameinfo_path)
+            marker_status = addon_manager.validate_addon_markers(gameinfo_path, document)
             
             if marker_status == "missing_start":
                 QMessageBox.warning(self, tr("Warning"), 
@@ -1153,13 +1288,17 @@ class MainWindow(QMainWindow):
                 success, message = addon_manager.add_addon_markers(
                     gameinfo_path,
                     hl2vr_path,  # or self.hl2vr_entry.text().strip()
-                    self.hl2_entry.text().strip()
+                    self.hl2_entry.text().strip(),
+                    document
                 )
+                document.flush()
 
-            self.current_addons = addon_manager.read_addons_from_gameinfo(gameinfo_path)
+            self.current_addons = document.addons()
             self.update_addons_table()
                 
             self.update_toggle_button_state()
+            self.update_missing_state()
+            self.update_watched_paths()
         
         except Exception as e:
             QMessageBox.critical(self, tr("Error"), f"Error loading addons list:\n{str(e)}")
@@ -1189,13 +1328,10 @@ class MainWindow(QMainWindow):
             
             # Add each addon in gameinfo.txt format
             for addon in self.current_addons:
-                content += f"\t\t// {addon['title']}\n"
-                content += f'\t\tgame+mod\t\t"{addon["path"]}"\n'
-                content += "\n"
+                content += ''.join(addon_manager.format_addon_lines(addon['path'], addon['title']))
             
             # Save to file
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(content)
+            path_utils.atomic_write_text(file_path, content)
             
             log.info(tr("List of {} addons successfully saved").format(len(self.current_addons)))
             QMessageBox.information(self, tr("Success"), tr("Addons list successfully saved!"))
@@ -1219,16 +1355,14 @@ class MainWindow(QMainWindow):
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         
         # Reverse order using addon_manager
-        success, message = addon_manager.reverse_addons_order(gameinfo_path)
+        success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+            gameinfo_path, lambda document: addon_manager.reverse_addons_order(gameinfo_path, document))
         
         if success:
             # Update local list
             self.current_addons.reverse()
             self.fast_table_update()
             
-            # Sync with episodes
-            sync_success, sync_message = self.sync_episodes_with_main()
-            
             if not sync_success:
                 log.warning(tr("Addons reversed but episode sync failed: {}").format(sync_message))
 
@@ -1290,8 +1424,12 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, tr("Error"), tr("gameinfo.txt not found"))
                 return
             
+            # Read gameinfo.txt once, all changes are written together
+            self.flush_addons_order()
+            document = gameinfo.GameinfoDocument(gameinfo_path)
+            
             # Check markers in gameinfo.txt
-            marker_status = addon_manager.validate_addon_markers(gameinfo_path)
+            marker_status = addon_manager.validate_addon_markers(gameinfo_path, document)
             
             if marker_status == "missing_start":
                 QMessageBox.critical(self, tr("Error"), 
@@ -1308,49 +1446,28 @@ class MainWindow(QMainWindow):
                 success, message = addon_manager.add_addon_markers(
                     gameinfo_path,
                     hl2vr_path,
-                    self.hl2_entry.text().strip()
+                    self.hl2_entry.text().strip(),
+                    document
                 )
                 if not success:
                     QMessageBox.critical(self, tr("Error"), 
                                     tr("Failed to add markers to gameinfo.txt: ") + message)
                     return
             
-            # Read current gameinfo.txt
-            with open(gameinfo_path, 'r', encoding='utf-8') as file:
-                gameinfo_content = file.read()
-            
-            # Find marker positions
-            start_index = gameinfo_content.find("//mounted_addons_start")
-            end_index = gameinfo_content.find("//mounted_addons_end")
-            
-            if start_index == -1 or end_index == -1:
+            # Replace block between markers
+            if not document.set_block_text(addons_content):
                 QMessageBox.critical(self, tr("Error"), tr("Failed to find addons block markers in gameinfo.txt"))
                 return
             
-            # Replace block between markers
-            end_index += len("//mounted_addons_end")
-            
-            new_content = (
-                gameinfo_content[:start_index] + 
-                "//mounted_addons_start\n" + 
-                addons_content + 
-                "\t\t//mounted_addons_end" + 
-                gameinfo_content[end_index:]
-            )
-            
-            # Save updated gameinfo.txt
-            with open(gameinfo_path, 'w', encoding='utf-8') as file:
-                file.write(new_content)
+            # Save updated gameinfo.txt together with episodes
+            sync_success, sync_message = self.commit_with_episodes(document)
             
             # Update addons list in interface
             self.load_addons_list()
             
-            # Sync with episodes
-            if self.embed_episodes_checkbox.isChecked():
-                sync_success, sync_message = self.sync_episodes_with_main()
-                if not sync_success:
-                    QMessageBox.warning(self, tr("Warning"), 
-                                    tr("List loaded, but failed to sync with episodes: ") + sync_message)
+            if not sync_success:
+                QMessageBox.warning(self, tr("Warning"), 
+                                tr("List loaded, but failed to sync with episodes: ") + sync_message)
             
             log.info(tr("Addons list successfully loaded from file"))
             QMessageBox.information(self, tr("Success"), tr("Addons list successfully loaded!"))
@@ -1443,11 +1560,12 @@ class MainWindow(QMainWindow):
             hl2vr_path, 
             hl2_path, 
             check_files, 
-            execute=False  # Only preparation, not execution
+            execute=False,  # Only preparation, not execution
+            map_check=self.auto_check_maps_checkbox.isChecked()  # Maps are classified for check after mounting
         )
         self.preparation_worker.prepared.connect(self.on_workshop_txt_prepared)
         self.preparation_worker.progress.connect(self.status_label.setText)
-        self.preparation_worker.start()
+        self.run_after_order_saved(self.preparation_worker.start)
 
     def embed_addons(self, url, is_collection=True):
         """Main function for mounting addons (collections or single) - NEW VERSION"""
@@ -1485,12 +1603,13 @@ class MainWindow(QMainWindow):
         
         # Start worker in PREPARATION mode
         self.preparation_worker = AddonWorker(
-            url, hl2vr_path, hl2_path, is_collection, check_files, execute=False
+            url, hl2vr_path, hl2_path, is_collection, check_files, execute=False,
+            map_check=self.auto_check_maps_checkbox.isChecked()  # Maps are classified for check after mounting
         )
         self.preparation_worker.prepared.connect(lambda success, data, error: 
             self.on_addon_prepared(success, data, error, is_collection))
         self.preparation_worker.progress.connect(self.status_label.setText)
-        self.preparation_worker.start()
+        self.run_after_order_saved(self.preparation_worker.start)
 
 
     # === PREPARATION AND EXECUTION ===
@@ -1607,9 +1726,9 @@ class MainWindow(QMainWindow):
         self.execution_worker.progress.connect(self.status_label.setText)
         self.execution_worker.finished.connect(
             lambda success, message: 
-            self.on_execution_finished(success, message, source_type, is_collection)
+            self.on_execution_finished(success, message, source_type, is_collection, data.get('is_map_by_id'))
         )
-        self.execution_worker.start()
+        self.run_after_order_saved(self.execution_worker.start)
 
     def on_workshop_txt_prepared(self, success, data, error_message):
         """Handler for completion of data preparation"""
@@ -1681,13 +1800,14 @@ class MainWindow(QMainWindow):
         self.execution_worker.progress.connect(self.status_label.setText)
         self.execution_worker.finished.connect(
             lambda success, message: 
-            self.on_execution_finished(success, message, 'workshop_txt', True)
+            self.on_execution_finished(success, message, 'workshop_txt', True, data.get('is_map_by_id'))
         )
-        self.execution_worker.start()
+        self.run_after_order_saved(self.execution_worker.start)
 
-    def on_execution_finished(self, success, message, source_type=None, is_collection=None):
+    def on_execution_finished(self, success, message, source_type=None, is_collection=None, is_map_by_id=None):
         """
         Universal handler for completion of addons mounting execution
+        is_map_by_id: maps classified during preparation, reused by automatic map check
         """
         # Enable all buttons
         self.embed_collection_btn.setEnabled(True)
@@ -1747,7 +1867,7 @@ class MainWindow(QMainWindow):
                 
                 # Start map check if count determined
                 if new_addons_count is not None:
-                    self.check_maps(new_addons_count)
+                    self.check_maps(new_addons_count, is_map_by_id=is_map_by_id)
                 else:
                     log.info(tr("Failed to determine number of new addons for check"))
             else:
@@ -1803,12 +1923,11 @@ class MainWindow(QMainWindow):
         
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         
-        success, message = addon_manager.remove_addons_from_gameinfo(gameinfo_path, addon_ids)
+        # Removal is written to main gameinfo.txt and episodes together
+        success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+            gameinfo_path, lambda document: addon_manager.remove_addons_from_gameinfo(gameinfo_path, addon_ids, document))
         
         if success:
-            # SYNC REMOVAL WITH EPISODES
-            sync_success, sync_message = self.sync_episodes_with_main()
-            
             main_message = tr("Addons successfully removed!")
             if not sync_success:
                 main_message += tr("\nWarning: ") + sync_message
@@ -1848,12 +1967,11 @@ class MainWindow(QMainWindow):
         
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         
-        success, message = addon_manager.remove_addons_from_gameinfo(gameinfo_path, all_addon_ids)
+        # Removal is written to main gameinfo.txt and episodes together
+        success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+            gameinfo_path, lambda document: addon_manager.remove_addons_from_gameinfo(gameinfo_path, all_addon_ids, document))
         
         if success:
-            # SYNC REMOVAL WITH EPISODES
-            sync_success, sync_message = self.sync_episodes_with_main()
-            
             main_message = tr("All addons successfully removed!")
             if not sync_success:
                 main_message += tr("\nWarning: ") + sync_message
@@ -1885,10 +2003,12 @@ class MainWindow(QMainWindow):
         
         log.info(tr("Checking files..."))
         
-        # Check files existence
+        # Check files existence, addons in workshop folder are answered from one scan
+        workshop_path = path_utils.get_workshop_path(self.hl2_entry.text().strip())
+        exists = workshop_index.get_index(workshop_path).exists if workshop_path else os.path.exists
         missing_addons = []
         for addon in self.current_addons:
-            if not os.path.exists(addon['path']):
+            if not exists(addon['path']):
                 missing_addons.append(addon)
         
         if not missing_addons:
@@ -1921,12 +2041,11 @@ class MainWindow(QMainWindow):
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         addon_ids = [addon['id'] for addon in missing_addons]
         
-        success, message = addon_manager.remove_addons_from_gameinfo(gameinfo_path, addon_ids)
+        # Removal is written to main gameinfo.txt and episodes together
+        success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+            gameinfo_path, lambda document: addon_manager.remove_addons_from_gameinfo(gameinfo_path, addon_ids, document))
         
         if success:
-            # SYNC REMOVAL WITH EPISODES
-            sync_success, sync_message = self.sync_episodes_with_main()
-            
             main_message = tr("Addons with missing files removed!")
             if not sync_success:
                 main_message += tr("\nWarning: ") + sync_message
@@ -1938,9 +2057,10 @@ class MainWindow(QMainWindow):
             log.error(tr("Error removing missing addons: ") + message)
             QMessageBox.critical(self, tr("Error"), message)
 
-    def check_maps(self, new_addons_count=None, specific_addon=None):
+    def check_maps(self, new_addons_count=None, specific_addon=None, is_map_by_id=None):
         """
         Universal map checking function
+        is_map_by_id: classification from mount preparation, addons are classified again only if it misses some
         """
         hl2vr_path = self.hl2vr_entry.text().strip()
         
@@ -1952,6 +2072,11 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, tr("Information"), tr("No addons to check."))
             return
         
+        map_check_worker = getattr(self, 'map_check_worker', None)
+        if map_check_worker and map_check_worker.isRunning():
+            log.info(tr("Map check is already running"))
+            return
+        
         # DETERMINE WHICH ADDONS TO CHECK
         if specific_addon:
             addons_to_check = [specific_addon]
@@ -1968,6 +2093,12 @@ class MainWindow(QMainWindow):
         
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         
+        if is_map_by_id and all(addon['id'] in is_map_by_id for addon in addons_to_check):
+            log.info(tr("Maps were classified during mount preparation"))
+            self.on_map_check_classified(True, is_map_by_id, addons_to_check, check_type, specific_addon,
+                                         gameinfo_path, None)
+            return
+        
         # ADD PROGRESS BAR FOR MAP CHECKING
         progress = None
         if check_type in ["manual", "auto"] and len(addons_to_check) > 1:
@@ -1983,20 +2114,43 @@ class MainWindow(QMainWindow):
 
             progress.setWindowFlags(progress.windowFlags() | Qt.MSWindowsFixedSizeDialogHint)
 
+        # Local VPK indexes and Steam pages are checked in worker thread, GUI stays responsive
+        # Single addon check is requested explicitly, so bypass metadata cache
+        self.map_check_worker = MapCheckWorker(addons_to_check, refresh=(check_type == "single"))
+        if progress:
+            def report_classified(done, total, title):
+                progress.setValue(done)
+                progress.setLabelText(tr("Checking addon {} of {}: {}").format(done, total, title))
+            self.map_check_worker.progress.connect(report_classified)
+            progress.canceled.connect(self.map_check_worker.cancel)
+        self.map_check_worker.finished.connect(lambda success, is_map_by_id: self.on_map_check_classified(
+            success, is_map_by_id, addons_to_check, check_type, specific_addon, gameinfo_path, progress))
+        self.map_check_worker.start()
+
+    def on_map_check_classified(self, success, is_map_by_id, addons_to_check, check_type, specific_addon,
+                                gameinfo_path, progress):
+        """Checks local files of found maps and shows result of map check"""
+        if not success or is_map_by_id is None:
+            if progress:
+                progress.close()
+            if success:
+                log.info(tr("Map check cancelled by user"))
+            else:
+                QMessageBox.critical(self, tr("Error"), tr("Failed to check addons for maps"))
+            return
+
         # MULTITHREADED MAP CHECKING
         map_addons = []
         maps_to_extract = []
         maps_already_extracted = []
         needs_path_update = False
+        selective = config.load_config().get("selective_map_extraction", False)
         
-        # Function to check single addon
+        # Function to check files of single addon
         def check_single_addon(addon):
-            """Checks single addon for map presence"""
+            """Checks local files of addon if it is a map"""
             try:
-                addon_url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={addon['id']}"
-                is_map = workshop.is_addon_map(addon_url)
-                
-                if not is_map:
+                if not is_map_by_id.get(addon['id']):
                     return None
                     
                 # If it's a map, check local files
@@ -2026,8 +2180,20 @@ class MainWindow(QMainWindow):
                     except:
                         folder_exists = False
                 
+                # Folder left by cancelled or failed extraction is kept with its manifest and resumed
+                if vpk_exists and folder_exists:
+                    extraction_complete = addon_manager.is_extraction_complete(vpk_path, folder_path, selective)
+                    # Folder complete in other mode stays mounted until extraction converts it,
+                    # folder extracted by older version has no manifest, extraction only records it
+                    folder_usable = (extraction_complete
+                                     or addon_manager.is_extraction_complete(vpk_path, folder_path, not selective)
+                                     or not os.path.exists(addon_manager.get_manifest_path(folder_path)))
+                else:
+                    extraction_complete = folder_exists
+                    folder_usable = folder_exists
+                
                 # Determine if paths and titles need updating
-                should_have_folder_path = folder_exists or not vpk_exists
+                should_have_folder_path = folder_usable or not vpk_exists
                 should_have_map_prefix = not current_title.startswith("MAP   |   ")
                 
                 needs_update_for_this_addon = False
@@ -2036,6 +2202,10 @@ class MainWindow(QMainWindow):
                     # Path should point to folder but points to VPK
                     addon['path'] = folder_path
                     needs_update_for_this_addon = True
+                elif not should_have_folder_path and current_path != vpk_path:
+                    # Partial folder is not mounted until extraction completes
+                    addon['path'] = vpk_path
+                    needs_update_for_this_addon = True
                 
                 if should_have_map_prefix:
                     # Need to add MAP prefix
@@ -2045,7 +2215,7 @@ class MainWindow(QMainWindow):
                 return {
                     'addon': addon,
                     'vpk_exists': vpk_exists,
-                    'folder_exists': folder_exists,
+                    'extraction_complete': extraction_complete,
                     'vpk_path': vpk_path,
                     'folder_path': folder_path,
                     'needs_update': needs_update_for_this_addon
@@ -2056,25 +2226,14 @@ class MainWindow(QMainWindow):
                 return None
         
         # Use ThreadPoolExecutor for parallel checking
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workshop.MAX_WORKERS) as executor:
             # Start all tasks
             future_to_addon = {executor.submit(check_single_addon, addon): addon for addon in addons_to_check}
             
             # Process results as they complete
-            for i, future in enumerate(concurrent.futures.as_completed(future_to_addon), 1):
+            for future in concurrent.futures.as_completed(future_to_addon):
                 addon = future_to_addon[future]
                 
-                # Update progress bar if exists
-                if progress:
-                    progress.setValue(i)
-                    progress.setLabelText(tr("Checking addon {} of {}: {}").format(i, len(addons_to_check), addon['title']))
-                    QApplication.processEvents()
-                    
-                    if progress.wasCanceled():
-                        progress.close()
-                        log.info(tr("Map check cancelled by user"))
-                        return
-                
                 try:
                     result = future.result()
                     if result is None:
@@ -2083,9 +2242,9 @@ class MainWindow(QMainWindow):
                     map_addons.append(result['addon'])
                     
                     # Determine if extraction needed
-                    if result['vpk_exists'] and not result['folder_exists']:
+                    if result['vpk_exists'] and not result['extraction_complete']:
                         maps_to_extract.append(result['addon'])
-                    elif result['folder_exists'] or not result['vpk_exists']:
+                    else:
                         maps_already_extracted.append(result['addon'])
                     
                     if result['needs_update']:
@@ -2244,26 +2403,28 @@ class MainWindow(QMainWindow):
             self.extraction_progress.show()
             
             # Start extraction
+            # Same mode as map check, so maps extracted in other mode are converted
+            selective = config.load_config().get("selective_map_extraction", False)
             self.map_extraction_worker = MapExtractionWorker(gameinfo_path, self.current_addons, 
-                                                        specific_addons=maps_to_extract)
+                                                        specific_addons=maps_to_extract, selective=selective)
             self.map_extraction_worker.progress.connect(self.update_extraction_progress)
             self.map_extraction_worker.finished.connect(self.on_map_extraction_finished)
             
             # Connect cancellation in progress dialog with cancellation in worker
             self.extraction_progress.canceled.connect(self.map_extraction_worker.cancel)
             
-            self.map_extraction_worker.start()
+            self.run_after_order_saved(self.map_extraction_worker.start)
         else:
             log.info(tr("Map extraction not required or cancelled by user"))
 
     def update_gameinfo_paths(self, gameinfo_path):
         """Updates map paths and titles in gameinfo.txt"""
         addons_with_paths = [(addon['path'], addon['title']) for addon in self.current_addons]
-        success, message = gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths)
+        success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+            gameinfo_path, lambda document: gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths, document),
+            addons_with_paths)
         
         if success:
-            # Sync with episodes
-            self.sync_episodes_with_main(addons_with_paths)
             self.load_addons_list()  # Update table
             
             log.info(tr("Map paths and titles updated in gameinfo.txt"))
@@ -2337,7 +2498,7 @@ class MainWindow(QMainWindow):
         self.save_timer.start(300)
 
     def save_addons_order(self):
-        """Saves current addons order to gameinfo.txt"""
+        """Queues current addons order for writing to gameinfo.txt and episodes"""
         if not self.current_addons:
             return
         
@@ -2347,34 +2508,49 @@ class MainWindow(QMainWindow):
         
         gameinfo_path = os.path.join(hl2vr_path, "hlvr", "gameinfo.txt")
         
-        try:
-            # Form addons list in current order
-            addons_with_paths = []
-            for addon in self.current_addons:
-                addons_with_paths.append((addon['path'], addon['title']))
-            
-            
-            # Save new order to main gameinfo
-            success, message = gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths)
-            
-            if success:
-                # SYNC ORDER WITH EPISODES
-                sync_success, sync_message = self.sync_episodes_with_main(addons_with_paths)
+        # Form addons list in current order
+        addons_with_paths = [(addon['path'], addon['title']) for addon in self.current_addons]
+        
+        # Episodes are read in background thread, only their paths are taken from GUI
+        episode_paths = self.get_episode_gameinfo_paths() if self.embed_episodes_checkbox.isChecked() else None
+        
+        self.order_writer.submit(gameinfo_path, addons_with_paths, episode_paths, hl2vr_path)
 
-                if not sync_success:
-                    self.status_label.setText(tr("Order updated, but: {}").format(sync_message))
-                    log.warning(tr("Order saved, but episode sync failed: {}").format(sync_message))
-            else:
-                log.error(tr("Error saving addons order: ") + message)
-                QMessageBox.critical(self, tr("Error"), tr("Error saving order: {}").format(message))
-                # In case of error, reload list from file
-                self.load_addons_list()
-                
-        except Exception as e:
-            log.error(tr("Error saving addons order: ") + str(e))
-            QMessageBox.critical(self, tr("Error"), tr("Error saving order: {}").format(str(e)))
+    def on_addons_order_saved(self, success, message, sync_success, sync_message):
+        if success:
+            if not sync_success:
+                self.status_label.setText(tr("Order updated, but: {}").format(sync_message))
+                log.warning(tr("Order saved, but episode sync failed: {}").format(sync_message))
+        else:
+            log.error(tr("Error saving addons order: ") + message)
+            QMessageBox.critical(self, tr("Error"), tr("Error saving order: {}").format(message))
             # In case of error, reload list from file
             self.load_addons_list()
+        
+        if self.order_writer.is_idle():
+            actions, self._after_order_saved = self._after_order_saved, []
+            for action in actions:
+                action()
+
+    def flush_addons_order(self):
+        """
+        Writes order change waiting for timer now and waits until it is on disk
+        Only for code that reads gameinfo.txt right away, workers use run_after_order_saved
+        """
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self.save_addons_order()
+        self.order_writer.flush()
+
+    def run_after_order_saved(self, action):
+        """Calls action once order change is on disk, without blocking GUI thread"""
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self.save_addons_order()
+        if self.order_writer.is_idle():
+            action()
+        else:
+            self._after_order_saved.append(action)
 
     def start_delay_timer(self, delay_timer):
         delay_timer.start(300)
@@ -2426,6 +2602,7 @@ class MainWindow(QMainWindow):
         
         # ALWAYS APPLY SEARCH HIGHLIGHTING WHEN UPDATING TABLE
         self.highlight_matching_addons(self.search_entry.text())
+        self.apply_missing_marks()
         
         # Update status
         if not self.search_entry.text():
@@ -2480,6 +2657,7 @@ class MainWindow(QMainWindow):
         # Restore search highlighting
         if self.search_entry.text():
             self.highlight_matching_addons(self.search_entry.text())
+        self.apply_missing_marks()
 
     def update_toggle_button_state(self):
         checked_addons = self.get_checked_addons()
@@ -2719,11 +2897,24 @@ class MainWindow(QMainWindow):
             log.error(tr("Error syncing with episodes: ") + message)
             QMessageBox.critical(self, tr("Error"), message)
 
+    def prepare_episode_documents(self, main_addons_with_paths):
+        """
+        Opens episode gameinfo files and applies addons list of main gameinfo in memory
+        Returns tuple (success, message, list of edited GameinfoDocument)
+        """
+        hl2vr_path = self.hl2vr_entry.text().strip()
+        if not hl2vr_path:
+            return False, tr("Half-Life 2 VR path not specified"), []
+        
+        return gameinfo.prepare_episode_documents(self.get_episode_gameinfo_paths(), main_addons_with_paths, hl2vr_path)
+
     def sync_episodes_with_main(self, main_addons_with_paths=None):
-        """Syncs addons in episodes with main gameinfo"""
+        """Syncs addons in episodes with main gameinfo, all episodes are written in one transaction"""
         if not self.embed_episodes_checkbox.isChecked():
             return True, tr("Sync with episodes disabled")
         
+        self.flush_addons_order()
+        
         try:
             hl2vr_path = self.hl2vr_entry.text().strip()
             if not hl2vr_path:
@@ -2735,46 +2926,70 @@ class MainWindow(QMainWindow):
                 current_addons = addon_manager.read_addons_from_gameinfo(main_gameinfo_path)
                 main_addons_with_paths = [(addon['path'], addon['title']) for addon in current_addons]
             
-            episode_paths = self.get_episode_gameinfo_paths()
-            
-            if not episode_paths:
-                return False, tr("Episodes not installed")
-            
             log.info(tr("Syncing with Episodes..."))
             
-            synced_count = 0
+            success, message, documents = self.prepare_episode_documents(main_addons_with_paths)
+            if not success:
+                return False, message
             
-            for episode_path in episode_paths:
-                episode_name = os.path.basename(os.path.dirname(episode_path))
-                
-                # Check markers
-                marker_status = addon_manager.validate_addon_markers(episode_path)
-                
-                if marker_status == "missing_start":
-                    return False, tr("{}: End marker of addons block (//mounted_addons_end) found, but start marker is missing!\n\nRemove the addons list with marker from gameinfo.txt, or add //mounted_addons_start to the beginning of the list.").format(episode_name)
-            
-                elif marker_status == "missing_end":
-                    return False, tr("{}: Start marker of addons block (//mounted_addons_start) found, but end marker is missing!\n\nRemove the addons list with marker from gameinfo.txt, or add //mounted_addons_end to the end of addons list in gameinfo.txt.").format(episode_name)
-                elif marker_status == "no_markers":
-                    # Add markers on first use
-                    success, message = addon_manager.add_addon_markers(episode_path, hl2vr_path)
-                    if not success:
-                        return False, tr("Failed to add markers to {}: {}").format(episode_name, message)
-                
-                # Update addons list in episode
-                success, message = gameinfo.update_gameinfo_order(episode_path, main_addons_with_paths)
-                if not success:
-                    return False, tr("Error syncing with {}: {}").format(episode_name, message)
-                
-                synced_count += 1
+            gameinfo.commit_documents(documents)
             
-            log.info(tr("Sync completed: {} episodes updated").format(synced_count))
-            return True, tr("Synced with Episodes")
+            log.info(tr("Sync completed: {} episodes updated").format(len(documents)))
+            return True, message
         
         except Exception as e:
             log.error(tr("Error syncing with episodes: ") + str(e))
             return False, tr("Error syncing with episodes: {}").format(str(e))
 
+    def commit_with_episodes(self, main_document, main_addons_with_paths=None):
+        """
+        Syncs episodes with edited main gameinfo.txt and writes all files in one transaction,
+        so a failed write cannot leave the games with different addon lists
+        Episodes that cannot be synced (e.g. corrupted markers) do not block the main file
+        Raises exception if files could not be written (none of them is changed then)
+        Returns tuple (sync success, sync message)
+        """
+        episode_documents = []
+        sync_success, sync_message = True, tr("Sync with episodes disabled")
+        
+        if self.embed_episodes_checkbox.isChecked():
+            if main_addons_with_paths is None:
+                main_addons_with_paths = [(addon['path'], addon['title']) for addon in main_document.addons()]
+            
+            log.info(tr("Syncing with Episodes..."))
+            try:
+                sync_success, sync_message, episode_documents = self.prepare_episode_documents(main_addons_with_paths)
+            except Exception as e:
+                log.error(tr("Error syncing with episodes: ") + str(e))
+                sync_success, sync_message = False, tr("Error syncing with episodes: {}").format(str(e))
+        
+        gameinfo.commit_documents([main_document] + episode_documents)
+        
+        if episode_documents:
+            log.info(tr("Sync completed: {} episodes updated").format(len(episode_documents)))
+        return sync_success, sync_message
+
+    def write_gameinfo_with_episodes(self, gameinfo_path, edit, main_addons_with_paths=None):
+        """
+        Applies edit to main gameinfo.txt in memory and writes it together with episodes
+        edit: function(document) returning tuple (success, message)
+        Returns tuple (success, message, sync success, sync message)
+        """
+        self.flush_addons_order()
+        
+        try:
+            document = gameinfo.GameinfoDocument(gameinfo_path)
+            success, message = edit(document)
+            if not success:
+                return False, message, True, ""
+            
+            sync_success, sync_message = self.commit_with_episodes(document, main_addons_with_paths)
+            return True, message, sync_success, sync_message
+        
+        except Exception as e:
+            log.error(tr("Error writing gameinfo.txt: {}").format(str(e)))
+            return False, tr("Error writing gameinfo.txt: {}").format(str(e)), True, ""
+
     def get_episode_gameinfo_paths(self):
         hl2vr_path = self.hl2vr_entry.text().strip()
         if not hl2vr_path:
@@ -2862,6 +3077,7 @@ class MainWindow(QMainWindow):
 
     def on_hl2vr_path_changed(self):
         self.update_episodes_checkbox_availability(force_enable=False)
+        self.update_watched_paths()
         self.save_config()
 
     def on_url_change(self):
@@ -2873,11 +3089,121 @@ class MainWindow(QMainWindow):
     def on_auto_check_maps_changed(self, state):
         self.save_config()
 
+    def on_selective_extraction_changed(self, state):
+        self.save_config()
+
+    def on_offline_mode_changed(self, state):
+        workshop.configure_session(offline=self.offline_mode_checkbox.isChecked())
+        self.save_config()
+
     def on_embed_episodes_changed(self, state):
         self.save_config()
 
 
 
+    # === FILE WATCHING ===
+
+
+
+    def update_watched_paths(self):
+        """Watches gameinfo files of current game paths, workshop folder and folders of mounted addons"""
+        hl2vr_path = self.hl2vr_entry.text().strip()
+        gameinfo_paths = []
+        if hl2vr_path:
+            gameinfo_paths.append(os.path.join(hl2vr_path, "hlvr", "gameinfo.txt"))
+            gameinfo_paths.extend(self.get_episode_gameinfo_paths())
+        
+        workshop_path = path_utils.get_workshop_path(self.hl2_entry.text().strip())
+        self.files_watcher.watch([path for path in gameinfo_paths if os.path.exists(path)], workshop_path)
+        self.files_watcher.watch_addons([addon['id'] for addon in self.current_addons if addon.get('id')])
+
+    def on_gameinfo_file_changed(self, path):
+        """Applies external edits of gameinfo.txt to addons list without full reload"""
+        # Pending order write brings the file to the state of the list anyway
+        if self.save_timer.isActive() or not self.order_writer.is_idle():
+            return
+        
+        try:
+            document = gameinfo.GameinfoDocument(path)
+            if document.marker_status() != "ok":
+                return
+            addons = document.addons()
+        except Exception as e:
+            log.warning(tr("Failed to read changed gameinfo.txt: {}").format(str(e)))
+            return
+        
+        current = [(addon['path'], addon['title']) for addon in self.current_addons]
+        if [(addon['path'], addon['title']) for addon in addons] == current:
+            return
+        
+        main_gameinfo_path = os.path.join(self.hl2vr_entry.text().strip(), "hlvr", "gameinfo.txt")
+        if os.path.normcase(os.path.abspath(path)) != os.path.normcase(os.path.abspath(main_gameinfo_path)):
+            # Episodes are not shown in the list, only report that they are out of sync
+            if self.embed_episodes_checkbox.isChecked():
+                log.warning(tr("Addons in {} differ from main list, sync with episodes to fix").format(
+                    os.path.basename(os.path.dirname(path))))
+            return
+        
+        log.info(tr("gameinfo.txt was changed by another program, addons list updated"))
+        
+        known_paths = {addon_path for addon_path, title in current}
+        same_rows = len(addons) == len(self.current_addons)
+        self.current_addons = addons
+        if same_rows:
+            self.fast_table_update()
+        else:
+            self.update_addons_table()
+        self.update_toggle_button_state()
+        self.files_watcher.watch_addons([addon['id'] for addon in addons if addon.get('id')])
+        
+        # Only addons new to the list need file check
+        self.update_missing_state([addon['path'] for addon in addons if addon['path'] not in known_paths])
+
+    def on_workshop_folder_changed(self, addon_ids):
+        changed_ids = set(addon_ids)
+        changed_paths = [addon['path'] for addon in self.current_addons if addon['id'] in changed_ids]
+        if not changed_paths:
+            return
+        
+        missing_before = len(self.missing_addon_paths)
+        # Watcher has just refreshed the index in its worker
+        self.update_missing_state(changed_paths, refresh_index=False)
+        if len(self.missing_addon_paths) != missing_before:
+            log.info(tr("Workshop folder changed: {} addons with missing files").format(len(self.missing_addon_paths)))
+
+    def update_missing_state(self, addon_paths=None, refresh_index=True):
+        """Checks files of given addons (all if None) using workshop index and marks missing ones in table"""
+        workshop_path = path_utils.get_workshop_path(self.hl2_entry.text().strip())
+        exists = workshop_index.get_index(workshop_path, refresh_index).exists if workshop_path else os.path.exists
+        
+        current_paths = {addon['path'] for addon in self.current_addons}
+        if addon_paths is None:
+            addon_paths = current_paths
+        self.missing_addon_paths &= current_paths
+        
+        for addon_path in addon_paths:
+            if exists(addon_path):
+                self.missing_addon_paths.discard(addon_path)
+            else:
+                self.missing_addon_paths.add(addon_path)
+        
+        self.apply_missing_marks()
+
+    def apply_missing_marks(self):
+        """Shows titles of addons with missing files in red"""
+        for row, addon in enumerate(self.current_addons):
+            title_item = self.addons_table.item(row, 1)
+            if title_item is None:
+                continue
+            if addon['path'] in self.missing_addon_paths:
+                title_item.setForeground(QColor(200, 0, 0))
+                title_item.setToolTip(tr("Addon file is missing"))
+            elif title_item.toolTip():
+                title_item.setData(Qt.ForegroundRole, None)
+                title_item.setToolTip("")
+
+
+
     # === CLICK HANDLERS ===
 
 
@@ -2888,7 +3214,7 @@ class MainWindow(QMainWindow):
                 addon_id = self.current_addons[row]['id']
                 if addon_id != tr("Unknown"):
                     
-                    url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={addon_id}"
+                    url = workshop.addon_url(addon_id)
                     webbrowser.open(url)
 
     def select_folder(self, entry_widget, title):
@@ -2988,12 +3314,10 @@ class MainWindow(QMainWindow):
                 return
             
             # Call clear function
-            success, message = addon_manager.clear_extracted_maps(workshop_path, gameinfo_path)
+            success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+                gameinfo_path, lambda document: addon_manager.clear_extracted_maps(workshop_path, gameinfo_path, document))
             
             if success:
-                # Sync with episodes
-                sync_success, sync_message = self.sync_episodes_with_main()
-                
                 main_message = tr("Maps cleared!\n{}").format(message)
                 if not sync_success:
                     log.warning(tr("Episode sync failed: {}").format(sync_message))
@@ -3019,7 +3343,7 @@ class MainWindow(QMainWindow):
             self.extraction_progress.setValue(overall_percent)
             self.extraction_progress.setLabelText(tr("Map {}/{}: {}").format(current_map, total_maps, status))
         else:
-            percent = int((current_map / total_maps) * 100)
+            percent = int((current_map / total_maps) * 100) if total_maps else 0
             self.extraction_progress.setValue(percent)
             self.extraction_progress.setLabelText(status)
         
@@ -3053,14 +3377,13 @@ class MainWindow(QMainWindow):
             
             # UPDATE GAMEINFO.TXT WITH UPDATED PATHS AND PREFIXES
             addons_with_paths = [(addon['path'], addon['title']) for addon in self.current_addons]
-            update_success, message = gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths)
+            update_success, message, sync_success, sync_message = self.write_gameinfo_with_episodes(
+                gameinfo_path, lambda document: gameinfo.update_gameinfo_order(gameinfo_path, addons_with_paths, document),
+                addons_with_paths)
             
             if update_success:
                 log.info(tr("Gameinfo.txt updated with new map paths"))
                 
-                # SYNC CHANGES WITH EPISODES
-                sync_success, sync_message = self.sync_episodes_with_main(addons_with_paths)
-                
                 self.load_addons_list()
         
         # Show results dialog (only if no cancellation)
@@ -3139,7 +3462,15 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, tr("Error"), tr("Failed to load help module: {}").format(e))
 
     def closeEvent(self, event):
+        map_check_worker = getattr(self, 'map_check_worker', None)
+        if map_check_worker and map_check_worker.isRunning():
+            map_check_worker.cancel()
+            map_check_worker.wait()
+        self.files_watcher.stop()
+        self.flush_addons_order()
+        self.order_writer.stop()
         self.save_config()
+        workshop.close_session()
         event.accept()
 
 
@@ -209,6 +209,7 @@ class HelpDialog(QDialog):
             <ul>
                 <li><strong>Проверять наличие файлов</strong> - аддоны с отсутствующими файлами будут пропускаться</li>
                 <li><strong>Проверять карты автоматически</strong> - см. вкладку "<b>Карты</b>"</li>
+                <li><strong>Распаковывать только файлы карт</strong> - распаковывается только папка maps, остальные файлы аддона подключаются из его VPK. Распаковка быстрее и занимает меньше места</li>
                 <li><strong>Синхронизировать с Эпизодами</strong> - сразу дублировать список аддонов в Episode 1 VR и Episode 2 VR при каких-либо изменениях</li>
             </ul>
 
@@ -240,6 +241,7 @@ class HelpDialog(QDialog):
             <ul>
                 <li><strong>Validate files</strong> - addons with missing files will be skipped</li>
                 <li><strong>Check maps automatically</strong> - see "<b>Maps</b>" tab</li>
+                <li><strong>Extract only map files</strong> - only the maps folder is extracted, other addon files are mounted from its VPK. Extraction is faster and uses less disk space</li>
                 <li><strong>Sync with Episodes</strong> - immediately duplicate the addon list in Episode 1 VR and Episode 2 VR when any changes are made</li>
             </ul>
 
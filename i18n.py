@@ -549,6 +549,62 @@ class Translator(QObject):
 "No addons to reverse": "Список аддонов пуст",
 "Addons order reversed": "Порядок аддонов изменен на обратный",
 
+"Failed to get workshop page {}: {}": "Не удалось получить страницу мастерской {}: {}",
+"Failed to open metadata cache, using memory: {}": "Не удалось открыть кэш метаданных, используется память: {}",
+"Metadata cache: {} from cache, {} downloaded": "Кэш метаданных: {} из кэша, {} загружено",
+"Failed to read VPK index {}: {}": "Не удалось прочитать индекс VPK {}: {}",
+"Unexpected end of VPK archive": "Неожиданный конец архива VPK",
+"File is not VPK (too short)": "Файл не является VPK (слишком короткий)",
+"File is not VPK (invalid signature)": "Файл не является VPK (неверная сигнатура)",
+"Unsupported VPK version: {}": "Неподдерживаемая версия VPK: {}",
+"Error parsing index (unterminated string)": "Ошибка разбора индекса (незавершенная строка)",
+"Error parsing index (truncated entry)": "Ошибка разбора индекса (обрезанная запись)",
+"Error parsing index (file is truncated)": "Ошибка разбора индекса (файл обрезан)",
+"Error parsing index (bad entry terminator)": "Ошибка разбора индекса (неверный terminator записи)",
+"Map already extracted": "Карта уже распакована",
+"Resuming map extraction: {} of {} files already extracted": "Продолжение распаковки карты: {} из {} файлов уже распаковано",
+"Extract only map files": "Распаковывать только файлы карт",
+"Only maps folder is extracted, other files are loaded from addon VPK": "Распаковывается только папка maps, остальные файлы загружаются из VPK аддона",
+"gameinfo.txt was changed by another program, reload it: {}": "gameinfo.txt был изменен другой программой, загрузите его заново: {}",
+"Failed to restore {}: {}": "Не удалось восстановить {}: {}",
+"Failed to create backup of {}: {}": "Не удалось создать резервную копию {}: {}",
+"Error writing gameinfo.txt: {}": "Ошибка записи gameinfo.txt: {}",
+"{} moved, {} added, {} removed": "перемещено: {}, добавлено: {}, удалено: {}",
+"Addons changed in {}: {}": "Аддоны изменены в {}: {}",
+"Failed to read workshop folder {}: {}": "Не удалось прочитать папку мастерской {}: {}",
+"File changes cannot be watched, checking every {} s": "Изменения файлов не отслеживаются системой, проверка каждые {} с",
+"Failed to read changed gameinfo.txt: {}": "Не удалось прочитать измененный gameinfo.txt: {}",
+"Addons in {} differ from main list, sync with episodes to fix": "Аддоны в {} отличаются от основного списка, выполните синхронизацию с эпизодами",
+"gameinfo.txt was changed by another program, addons list updated": "gameinfo.txt был изменен другой программой, список аддонов обновлен",
+"Workshop folder changed: {} addons with missing files": "Папка мастерской изменена: аддонов с отсутствующими файлами: {}",
+"Addon file is missing": "Файл аддона отсутствует",
+"Preparing addons for mounting ({})": "Подготовка аддонов для встраивания ({})",
+"Mount preparation: {}": "Подготовка встраивания: {}",
+"Steam rate limit, {} requests in flight, waiting {:.1f} s": "Ограничение частоты запросов Steam, одновременных запросов: {}, ожидание {:.1f} с",
+"rate limit exceeded": "превышено ограничение частоты запросов",
+"Steam Web API request failed for {} addons: {}": "Ошибка запроса Steam Web API для {} аддонов: {}",
+"Metadata backend {}: {} of {} addons in {:.1f} s": "Источник метаданных {}: {} из {} аддонов за {:.1f} с",
+"Failed to check nested collections: {}": "Не удалось проверить вложенные коллекции: {}",
+"Loading {} nested collections": "Загрузка вложенных коллекций: {}",
+"Collection {} contains itself, skipped": "Коллекция {} содержит саму себя, пропущена",
+"Collection page not changed: {}": "Страница коллекции не изменилась: {}",
+"Network requests are disabled in offline mode": "Сетевые запросы отключены в автономном режиме",
+"Offline mode enabled": "Автономный режим включён",
+"Offline mode disabled": "Автономный режим выключен",
+"Page is not available offline": "Страница недоступна в автономном режиме",
+"Failed to read addon info {}: {}": "Не удалось прочитать информацию об аддоне {}: {}",
+"Offline mode: {} addons without local files are not checked for maps": "Автономный режим: {} аддонов без локальных файлов не проверены на карты",
+"Addon {}": "Аддон {}",
+"Offline mode": "Автономный режим",
+"Titles and map checks come from cache and installed files, Steam is not contacted": "Названия и проверка карт берутся из кэша и установленных файлов, Steam не используется",
+"Map check is already running": "Проверка карт уже выполняется",
+"Error checking maps: {}": "Ошибка проверки карт: {}",
+"Failed to check addons for maps": "Не удалось проверить аддоны на карты",
+"Metadata cache: {} hits, {} misses, {} addons, {} pages": "Кэш метаданных: {} попаданий, {} промахов, {} аддонов, {} страниц",
+"Maps were classified during mount preparation": "Карты определены при подготовке монтирования",
+"Steam Web API collection check failed for {} items: {}": "Ошибка проверки коллекций Steam Web API для {} элементов: {}",
+"Nested collections are recognized only by Steam Web API online, {} collection items of unknown type are added as addons": "Вложенные коллекции определяются только через Steam Web API в сети, {} элементов коллекции неизвестного типа добавлены как аддоны",
+
             }
             
         except Exception as e:
@@ -0,0 +1,215 @@
+import re
+
+# Whitespace tokens never span past a newline, so every line of the file ends with its own token
+_TOKEN_RE = re.compile(r'''
+    (?P<newline>[ \t\r\f\v\ufeff]*\n)
+  | (?P<space>[ \t\r\f\v\ufeff]+)
+  | (?P<comment>//[^\n]*)
+  | (?P<quoted>"[^"]*")
+  | (?P<open>\{)
+  | (?P<close>\})
+  | (?P<condition>\[[^\]\n]*\])
+  | (?P<string>[^\s{}"]+)
+''', re.VERBOSE)
+
+class KeyValuesError(Exception):
+    pass
+
+class Whitespace:
+    """Spaces/tabs, optionally ending with newline"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    @property
+    def ends_line(self):
+        return self.text.endswith('\n')
+
+    def dump(self):
+        return self.text
+
+class Comment:
+    """Line comment, text includes leading // but not the newline"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    @property
+    def body(self):
+        return self.text[2:].strip()
+
+    def dump(self):
+        return self.text
+
+class Condition:
+    """Platform condition like [$WIN32], kept as is"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def dump(self):
+        return self.text
+
+class Block:
+    """Contents of { } - list of pairs and trivia (whitespace, comments)"""
+    __slots__ = ('children',)
+
+    def __init__(self, children=None):
+        self.children = children if children is not None else []
+
+    def pairs(self):
+        return [child for child in self.children if isinstance(child, Pair)]
+
+    def find(self, *keys):
+        """Returns block of nested pairs by keys (case-insensitive), None if not found"""
+        block = self
+        for key in keys:
+            for child in block.children:
+                if isinstance(child, Pair) and isinstance(child.value, Block) and child.key.lower() == key.lower():
+                    block = child.value
+                    break
+            else:
+                return None
+        return block
+
+    def insert(self, index, nodes):
+        self.children[index:index] = nodes
+
+    def remove(self, start, end):
+        del self.children[start:end]
+
+    def move(self, start, end, index):
+        """Moves children[start:end] so they begin at index of the list without them"""
+        nodes = self.children[start:end]
+        del self.children[start:end]
+        self.children[index:index] = nodes
+
+    def dump(self):
+        return '{' + ''.join(child.dump() for child in self.children) + '}'
+
+class Pair:
+    """
+    Key with string or block value
+    separator: trivia between key and value (kept to serialize unchanged)
+    """
+    __slots__ = ('key', 'value', 'separator', 'key_quoted', 'value_quoted')
+
+    def __init__(self, key, value, separator=None, key_quoted=False, value_quoted=True):
+        self.key = key
+        self.value = value
+        self.separator = separator if separator is not None else [Whitespace('\t\t')]
+        self.key_quoted = key_quoted
+        self.value_quoted = value_quoted
+
+    def dump(self):
+        key = f'"{self.key}"' if self.key_quoted else self.key
+        if isinstance(self.value, Block):
+            value = self.value.dump()
+        else:
+            value = f'"{self.value}"' if self.value_quoted else self.value
+        return key + ''.join(node.dump() for node in self.separator) + value
+
+class Document(Block):
+    """Whole file: top level pairs and trivia"""
+    __slots__ = ()
+
+    def dump(self):
+        return ''.join(child.dump() for child in self.children)
+
+def _tokenize(text):
+    position = 0
+    line = 1
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match:
+            raise KeyValuesError(f"Unexpected character at line {line}")
+        kind = match.lastgroup
+        value = match.group()
+        yield kind, value, line
+        line += value.count('\n')
+        position = match.end()
+
+def _parse_children(tokens, in_block):
+    """Reads nodes until closing brace (in_block) or end of text"""
+    children = []
+    for kind, value, line in tokens:
+        if kind in ('newline', 'space'):
+            children.append(Whitespace(value))
+        elif kind == 'comment':
+            children.append(Comment(value))
+        elif kind == 'condition':
+            children.append(Condition(value))
+        elif kind == 'close':
+            if not in_block:
+                raise KeyValuesError(f"Unexpected '}}' at line {line}")
+            return children
+        elif kind == 'open':
+            raise KeyValuesError(f"Block without key at line {line}")
+        else:
+            children.append(_parse_pair(tokens, kind, value, line))
+    if in_block:
+        raise KeyValuesError("Unexpected end of file, '}' expected")
+    return children
+
+def _parse_pair(tokens, kind, key, line):
+    key_quoted = kind == 'quoted'
+    if key_quoted:
+        key = key[1:-1]
+    separator = []
+    for kind, value, value_line in tokens:
+        if kind in ('newline', 'space'):
+            separator.append(Whitespace(value))
+        elif kind == 'comment':
+            separator.append(Comment(value))
+        elif kind == 'open':
+            return Pair(key, Block(_parse_children(tokens, True)), separator, key_quoted)
+        elif kind in ('quoted', 'string'):
+            value_quoted = kind == 'quoted'
+            if value_quoted:
+                value = value[1:-1]
+            return Pair(key, value, separator, key_quoted, value_quoted)
+        else:
+            break
+    raise KeyValuesError(f"Key '{key}' without value at line {line}")
+
+def parse(text):
+    """Parses KeyValues text into Document, dump() returns the same text"""
+    return Document(_parse_children(_tokenize(text), False))
+
+def parse_fragment(text):
+    """Parses text to be inserted into block, returns list of nodes"""
+    return _parse_children(_tokenize(text), False)
+
+def iter_nodes(block):
+    """Yields all nodes of block recursively"""
+    for child in block.children:
+        yield child
+        if isinstance(child, Pair) and isinstance(child.value, Block):
+            yield from iter_nodes(child.value)
+
+def split_lines(children, start=0, end=None):
+    """
+    Splits children[start:end] into lines
+    Returns list of tuples (first index, index after last, significant nodes);
+    last line may have no newline
+    """
+    if end is None:
+        end = len(children)
+    lines = []
+    line_start = start
+    significant = []
+    for index in range(start, end):
+        node = children[index]
+        if isinstance(node, Whitespace):
+            if node.ends_line:
+                lines.append((line_start, index + 1, significant))
+                line_start = index + 1
+                significant = []
+        else:
+            significant.append(node)
+    if line_start < end:
+        lines.append((line_start, end, significant))
+    return lines
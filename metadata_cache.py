@@ -0,0 +1,258 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from logger import log
+from i18n import tr, translator
+import config
+
+CACHE_FILE = "metadata_cache.db"
+
+# How long cached fields are trusted (seconds)
+TITLE_TTL = 7 * 24 * 3600
+MAP_TTL = 30 * 24 * 3600
+
+# Least recently used entries are evicted above this size
+MAX_ENTRIES = 20000
+
+# Eviction removes entries down to this part of the limit, so it runs once per many writes
+EVICT_RATIO = 0.9
+
+# Field name -> column with time of last check
+FIELD_COLUMNS = {
+    'title': 'title_checked',
+    'is_map': 'map_checked'
+}
+
+class MetadataCache:
+    """
+    Persistent cache of workshop addon metadata keyed by workshop ID
+    Each field has its own TTL, so a title learned from a collection page
+    does not pretend that map flag is known
+    Pages table keeps ETag/Last-Modified of downloaded pages with their parsed records,
+    so pages are revalidated with conditional requests instead of downloaded again
+    """
+    def __init__(self, path, max_entries=MAX_ENTRIES, title_ttl=TITLE_TTL, map_ttl=MAP_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = {
+            'title': title_ttl,
+            'is_map': map_ttl
+        }
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS addons (
+                id TEXT PRIMARY KEY,
+                title TEXT,
+                page_type TEXT,
+                tags TEXT,
+                is_map INTEGER,
+                file_size INTEGER,
+                time_updated INTEGER,
+                title_checked REAL,
+                map_checked REAL,
+                last_used REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS addons_last_used ON addons (last_used)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                record TEXT,
+                last_used REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self._conn.commit()
+        # Upper bound of rows in each table: writes add to it, tables are counted only above the limit
+        self._sizes = {table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                       for table in ('addons', 'pages')}
+
+    def _row_to_record(self, row):
+        addon_id, title, page_type, tags, is_map, file_size, time_updated = row[:7]
+        return {
+            'id': addon_id,
+            'title': title,
+            'page_type': page_type,
+            'tags': json.loads(tags) if tags else [],
+            'is_map': bool(is_map) if is_map is not None else None,
+            'file_size': file_size,
+            'time_updated': time_updated
+        }
+
+    def get_many(self, addon_ids, fields=('title',)):
+        """
+        Returns dictionary {id: record} for IDs whose requested fields are fresh
+        IDs missing from result are counted as misses
+        """
+        addon_ids = [str(addon_id) for addon_id in addon_ids]
+        if not addon_ids:
+            return {}
+
+        now = time.time()
+        found = {}
+        with self._lock:
+            # SQLite limits number of query parameters, query in chunks
+            for i in range(0, len(addon_ids), 500):
+                chunk = addon_ids[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT id, title, page_type, tags, is_map, file_size, time_updated, title_checked, map_checked "
+                    f"FROM addons WHERE id IN ({placeholders})", chunk
+                ).fetchall()
+
+                for row in rows:
+                    checked = {'title': row[7], 'is_map': row[8]}
+                    if all(checked[field] is not None and now - checked[field] < self.ttl[field] for field in fields):
+                        found[row[0]] = self._row_to_record(row)
+
+            if found:
+                self._conn.executemany("UPDATE addons SET last_used = ? WHERE id = ?",
+                                       [(now, addon_id) for addon_id in found])
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(set(addon_ids)) - len(found)
+
+        return found
+
+    def get(self, addon_id, fields=('title',)):
+        """Returns cached record if requested fields are fresh, otherwise None"""
+        return self.get_many([addon_id], fields).get(str(addon_id))
+
+    def put(self, record):
+        """Stores metadata record parsed from addon page (all fields known)"""
+        if not record or not record.get('id'):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO addons
+                (id, title, page_type, tags, is_map, file_size, time_updated, title_checked, map_checked, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                str(record['id']), record['title'], record['page_type'], json.dumps(record.get('tags', [])),
+                int(bool(record.get('is_map'))), record.get('file_size'), record.get('time_updated'),
+                now, now, now
+            ))
+            self._conn.commit()
+            self._written('addons', 1)
+
+    def put_titles(self, addons):
+        """Stores only titles, e.g. from collection page. addons: list of tuples (id, title)"""
+        if not addons:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO addons (id, title, title_checked, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET title = excluded.title,
+                    title_checked = excluded.title_checked, last_used = excluded.last_used
+            """, [(str(addon_id), title, now, now) for addon_id, title in addons])
+            self._conn.commit()
+            self._written('addons', len(addons))
+
+    def get_page(self, url):
+        """Returns dictionary (etag, last_modified, record) stored for page URL, None if not stored"""
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified, record FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+        record = json.loads(row[2])
+        if 'items' in record:
+            record['items'] = [tuple(item) for item in record['items']]
+        return {'etag': row[0], 'last_modified': row[1], 'record': record}
+
+    def put_page(self, url, etag, last_modified, record):
+        """Stores validators of page response with record parsed from it"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, record, last_used) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(record, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+            self._written('pages', 1)
+
+    def invalidate(self, addon_ids=None):
+        """Removes entries and stored pages (URLs ending with ?id=<id>) of given IDs, or whole cache if IDs not given"""
+        with self._lock:
+            if addon_ids is None:
+                self._conn.execute("DELETE FROM addons")
+                self._conn.execute("DELETE FROM pages")
+                self._sizes = {table: 0 for table in self._sizes}
+            else:
+                addon_ids = [str(addon_id) for addon_id in addon_ids]
+                self._conn.executemany("DELETE FROM addons WHERE id = ?", [(addon_id,) for addon_id in addon_ids])
+                # IDs are digits, so they hold no LIKE wildcards
+                self._conn.executemany("DELETE FROM pages WHERE url LIKE ?", [(f"%?id={addon_id}",) for addon_id in addon_ids])
+            self._conn.commit()
+
+    def _written(self, table, rows):
+        """Accounts written rows, evicts when table may be above size limit (lock must be held)"""
+        self._sizes[table] += rows
+        if self._sizes[table] > self.max_entries:
+            self._evict(table)
+
+    def _evict(self, table):
+        """Removes least recently used entries of table down to EVICT_RATIO of size limit (lock must be held)"""
+        key = 'id' if table == 'addons' else 'url'
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count > self.max_entries:
+            keep = int(self.max_entries * EVICT_RATIO)
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table} ORDER BY last_used ASC LIMIT ?)",
+                (count - keep,)
+            )
+            self._conn.commit()
+            count = keep
+        self._sizes[table] = count
+
+    def stats(self):
+        """Returns dictionary with hits, misses, number of entries and stored pages"""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM addons").fetchone()[0]
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': count,
+            'pages': pages
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def log_stats():
+    """Logs hits and misses of shared cache since start and its size"""
+    stats = get_cache().stats()
+    log.info(tr("Metadata cache: {} hits, {} misses, {} addons, {} pages").format(
+        stats['hits'], stats['misses'], stats['entries'], stats['pages']))
+
+def get_cache():
+    """Returns shared cache stored next to config.json (in memory if file cannot be opened)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache_path = os.path.join(os.path.dirname(os.path.abspath(config.CONFIG_FILE)), CACHE_FILE)
+                try:
+                    _cache = MetadataCache(cache_path)
+                except Exception as e:
+                    log.warning(tr("Failed to open metadata cache, using memory: {}").format(e))
+                    _cache = MetadataCache(":memory:")
+    return _cache
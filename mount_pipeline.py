@@ -0,0 +1,220 @@
+import os
+import time
+import workshop
+import addon_manager
+import metadata_cache
+import path_utils
+import workshop_index
+from logger import log
+from i18n import tr
+
+# === SOURCES ===
+# Each source returns tuple (list of (id, title or None), error message)
+
+def collection_source(collection_url):
+    addons = workshop.get_collection_addons(collection_url)
+    if not addons:
+        return [], tr("Failed to find addons in collection.")
+    return addons, ""
+
+def addon_source(addon_url):
+    # Page fetched during URL validation is reused
+    record = workshop.get_addon_metadata(addon_url)
+    if not record or not record['id']:
+        return [], tr("Failed to get addon information.")
+    return [(record['id'], record['title'])], ""
+
+def workshop_txt_source(hl2_path):
+    addon_ids, error_message = addon_manager.read_workshop_txt(hl2_path)
+    if error_message:
+        return [], error_message
+    if not addon_ids:
+        return [], tr("Installed addons not found.")
+    return [(addon_id, None) for addon_id in addon_ids], ""
+
+# Source name -> (function, message when all addons are already mounted)
+SOURCES = {
+    'collection': (collection_source, "All addons from collection already added."),
+    'addon': (addon_source, "All addons already added."),
+    'workshop_txt': (workshop_txt_source, "All addons already added.")
+}
+
+# === STAGES ===
+# Each stage takes and returns the context dictionary
+
+def resolve_metadata(context):
+    """Fills missing titles: metadata cache in one query, then async resolver (local files offline) for the rest"""
+    addons = context['addons']
+    unknown = [addon_id for addon_id, title in addons if title is None]
+    if not unknown:
+        return context
+
+    titles = workshop.get_cached_titles(unknown)
+    to_fetch = [addon_id for addon_id in dict.fromkeys(unknown) if addon_id not in titles]
+
+    if to_fetch and workshop.OFFLINE_MODE:
+        # Without network titles are read from addoninfo.txt of installed files, ID is the last resort
+        workshop_path = context['workshop_path']
+        for addon_id in to_fetch:
+            title = None
+            if workshop_path:
+                title = addon_manager.read_local_title(os.path.join(workshop_path, addon_id, "workshop_dir.vpk"))
+            titles[addon_id] = title or tr("Addon {}").format(addon_id)
+    elif to_fetch:
+        def report(addon_id, record, done, total):
+            if record:
+                log.info(tr("Loaded ({}/{}): {}").format(done, total, record['title']))
+            else:
+                log.warning(tr("✗ Failed to load ({}/{}): ID {}").format(done, total, addon_id))
+        
+        records = workshop.resolve_records(to_fetch, refresh=True, progress=report)
+        titles.update((addon_id, record['title']) for addon_id, record in zip(to_fetch, records) if record)
+
+    if not workshop.OFFLINE_MODE:
+        log.info(tr("Metadata cache: {} from cache, {} downloaded").format(len(unknown) - len(to_fetch), len(to_fetch)))
+    metadata_cache.log_stats()
+
+    resolved = []
+    for addon_id, title in addons:
+        if title is None:
+            title = titles.get(addon_id)
+            if title is None:
+                context['failed_addons'].append(addon_id)
+                continue
+        resolved.append((addon_id, title))
+    context['addons'] = resolved
+    return context
+
+def dedupe(context):
+    """Skips addons already in gameinfo.txt (one read) and repeated IDs of the source"""
+    existing_ids = {addon['id'] for addon in addon_manager.read_addons_from_gameinfo(context['gameinfo_path'])}
+    seen = set()
+    unique = []
+    for addon_id, title in context['addons']:
+        if addon_id in existing_ids:
+            context['duplicates'].append((addon_id, title))
+        elif addon_id not in seen:
+            seen.add(addon_id)
+            unique.append((addon_id, title))
+    context['addons'] = unique
+    return context
+
+def resolve_paths(context):
+    """Forms path to workshop_dir.vpk of each addon"""
+    workshop_path = context['workshop_path']
+    context['addons_with_paths'] = [(os.path.join(workshop_path, addon_id, "workshop_dir.vpk"), title)
+                                    for addon_id, title in context['addons']]
+    return context
+
+def check_existence(context):
+    """Separates addons with missing VPK using one scan of workshop folder, folders are always kept"""
+    if not context['check_files']:
+        return context
+
+    index = workshop_index.get_index(context['workshop_path'])
+    addons = []
+    addons_with_paths = []
+    for (addon_id, title), (path, _) in zip(context['addons'], context['addons_with_paths']):
+        if path.endswith('.vpk') and not index.exists(path):
+            context['missing_addons'].append((addon_id, title, path))
+        else:
+            addons.append((addon_id, title))
+            addons_with_paths.append((path, title))
+
+    if context['missing_addons']:
+        log.warning(tr("Found {} missing addon files").format(len(context['missing_addons'])))
+    context['addons'] = addons
+    context['addons_with_paths'] = addons_with_paths
+    return context
+
+def classify_maps(context):
+    """
+    Classifies addons as maps for map check after mounting (local VPK indexes, then metadata cache
+    and Steam pages), so the check does not classify them again. Runs only if the check is enabled
+    """
+    if not context['map_check']:
+        return context
+
+    addons = [{'id': addon_id, 'title': title, 'path': path}
+              for (addon_id, title), (path, _) in zip(context['addons'], context['addons_with_paths'])]
+    context['is_map_by_id'] = addon_manager.classify_map_addons(addons) or {}
+    return context
+
+STAGES = [
+    ('metadata', resolve_metadata),
+    ('dedupe', dedupe),
+    ('paths', resolve_paths),
+    ('existence', check_existence),
+    ('maps', classify_maps)
+]
+
+def prepare(source, argument, hl2vr_path, hl2_path, check_files=True, map_check=False):
+    """
+    Prepares addons for mounting: source -> metadata -> dedupe -> paths -> existence -> maps
+    source: name from SOURCES, argument: its parameter (URL or hl2_path)
+    map_check: classify addons for automatic map check after mounting
+    Returns tuple (success, data, error_message), data['timings'] has duration of each stage
+    """
+    try:
+        read_source, duplicates_message = SOURCES[source]
+        log.info(tr("Preparing addons for mounting ({})").format(source))
+
+        started = time.perf_counter()
+        addons, error_message = read_source(argument)
+        timings = [('source', time.perf_counter() - started)]
+        if not addons:
+            return False, None, error_message or tr("Failed to find addons.")
+
+        context = {
+            'addons': list(addons),
+            'gameinfo_path': os.path.join(hl2vr_path, "hlvr", "gameinfo.txt"),
+            'workshop_path': path_utils.get_workshop_path(hl2_path),
+            'check_files': check_files,
+            'map_check': map_check,
+            'failed_addons': [],
+            'duplicates': [],
+            'missing_addons': [],
+            'addons_with_paths': [],
+            'is_map_by_id': {}
+        }
+
+        for name, stage in STAGES:
+            started = time.perf_counter()
+            context = stage(context)
+            timings.append((name, time.perf_counter() - started))
+
+            if not context['addons']:
+                break
+
+        log.info(tr("Mount preparation: {}").format(", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings)))
+
+        if not context['addons']:
+            if source == 'addon' and context['duplicates']:
+                return False, None, tr("Addon '{}' already added.").format(context['duplicates'][0][1])
+            if source == 'addon' and context['missing_addons']:
+                return False, None, tr("Addon file '{}' not found.").format(context['missing_addons'][0][1])
+            if context['missing_addons']:
+                return False, None, tr("Addon files missing.")
+            if context['duplicates']:
+                return False, None, tr(duplicates_message)
+            if context['failed_addons']:
+                return False, None, tr("Failed to get information about installed addons.")
+            return False, None, tr("Failed to find addons to add.")
+
+        result_data = {
+            'unique_addons': context['addons'],  # Only those that will be added
+            'duplicates': context['duplicates'],
+            'failed_addons': context['failed_addons'],
+            'missing_addons': context['missing_addons'],
+            'addons_with_paths': context['addons_with_paths'],  # Only existing paths
+            'is_map_by_id': context['is_map_by_id'],  # Filled if map_check is set
+            'gameinfo_path': context['gameinfo_path'],
+            'timings': timings
+        }
+
+        log.info(tr("Prepared {} addons for mounting").format(len(context['addons'])))
+        return True, result_data, ""
+
+    except Exception as e:
+        log.error(f"Error preparing addons: {str(e)}")
+        return False, None, f"An unexpected error occurred:\n{str(e)}"
@@ -1,6 +1,18 @@
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logger import log
 from i18n import tr, translator
 
+# Previous version of file written by atomic_write_text
+BACKUP_SUFFIX = ".bak"
+
+# os.replace may fail while game or antivirus holds the file open (Windows)
+REPLACE_ATTEMPTS = 5
+REPLACE_RETRY_DELAY = 0.05
+
 def get_workshop_path(hl2_path):
     normalized_path = os.path.normpath(hl2_path)
     
@@ -44,4 +56,145 @@ def validate_paths(hl2vr_path, hl2_path):
     if not workshop_path or not os.path.exists(workshop_path):
         return False, tr("Failed to find workshop folder")
     
-    return True, ""
\ No newline at end of file
+    return True, ""
+
+def _replace(source, destination):
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(source, destination)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(REPLACE_RETRY_DELAY)
+
+def _fsync_directory(directory):
+    """Makes rename durable on POSIX, directories cannot be opened on Windows"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _snapshot(file_path, directory):
+    """Returns temp copy of current file (hard link if possible), None if file does not exist"""
+    if not os.path.exists(file_path):
+        return None
+    fd, snapshot_path = tempfile.mkstemp(prefix=os.path.basename(file_path) + '.', suffix='.bak.tmp', dir=directory)
+    os.close(fd)
+    try:
+        os.remove(snapshot_path)
+        try:
+            os.link(file_path, snapshot_path)
+        except OSError:
+            shutil.copy2(file_path, snapshot_path)
+    except Exception:
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        raise
+    return snapshot_path
+
+def _stage(file_path, text, encoding):
+    """Writes text to temp file next to target and fsyncs it, returns temp path"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(file_path) + '.', suffix='.tmp', dir=directory)
+    try:
+        # Text mode as with open(file, 'w'), newlines are translated the same way
+        with os.fdopen(fd, 'w', encoding=encoding) as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return temp_path
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def atomic_write_many(files, encoding='utf-8', backup=True, max_workers=4):
+    """
+    Writes several text files as one transaction: either all of them get the new
+    contents or (if anything fails) all keep the old ones
+    files: dictionary {path: text}
+    Temp files are written and fsynced in parallel, then renamed over targets one by one;
+    targets already replaced are restored from snapshots taken before the renames
+    backup: keep previous version of each file as file.bak
+    """
+    files = {os.path.abspath(path): text for path, text in files.items()}
+    if not files:
+        return
+
+    staged = {}
+    snapshots = {}
+    replaced = []
+    try:
+        if len(files) == 1:
+            for path, text in files.items():
+                staged[path] = _stage(path, text, encoding)
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+                futures = {path: executor.submit(_stage, path, text, encoding) for path, text in files.items()}
+                errors = []
+                for path, future in futures.items():
+                    try:
+                        staged[path] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                if errors:
+                    raise errors[0]
+
+        for path in files:
+            snapshots[path] = _snapshot(path, os.path.dirname(path))
+
+        for path in files:
+            _replace(staged[path], path)
+            del staged[path]
+            replaced.append(path)
+    except Exception:
+        for path in reversed(replaced):
+            try:
+                if snapshots[path] is not None:
+                    _replace(snapshots.pop(path), path)
+                else:
+                    os.remove(path)
+            except Exception as e:
+                log.error(tr("Failed to restore {}: {}").format(path, e))
+        for temp_path in list(staged.values()) + [path for path in snapshots.values() if path]:
+            _remove_quietly(temp_path)
+        raise
+
+    for path, snapshot_path in snapshots.items():
+        if snapshot_path is None:
+            continue
+        if backup:
+            try:
+                _replace(snapshot_path, path + BACKUP_SUFFIX)
+                continue
+            except OSError as e:
+                log.warning(tr("Failed to create backup of {}: {}").format(path, e))
+        _remove_quietly(snapshot_path)
+
+    for directory in {os.path.dirname(path) for path in files}:
+        _fsync_directory(directory)
+
+def atomic_write_text(file_path, text, encoding='utf-8', backup=True):
+    """
+    Writes text file so that after a crash it is either the old or the new version:
+    temp file in the same folder, fsync, rename over target
+    backup: keep previous version as file.bak
+    """
+    atomic_write_many({file_path: text}, encoding, backup)
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+# Modules of the application live in repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workshop
+import metadata_cache
+
+# Unix time without seconds, workshop pages show time with minute precision
+TIME_UPDATED = 1700000040
+
+LAST_MODIFIED = "Tue, 14 Nov 2023 22:14:00 GMT"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Steam Web API and workshop pages with canned responses, see StandInServer"""
+    # Keep-alive, so tests can check that pooled connections are reused
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _record(self, kind, name, ids):
+        self.server.requests.append({'method': kind, 'name': name, 'ids': ids,
+                                     'headers': dict(self.headers), 'port': self.client_address[1]})
+
+    def _send(self, body, content_type, status=200, headers=None):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        ids = [form[f'publishedfileids[{i}]'][0] for i in range(sum(key.startswith('publishedfileids') for key in form))]
+        method = urlsplit(self.path).path.split('/')[2]
+        self._record('POST', method, ids)
+        status, response = self.server.api(method, ids)
+        self._send(json.dumps({'response': response}), 'application/json', status)
+
+    def do_GET(self):
+        scripted = self.server.scripted.get(self.path)
+        if scripted:
+            self._record('GET', self.path, [])
+            status, body = scripted.pop(0)
+            return self._send(body, 'text/plain', status)
+
+        addon_id = parse_qs(urlsplit(self.path).query)['id'][0]
+        self._record('GET', 'page', [addon_id])
+        etag = self.server.etags.get(addon_id)
+        validators = {'ETag': etag, 'Last-Modified': LAST_MODIFIED} if etag else {}
+        if etag and self.headers.get('If-None-Match') == etag:
+            return self._send('', 'text/html', 304, validators)
+        self._send(self.server.page(addon_id), 'text/html', headers=validators)
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local server answering like Steam: addons are from self.addons {id: (title, tags)},
+    self.collections {id: [child ids]}, self.failing_ids break their whole API batch,
+    API methods in self.failing_methods always fail, self.error_ids get error result in API response
+    Pages with ETag in self.etags {id: etag} answer 304 to matching If-None-Match,
+    self.scripted {path: [(status, body)]} answers other paths with given responses in order
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.requests = []
+        self.addons = {}
+        self.collections = {}
+        self.failing_ids = set()
+        self.failing_methods = set()
+        self.error_ids = set()
+        self.etags = {}
+        self.scripted = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def posts(self, method):
+        return [request['ids'] for request in self.requests if request['method'] == 'POST' and request['name'] == method]
+
+    def pages(self):
+        return [request['ids'][0] for request in self.requests if request['name'] == 'page']
+
+    def api(self, method, ids):
+        if self.failing_ids.intersection(ids) or method in self.failing_methods:
+            return 500, {}
+        if method == 'GetCollectionDetails':
+            details = [{'publishedfileid': addon_id, 'result': 1,
+                        'children': [{'publishedfileid': child, 'sortorder': order,
+                                      'filetype': 2 if child in self.collections else 0}
+                                     for order, child in enumerate(self.collections[addon_id])]}
+                       if addon_id in self.collections else {'publishedfileid': addon_id, 'result': 9}
+                       for addon_id in ids]
+            return 200, {'result': 1, 'resultcount': len(details), 'collectiondetails': details}
+
+        details = []
+        for addon_id in ids:
+            if addon_id in self.error_ids or addon_id not in self.addons and addon_id not in self.collections:
+                details.append({'publishedfileid': addon_id, 'result': 9})
+                continue
+            if addon_id in self.collections:
+                # Collections have no file and are created by the collections app
+                details.append({'publishedfileid': addon_id, 'result': 1, 'creator_app_id': 766, 'consumer_app_id': 220,
+                                'title': "Collection " + addon_id, 'file_size': '0', 'time_updated': TIME_UPDATED,
+                                'tags': []})
+                continue
+            title, tags = self.addons[addon_id]
+            details.append({'publishedfileid': addon_id, 'result': 1, 'creator_app_id': 220, 'consumer_app_id': 220,
+                            'title': title, 'file_size': str(3 * 1024 ** 2), 'time_updated': TIME_UPDATED,
+                            'tags': [{'tag': tag} for tag in tags]})
+        return 200, {'result': 1, 'resultcount': len(details), 'publishedfiledetails': details}
+
+    def title(self, addon_id):
+        return self.addons[addon_id][0] if addon_id in self.addons else f"Collection {addon_id}"
+
+    def page(self, addon_id):
+        if addon_id in self.collections:
+            items = ''.join(f'<div class="collectionItem" id="sharedfile_{child}">'
+                            f'<a href="https://steamcommunity.com/sharedfiles/filedetails/?id={child}">'
+                            f'<div class="workshopItemTitle">{self.title(child)}</div></a></div>'
+                            for child in self.collections[addon_id])
+            return (f'<html><a href="https://steamcommunity.com/id/x/myworkshopfiles/?section=collections&appid=220">x</a>'
+                    f'<div class="workshopItemTitle">Collection {addon_id}</div>{items}</html>')
+
+        title, tags = self.addons[addon_id]
+        tag_links = ''.join(f'<a href="https://steamcommunity.com/workshop/browse/?appid=220&requiredtags[]={tag}">{tag}</a>'
+                            for tag in tags)
+        updated = datetime.fromtimestamp(TIME_UPDATED).strftime('%d %b, %Y @ %I:%M%p')
+        return (f'<html><a href="https://steamcommunity.com/id/x/myworkshopfiles/?appid=220">x</a>'
+                f'<div class="workshopItemTitle">{title}</div>{tag_links}'
+                f'<div class="detailsStatsContainerRight"><div class="detailsStatRight">3.000 MB</div>'
+                f'<div class="detailsStatRight">1 Jan, 2020 @ 10:00am</div>'
+                f'<div class="detailsStatRight">{updated}</div></div></html>')
+
+@pytest.fixture
+def server(monkeypatch):
+    stand_in = StandInServer()
+    thread = threading.Thread(target=stand_in.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    # Settings changed by configure_session are restored after test
+    for name in ('WORKSHOP_BASE_URL', 'STEAM_API_BASE_URL', 'METADATA_BACKEND', 'MAX_RETRIES', 'RETRY_BACKOFF', 'OFFLINE_MODE'):
+        monkeypatch.setattr(workshop, name, getattr(workshop, name))
+    monkeypatch.setattr(workshop, '_records', type(workshop._records)())
+    monkeypatch.setattr(metadata_cache, '_cache', metadata_cache.MetadataCache(":memory:"))
+    workshop.configure_session(base_url=stand_in.url, api_base_url=stand_in.url, backend='api', max_retries=0, offline=False)
+
+    yield stand_in
+
+    workshop.close_session()
+    stand_in.shutdown()
+    stand_in.server_close()
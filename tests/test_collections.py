@@ -0,0 +1,41 @@
+import workshop
+
+def add_collections(server):
+    for addon_id in ('1000', '1001', '1002'):
+        server.addons[addon_id] = (f"Addon {addon_id}", ['Weapons'])
+    server.collections['5000'] = ['1000', '5001']
+    server.collections['5001'] = ['1001', '1002']
+
+def test_nested_collections_are_expanded_by_api(server):
+    add_collections(server)
+
+    addons = workshop.get_collection_addons(workshop.addon_url('5000'))
+
+    assert addons == [('1002', "Addon 1002"), ('1001', "Addon 1001"), ('1000', "Addon 1000")]
+    assert server.posts('GetCollectionDetails') == [['5000'], ['5001']]
+
+def test_known_nested_collections_are_expanded_without_api(server, monkeypatch):
+    add_collections(server)
+    workshop.configure_session(backend='html')
+    workshop.get_collection_addons(workshop.addon_url('5001'))
+    workshop.resolve_records(['1000', '1001', '1002'], refresh=True)
+    warnings = []
+    monkeypatch.setattr(workshop.log, 'warning', warnings.append)
+
+    addons = workshop.get_collection_addons(workshop.addon_url('5000'))
+
+    assert addons == [('1002', "Addon 1002"), ('1001', "Addon 1001"), ('1000', "Addon 1000")]
+    assert server.posts('GetCollectionDetails') == []
+    assert warnings == []
+
+def test_unknown_nested_collections_are_reported(server, monkeypatch):
+    add_collections(server)
+    workshop.configure_session(backend='html')
+    warnings = []
+    monkeypatch.setattr(workshop.log, 'warning', warnings.append)
+
+    addons = workshop.get_collection_addons(workshop.addon_url('5000'))
+
+    assert addons == [('5001', "Collection 5001"), ('1000', "Addon 1000")]
+    assert server.posts('GetCollectionDetails') == []
+    assert len(warnings) == 1 and "2 collection items" in warnings[0]
@@ -0,0 +1,51 @@
+import metadata_cache
+
+def make_record(addon_id):
+    return {'id': str(addon_id), 'title': f"Addon {addon_id}", 'page_type': 'addon', 'tags': [], 'is_map': False,
+            'file_size': None, 'time_updated': None}
+
+def test_eviction_keeps_recent_entries_and_rarely_counts(tmp_path):
+    cache = metadata_cache.MetadataCache(str(tmp_path / "cache.db"), max_entries=100)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    for addon_id in range(1000):
+        cache.put(make_record(addon_id))
+
+    counts = [statement for statement in statements if "COUNT(*)" in statement]
+    assert len(counts) < 100
+    assert cache.stats()['entries'] <= 100
+    assert cache.get(999) is not None
+    assert cache.get(0) is None
+
+def test_size_is_known_after_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = metadata_cache.MetadataCache(path, max_entries=50)
+    cache.put_titles([(addon_id, f"Addon {addon_id}") for addon_id in range(40)])
+    cache.close()
+
+    cache = metadata_cache.MetadataCache(path, max_entries=50)
+    cache.put_titles([(addon_id, f"Addon {addon_id}") for addon_id in range(40, 60)])
+    assert cache.stats()['entries'] <= 50
+    assert cache.get(59) is not None
+
+def test_stats_count_hits_and_misses():
+    cache = metadata_cache.MetadataCache(":memory:")
+    cache.put(make_record(1))
+    cache.get_many([1, 2, 3])
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+
+def test_invalidate_removes_pages_of_ids():
+    cache = metadata_cache.MetadataCache(":memory:")
+    for addon_id in ('12', '123'):
+        cache.put(make_record(addon_id))
+        cache.put_page(f"https://steamcommunity.com/sharedfiles/filedetails/?id={addon_id}", '"v1"', None,
+                       make_record(addon_id))
+
+    cache.invalidate(['12'])
+
+    assert cache.get_page("https://steamcommunity.com/sharedfiles/filedetails/?id=12") is None
+    assert cache.get_page("https://steamcommunity.com/sharedfiles/filedetails/?id=123") is not None
+    assert cache.stats()['entries'] == 1
@@ -0,0 +1,92 @@
+import workshop
+
+def add_addons(server, addon_ids):
+    for addon_id in addon_ids:
+        tags = ['Maps', 'Weapons'] if int(addon_id) % 3 == 0 else ['Weapons']
+        server.addons[addon_id] = (f"Addon {addon_id}", tags)
+
+def test_ids_are_batched(server):
+    addon_ids = [str(addon_id) for addon_id in range(1000, 1250)]
+    add_addons(server, addon_ids)
+
+    progress = []
+    records = workshop.resolve_records(addon_ids, refresh=True, progress=lambda *args: progress.append(args))
+
+    batches = server.posts('GetPublishedFileDetails')
+    assert sorted(len(batch) for batch in batches) == [50, 100, 100]
+    assert sorted(addon_id for batch in batches for addon_id in batch) == addon_ids
+    assert server.pages() == []
+    assert [record['title'] for record in records] == [f"Addon {addon_id}" for addon_id in addon_ids]
+    assert sorted(addon_id for addon_id, record, done, total in progress) == addon_ids
+    assert all(total == len(addon_ids) for addon_id, record, done, total in progress)
+
+def test_failed_batch_falls_back_to_html(server):
+    addon_ids = [str(addon_id) for addon_id in range(1000, 1150)]
+    add_addons(server, addon_ids)
+    server.failing_ids.add('1120')
+
+    progress = []
+    records = workshop.resolve_records(addon_ids, refresh=True, progress=lambda *args: progress.append(args))
+
+    assert sorted(server.pages()) == addon_ids[100:]
+    assert all(record is not None for record in records)
+    assert sorted(addon_id for addon_id, record, done, total in progress) == addon_ids
+    assert [done for addon_id, record, done, total in progress] == list(range(1, len(addon_ids) + 1))
+
+def test_error_result_falls_back_to_html(server):
+    addon_ids = [str(addon_id) for addon_id in range(1000, 1010)]
+    add_addons(server, addon_ids)
+    server.error_ids.update({'1003', '1007'})
+
+    records = workshop.resolve_records(addon_ids, refresh=True)
+
+    assert sorted(server.pages()) == ['1003', '1007']
+    assert [record['title'] for record in records] == [f"Addon {addon_id}" for addon_id in addon_ids]
+
+def test_collections_are_not_resolved_by_api(server):
+    add_addons(server, ['1000', '1001', '1002'])
+    server.collections['5000'] = ['1001', '1000']
+
+    api_records = workshop.SteamApiBackend().fetch_records(['1002', '5000'])
+    assert set(api_records) == {'1002'}
+    # Only the item without a file is checked for being a collection
+    assert server.posts('GetCollectionDetails') == [['5000']]
+
+    records = workshop.resolve_records(['1002', '5000'], refresh=True)
+    assert server.pages() == ['5000']
+    assert records[1]['page_type'] == 'collection'
+    assert records[1]['items'] == [('1001', "Addon 1001"), ('1000', "Addon 1000")]
+
+def test_collection_check_only_for_batches_with_candidates(server):
+    addon_ids = [str(addon_id) for addon_id in range(1000, 1250)]
+    add_addons(server, addon_ids)
+    server.collections['5000'] = ['1001']
+
+    workshop.SteamApiBackend().fetch_records(addon_ids + ['5000'])
+
+    assert len(server.posts('GetPublishedFileDetails')) == 3
+    assert server.posts('GetCollectionDetails') == [['5000']]
+
+def test_failed_collection_check_keeps_records(server):
+    add_addons(server, ['1000', '1001'])
+    server.collections['5000'] = ['1001', '1000']
+    server.failing_methods.add('GetCollectionDetails')
+
+    records = workshop.resolve_records(['1000', '5000', '1001'], refresh=True)
+
+    assert server.pages() == ['5000']
+    assert records[0]['title'] == "Addon 1000" and records[2]['title'] == "Addon 1001"
+    assert records[1]['page_type'] == 'collection'
+
+def test_api_record_matches_html_record(server):
+    addon_ids = ['1002', '1003']
+    add_addons(server, addon_ids)
+
+    api_records = workshop.resolve_records(addon_ids, refresh=True)
+    workshop.configure_session(backend='html')
+    html_records = workshop.resolve_records(addon_ids, refresh=True)
+
+    assert len(server.posts('GetPublishedFileDetails')) == 1
+    assert sorted(server.pages()) == addon_ids
+    assert api_records == html_records
+    assert api_records[0]['is_map'] and not api_records[1]['is_map']
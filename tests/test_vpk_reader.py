@@ -0,0 +1,260 @@
+import os
+import hashlib
+import random
+import struct
+import zlib
+import pytest
+import vpk_reader
+import addon_manager
+
+DIR_ARCHIVE = vpk_reader.DIR_ARCHIVE_INDEX
+
+def build_vpk(directory, files, version=2, preload=0, archive_of=None, name="workshop_dir.vpk"):
+    """
+    Writes VPK with given files {path: bytes} to directory, returns path of _dir file
+    preload: number of leading bytes of each file stored in directory index
+    archive_of: function path -> archive index, data of other files is stored in _dir file
+    """
+    tree = {}
+    for path in files:
+        directory_name, file_name = os.path.split(path)
+        base, extension = os.path.splitext(file_name)
+        tree.setdefault(extension[1:] or ' ', {}).setdefault(directory_name or ' ', []).append((base, path))
+
+    index = bytearray()
+    dir_data = bytearray()
+    archives = {}
+    for extension, directories in tree.items():
+        index += extension.encode() + b'\0'
+        for directory_name, names in directories.items():
+            index += directory_name.encode() + b'\0'
+            for base, path in names:
+                data = files[path]
+                preload_data = data[:preload]
+                rest = data[len(preload_data):]
+                archive_index = archive_of(path) if archive_of else DIR_ARCHIVE
+                target = dir_data if archive_index == DIR_ARCHIVE else archives.setdefault(archive_index, bytearray())
+                offset = len(target)
+                target += rest
+                index += base.encode() + b'\0'
+                index += struct.pack('<IHHIIH', zlib.crc32(data), len(preload_data), archive_index, offset, len(rest), 0xffff)
+                index += preload_data
+            index += b'\0'
+        index += b'\0'
+    index += b'\0'
+
+    if version == 1:
+        content = struct.pack('<3I', vpk_reader.VPK_SIGNATURE, 1, len(index)) + index + dir_data
+    else:
+        # Archive MD5 section is empty, other MD5 section has hashes of tree, archive section and whole file
+        content = struct.pack('<7I', vpk_reader.VPK_SIGNATURE, 2, len(index), len(dir_data), 0, 48, 0) + index + dir_data
+        content += hashlib.md5(index).digest() + hashlib.md5(b'').digest()
+        content += hashlib.md5(content).digest()
+
+    dir_path = os.path.join(directory, name)
+    with open(dir_path, 'wb') as file:
+        file.write(content)
+    for archive_index, data in archives.items():
+        with open(os.path.join(directory, name.replace("dir.", "%03d." % archive_index)), 'wb') as file:
+            file.write(data)
+    return dir_path
+
+def make_files(count=40, seed=1):
+    generator = random.Random(seed)
+    files = {
+        "maps/test_map.bsp": generator.randbytes(50000),
+        "maps/graphs/test_map.ain": generator.randbytes(3000),
+        "readme": b"no extension",
+        "empty.txt": b"",
+        "addoninfo.txt": b'"AddonInfo"\n{\n\taddontitle\t"Synthetic Map"\n}\n'
+    }
+    for number in range(count):
+        files["materials/dir%d/texture%d.vtf" % (number % 4, number)] = generator.randbytes(generator.randint(1, 20000))
+    return files
+
+# (version, preload, archive_of)
+LAYOUTS = {
+    'v1': (1, 0, None),
+    'v2': (2, 0, None),
+    'v2_preload': (2, 16, None),
+    'v2_multi_archive': (2, 0, lambda path: len(path) % 3),
+    'v2_multi_archive_preload': (2, 8, lambda path: DIR_ARCHIVE if path.endswith('.txt') else len(path) % 2)
+}
+
+@pytest.fixture(params=sorted(LAYOUTS))
+def archive(request, tmp_path):
+    version, preload, archive_of = LAYOUTS[request.param]
+    files = make_files()
+    return build_vpk(str(tmp_path), files, version, preload, archive_of), files
+
+def extract_all(dir_path, output_dir):
+    chunks = []
+    with vpk_reader.open_vpk(dir_path) as pak:
+        for path in pak:
+            save_path = os.path.join(output_dir, path)
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            pak.extract(path, save_path, chunks.append)
+    return sum(chunks)
+
+def assert_extracted(output_dir, files):
+    for path, data in files.items():
+        with open(os.path.join(output_dir, path), 'rb') as file:
+            assert file.read() == data, path
+
+def test_index_lists_all_entries(archive):
+    dir_path, files = archive
+    with vpk_reader.open_vpk(dir_path) as pak:
+        assert set(pak) == set(files)
+        assert len(pak) == len(files)
+        for path, data in files.items():
+            entry = pak.entries[path]
+            assert pak.entry_size(entry) == len(data)
+            assert entry.crc32 == zlib.crc32(data)
+
+def test_read_returns_source_bytes(archive):
+    dir_path, files = archive
+    with vpk_reader.open_vpk(dir_path) as pak:
+        for path, data in files.items():
+            assert pak.read(path) == data
+
+@pytest.mark.skipif(not hasattr(os, 'copy_file_range'), reason="os.copy_file_range is not available")
+def test_extract_with_copy_file_range(archive, tmp_path, monkeypatch):
+    dir_path, files = archive
+    calls = []
+    copy_file_range = os.copy_file_range
+    def counting_copy_file_range(*args):
+        calls.append(args)
+        return copy_file_range(*args)
+    monkeypatch.setattr(os, 'copy_file_range', counting_copy_file_range)
+    monkeypatch.setattr(vpk_reader, 'COPY_CHUNK_SIZE', 4096)
+
+    output_dir = str(tmp_path / "out")
+    reported = extract_all(dir_path, output_dir)
+    assert calls
+    assert reported == sum(len(data) for data in files.values())
+    assert_extracted(output_dir, files)
+
+def test_extract_with_mmap(archive, tmp_path, monkeypatch):
+    dir_path, files = archive
+    monkeypatch.delattr(os, 'copy_file_range', raising=False)
+    monkeypatch.setattr(vpk_reader, 'COPY_CHUNK_SIZE', 4096)
+
+    output_dir = str(tmp_path / "out")
+    reported = extract_all(dir_path, output_dir)
+    assert reported == sum(len(data) for data in files.values())
+    assert_extracted(output_dir, files)
+
+def test_multi_archive_paths(tmp_path):
+    files = make_files()
+    dir_path = build_vpk(str(tmp_path), files, archive_of=lambda path: len(path) % 3, name="pak01_dir.vpk")
+    with vpk_reader.open_vpk(dir_path) as pak:
+        assert pak.archive_path(2) == str(tmp_path / "pak01_002.vpk")
+        assert pak.archive_path(DIR_ARCHIVE) == dir_path
+        assert {entry.archive_index for entry in pak.entries.values()} == {0, 1, 2}
+        for path, data in files.items():
+            assert pak.read(path) == data
+
+def test_truncated_archive_raises(tmp_path):
+    files = make_files()
+    dir_path = build_vpk(str(tmp_path), files, archive_of=lambda path: 0)
+    archive_path = dir_path.replace("dir.", "000.")
+    with open(archive_path, 'r+b') as file:
+        file.truncate(os.path.getsize(archive_path) // 2)
+    with vpk_reader.open_vpk(dir_path) as pak:
+        with pytest.raises(vpk_reader.VPKError):
+            for path in pak:
+                pak.read(path)
+
+def test_invalid_files_raise(tmp_path):
+    bad_signature = tmp_path / "bad_dir.vpk"
+    bad_signature.write_bytes(struct.pack('<3I', 0x12345678, 1, 0))
+    short = tmp_path / "short_dir.vpk"
+    short.write_bytes(b"VPK")
+    unsupported = tmp_path / "v3_dir.vpk"
+    unsupported.write_bytes(struct.pack('<3I', vpk_reader.VPK_SIGNATURE, 3, 0))
+    for path in (bad_signature, short, unsupported):
+        with pytest.raises(vpk_reader.VPKError):
+            vpk_reader.open_vpk(str(path))
+
+def test_vpk_contains_map(tmp_path):
+    files = make_files()
+    map_dir = tmp_path / "map"
+    other_dir = tmp_path / "other"
+    map_dir.mkdir()
+    other_dir.mkdir()
+    map_vpk = build_vpk(str(map_dir), files)
+    other_vpk = build_vpk(str(other_dir), {path: data for path, data in files.items() if not path.startswith("maps/")})
+    broken = tmp_path / "broken_dir.vpk"
+    broken.write_bytes(b"not a vpk file")
+
+    assert addon_manager.vpk_contains_map(map_vpk) is True
+    assert addon_manager.vpk_contains_map(other_vpk) is False
+    assert addon_manager.vpk_contains_map(str(broken)) is None
+
+def test_read_local_title_from_vpk(archive):
+    dir_path, files = archive
+    assert addon_manager.read_local_title(dir_path) == "Synthetic Map"
+
+def test_read_local_title_from_folder(tmp_path):
+    folder = tmp_path / "workshop_dir"
+    folder.mkdir()
+    (folder / "AddonInfo.txt").write_text('"AddonInfo"\n{\n\ttitle "Extracted Map"\n}\n', encoding='utf-8')
+    assert addon_manager.read_local_title(str(folder)) == "Extracted Map"
+    assert addon_manager.read_local_title(str(tmp_path / "workshop_dir.vpk")) == "Extracted Map"
+
+def test_read_local_title_missing(tmp_path):
+    files = {path: data for path, data in make_files().items() if path != "addoninfo.txt"}
+    dir_path = build_vpk(str(tmp_path), files)
+    assert addon_manager.read_local_title(dir_path) is None
+
+def test_truncated_index_raises(tmp_path):
+    files = make_files()
+    dir_path = build_vpk(str(tmp_path), files, version=1)
+    with open(dir_path, 'rb') as file:
+        content = file.read()
+    tree_length = struct.unpack_from('<I', content, 8)[0]
+
+    # Cut inside the tree (tree length points past end of file) and inside first entry fields
+    first_entry = content.index(b'\0', content.index(b'\0', content.index(b'\0', 12) + 1) + 1) + 1
+    for size in (12 + tree_length // 2, first_entry + 5):
+        truncated = tmp_path / f"truncated{size}_dir.vpk"
+        truncated.write_bytes(content[:size])
+        with pytest.raises(vpk_reader.VPKError):
+            vpk_reader.open_vpk(str(truncated))
+        assert addon_manager.vpk_contains_map(str(truncated)) is None
+
+    # Tree length shortened so the last entry fields are cut by the end of the tree
+    short_tree = tmp_path / "short_tree_dir.vpk"
+    short_tree.write_bytes(content[:8] + struct.pack('<I', first_entry + 5 - 12) + content[12:])
+    with pytest.raises(vpk_reader.VPKError):
+        vpk_reader.open_vpk(str(short_tree))
+
+def test_failed_copy_file_range_charges_bytes_once(tmp_path, monkeypatch):
+    files = make_files()
+    dir_path = build_vpk(str(tmp_path), files, archive_of=lambda path: 0)
+    def unsupported(*args):
+        raise OSError(95, "Operation not supported")
+    monkeypatch.setattr(os, 'copy_file_range', unsupported, raising=False)
+    monkeypatch.setattr(vpk_reader, 'COPY_CHUNK_SIZE', 4096)
+
+    output_dir = str(tmp_path / "out")
+    reported = extract_all(dir_path, output_dir)
+    assert reported == sum(len(data) for data in files.values())
+    assert_extracted(output_dir, files)
+
+def test_interrupted_copy_file_range_output_is_complete(tmp_path, monkeypatch):
+    files = make_files()
+    dir_path = build_vpk(str(tmp_path), files, archive_of=lambda path: 0)
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    calls = []
+    def failing_second_call(*args):
+        calls.append(args)
+        if len(calls) % 2 == 0 or copy_file_range is None:
+            raise OSError(18, "Invalid cross-device link")
+        return copy_file_range(*args)
+    monkeypatch.setattr(os, 'copy_file_range', failing_second_call, raising=False)
+    monkeypatch.setattr(vpk_reader, 'COPY_CHUNK_SIZE', 4096)
+
+    output_dir = str(tmp_path / "out")
+    extract_all(dir_path, output_dir)
+    assert_extracted(output_dir, files)
@@ -0,0 +1,33 @@
+import os
+import workshop_index
+
+def make_addon(workshop_path, addon_id, content=b"vpk"):
+    folder = os.path.join(workshop_path, addon_id)
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, workshop_index.VPK_NAME), "wb") as file:
+        file.write(content)
+    return folder
+
+def test_unchanged_folders_are_reused(tmp_path):
+    make_addon(str(tmp_path), "1")
+    make_addon(str(tmp_path), "2")
+    index = workshop_index.WorkshopIndex(str(tmp_path))
+    record = index.addons["1"]
+
+    assert index.refresh() == 0
+    assert index.addons["1"] is record
+
+def test_rescan_sees_file_rewritten_in_place(tmp_path):
+    folder = make_addon(str(tmp_path), "1")
+    index = workshop_index.WorkshopIndex(str(tmp_path))
+    folder_mtime = os.stat(folder).st_mtime_ns
+
+    # Rewrite in place does not change folder mtime
+    with open(os.path.join(folder, workshop_index.VPK_NAME), "r+b") as file:
+        file.write(b"updated vpk")
+    os.utime(folder, ns=(folder_mtime, folder_mtime))
+
+    assert index.refresh() == 0
+    assert index.get_file("1", workshop_index.VPK_NAME)['size'] == 3
+    assert index.refresh(rescan={"1"}) == 1
+    assert index.get_file("1", workshop_index.VPK_NAME)['size'] == len(b"updated vpk")
@@ -0,0 +1,87 @@
+import time
+import workshop
+import metadata_cache
+from conftest import LAST_MODIFIED
+
+def make_record(addon_id):
+    return {'id': addon_id, 'title': f"Addon {addon_id}", 'page_type': 'addon', 'tags': [], 'is_map': False,
+            'file_size': None, 'time_updated': None}
+
+def test_records_in_memory_are_bounded(server, monkeypatch):
+    monkeypatch.setattr(workshop, 'MAX_RECORDS', 10)
+    for number in range(25):
+        workshop._store_record(workshop.addon_url(str(number)), make_record(str(number)))
+
+    assert list(workshop._records) == [str(number) for number in range(15, 25)]
+    # Evicted records are still known from metadata cache
+    assert workshop.get_addon_metadata(workshop.addon_url('0'))['title'] == "Addon 0"
+    assert server.requests == []
+
+def test_expired_records_are_dropped(server, monkeypatch):
+    workshop._store_record(workshop.addon_url('1'), make_record('1'))
+    expired = workshop._records['1'][0] + workshop.RECORD_TTL + 1
+    monkeypatch.setattr(time, 'time', lambda: expired)
+    workshop._store_record(workshop.addon_url('2'), make_record('2'))
+
+    assert list(workshop._records) == ['2']
+
+def test_second_fetch_sends_validators(server):
+    server.addons['1000'] = ("Addon 1000", ['Maps'])
+    server.etags['1000'] = '"v1"'
+    url = workshop.addon_url('1000')
+
+    workshop.get_addon_metadata(url, refresh=True)
+    workshop.get_addon_metadata(url, refresh=True)
+
+    first, second = [request['headers'] for request in server.requests]
+    assert 'If-None-Match' not in first
+    assert second['If-None-Match'] == '"v1"'
+    assert second['If-Modified-Since'] == LAST_MODIFIED
+
+def test_not_modified_page_reuses_stored_record(server, monkeypatch):
+    server.addons['1000'] = ("Addon 1000", ['Maps'])
+    server.etags['1000'] = '"v1"'
+    workshop.configure_session(backend='html')
+    stored = workshop.resolve_records(['1000'], refresh=True)[0]
+
+    def parse_page(*args):
+        raise AssertionError("page body parsed")
+    monkeypatch.setattr(workshop, 'parse_page', parse_page)
+    records = workshop.resolve_records(['1000'], refresh=True)
+
+    assert records == [stored]
+    assert records[0]['is_map']
+
+def test_changed_page_replaces_stored_record(server):
+    server.addons['1000'] = ("Addon 1000", ['Maps'])
+    server.etags['1000'] = '"v1"'
+    url = workshop.addon_url('1000')
+    workshop.get_addon_metadata(url, refresh=True)
+
+    server.addons['1000'] = ("Addon 1000 v2", ['Weapons'])
+    server.etags['1000'] = '"v2"'
+    record = workshop.get_addon_metadata(url, refresh=True)
+
+    assert record['title'] == "Addon 1000 v2" and not record['is_map']
+    page = metadata_cache.get_cache().get_page(url)
+    assert page['etag'] == '"v2"'
+    assert page['record'] == record
+
+def test_collection_page_is_parsed_while_streaming(server, monkeypatch):
+    server.addons['1000'] = ("Addon 1000", [])
+    server.addons['1001'] = ("Addon 1001", [])
+    server.collections['5000'] = ['1000', '1001']
+    server.etags['5000'] = '"c1"'
+    parsed = []
+    parse_collection_page = workshop.parse_collection_page
+    monkeypatch.setattr(workshop, 'parse_collection_page', lambda *args: parsed.append(args) or parse_collection_page(*args))
+    monkeypatch.setattr(workshop, 'parse_page', None)
+
+    first = workshop.get_collection_addons(workshop.addon_url('5000'))
+    workshop._records.clear()
+    second = workshop.get_collection_addons(workshop.addon_url('5000'))
+
+    assert first == second == [('1001', "Addon 1001"), ('1000', "Addon 1000")]
+    # Second download is answered with 304 and reuses stored items
+    assert len(parsed) == 1
+    assert [request['headers'].get('If-None-Match') for request in server.requests if request['name'] == 'page'] == [None, '"c1"']
@@ -0,0 +1,39 @@
+import pytest
+import requests
+import workshop
+
+def test_error_status_is_retried(server):
+    workshop.configure_session(max_retries=2, backoff=0)
+    server.scripted['/flaky'] = [(503, "busy"), (200, "ok")]
+
+    response = workshop.http_get(server.url + "/flaky")
+
+    assert response.status_code == 200
+    assert response.text == "ok"
+    assert [request['name'] for request in server.requests] == ['/flaky', '/flaky']
+
+def test_retries_are_limited(server):
+    workshop.configure_session(max_retries=1, backoff=0)
+    server.scripted['/down'] = [(503, "busy")] * 3
+
+    with pytest.raises(requests.HTTPError) as error:
+        workshop.http_get(server.url + "/down")
+    assert error.value.response.status_code == 503
+    assert len(server.requests) == 2
+
+def test_session_is_shared_and_keeps_connection(server):
+    for number in range(5):
+        server.scripted[f'/page{number}'] = [(200, str(number))]
+
+    session = workshop.get_session()
+    texts = [workshop.http_get(f"{server.url}/page{number}").text for number in range(5)]
+
+    assert workshop.get_session() is session
+    assert texts == ['0', '1', '2', '3', '4']
+    # One pooled connection: all requests come from the same client port
+    assert len({request['port'] for request in server.requests}) == 1
+
+def test_configure_session_replaces_session(server):
+    session = workshop.get_session()
+    workshop.configure_session(max_retries=0)
+    assert workshop.get_session() is not session
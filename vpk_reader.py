@@ -0,0 +1,231 @@
+import os
+import mmap
+import struct
+import threading
+from collections import namedtuple
+from i18n import tr
+
+VPK_SIGNATURE = 0x55aa1234
+
+# Archive index of entries stored in the _dir file itself
+DIR_ARCHIVE_INDEX = 0x7fff
+
+ENTRY_TERMINATOR = 0xffff
+
+# Size of entry fields after its name: crc, preload length, archive index, offset, length, terminator
+ENTRY_SIZE = 18
+
+# Size of pieces written when copying entry data
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Entry data location, preload bytes are referenced by offset inside the _dir file
+VPKEntry = namedtuple('VPKEntry', ['crc32', 'preload_offset', 'preload_length', 'archive_index', 'offset', 'length'])
+
+class VPKError(Exception):
+    pass
+
+class VPKArchive:
+    """
+    Reader of Valve VPK v1/v2 archives built on mmap of _dir and _NNN files
+    Only directory index is parsed on open, entry data is never loaded into Python bytes
+    unless read() is called
+    """
+    def __init__(self, dir_path):
+        self.dir_path = dir_path
+        self.entries = {}
+        self._archives = {}
+        self._archives_lock = threading.Lock()
+
+        self._dir_file = open(dir_path, 'rb')
+        try:
+            self._dir_map = mmap.mmap(self._dir_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_header()
+            self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._dir_map) < 12:
+            raise VPKError(tr("File is not VPK (too short)"))
+
+        signature, self.version, self.tree_length = struct.unpack_from('<3I', self._dir_map, 0)
+        if signature != VPK_SIGNATURE:
+            raise VPKError(tr("File is not VPK (invalid signature)"))
+
+        if self.version == 1:
+            self.header_length = 12
+        elif self.version == 2:
+            self.header_length = 28
+        else:
+            raise VPKError(tr("Unsupported VPK version: {}").format(self.version))
+
+        # Entries stored in _dir file have offsets relative to the end of the tree
+        self.data_offset = self.header_length + self.tree_length
+        if self.data_offset > len(self._dir_map):
+            raise VPKError(tr("Error parsing index (file is truncated)"))
+
+    def _read_string(self, position):
+        end = self._dir_map.find(b'\0', position, self.data_offset)
+        if end == -1:
+            raise VPKError(tr("Error parsing index (unterminated string)"))
+        return self._dir_map[position:end].decode('utf-8', 'replace'), end + 1
+
+    def _read_index(self):
+        position = self.header_length
+        while True:
+            extension, position = self._read_string(position)
+            if not extension:
+                break
+
+            while True:
+                directory, position = self._read_string(position)
+                if not directory:
+                    break
+                # Single space means root directory / no extension
+                prefix = '' if directory == ' ' else directory + '/'
+                suffix = '' if extension == ' ' else '.' + extension
+
+                while True:
+                    name, position = self._read_string(position)
+                    if not name:
+                        break
+
+                    if position + ENTRY_SIZE > self.data_offset:
+                        raise VPKError(tr("Error parsing index (truncated entry)"))
+                    crc, preload_length, archive_index, offset, length, terminator = struct.unpack_from('<IHHIIH', self._dir_map, position)
+                    position += ENTRY_SIZE
+                    if terminator != ENTRY_TERMINATOR:
+                        raise VPKError(tr("Error parsing index (bad entry terminator)"))
+
+                    if archive_index == DIR_ARCHIVE_INDEX:
+                        offset += self.data_offset
+
+                    self.entries[prefix + name + suffix] = VPKEntry(crc, position, preload_length, archive_index, offset, length)
+                    position += preload_length
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def archive_path(self, archive_index):
+        """Returns path of file containing data of given archive index"""
+        if archive_index == DIR_ARCHIVE_INDEX:
+            return self.dir_path
+        head, tail = os.path.split(self.dir_path)
+        return os.path.join(head, tail.replace("dir.", "%03d." % archive_index))
+
+    def _get_archive_map(self, archive_index):
+        if archive_index == DIR_ARCHIVE_INDEX:
+            return self._dir_map
+        with self._archives_lock:
+            if archive_index not in self._archives:
+                archive_file = open(self.archive_path(archive_index), 'rb')
+                try:
+                    archive_map = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+                except Exception:
+                    archive_file.close()
+                    raise
+                self._archives[archive_index] = (archive_file, archive_map)
+            return self._archives[archive_index][1]
+
+    def get_preload(self, entry):
+        """Returns memoryview of entry preload bytes"""
+        return memoryview(self._dir_map)[entry.preload_offset:entry.preload_offset + entry.preload_length]
+
+    def get_data(self, entry):
+        """Returns memoryview of entry data stored in archive (without preload bytes)"""
+        if not entry.length:
+            return memoryview(b'')
+        archive_map = self._get_archive_map(entry.archive_index)
+        if entry.offset + entry.length > len(archive_map):
+            raise VPKError(tr("Unexpected end of VPK archive"))
+        return memoryview(archive_map)[entry.offset:entry.offset + entry.length]
+
+    def entry_size(self, entry):
+        return entry.preload_length + entry.length
+
+    def read(self, path):
+        """Returns entry contents as bytes"""
+        entry = self.entries[path]
+        return bytes(self.get_preload(entry)) + bytes(self.get_data(entry))
+
+    def extract(self, path, save_path, on_chunk=None):
+        """
+        Writes entry to file without intermediate copies
+        Uses os.copy_file_range where available, otherwise writes memoryview slices of mmap
+        on_chunk: function called with size of each piece before it is written
+        """
+        entry = self.entries[path]
+        with open(save_path, 'wb', buffering=0) as output:
+            if entry.preload_length:
+                preload = self.get_preload(entry)
+                if on_chunk:
+                    on_chunk(len(preload))
+                output.write(preload)
+
+            if entry.length:
+                if not self._copy_file_range(entry, output, on_chunk):
+                    data = self.get_data(entry)
+                    for start in range(0, len(data), COPY_CHUNK_SIZE):
+                        chunk = data[start:start + COPY_CHUNK_SIZE]
+                        if on_chunk:
+                            on_chunk(len(chunk))
+                        output.write(chunk)
+
+    def _copy_file_range(self, entry, output, on_chunk):
+        """Copies entry data inside the kernel, returns False if not supported"""
+        if not hasattr(os, 'copy_file_range'):
+            return False
+
+        if entry.archive_index == DIR_ARCHIVE_INDEX:
+            source_fd = self._dir_file.fileno()
+        else:
+            self._get_archive_map(entry.archive_index)
+            source_fd = self._archives[entry.archive_index][0].fileno()
+
+        start_position = output.tell()
+        copied = 0
+        try:
+            while copied < entry.length:
+                size = min(COPY_CHUNK_SIZE, entry.length - copied)
+                written = os.copy_file_range(source_fd, output.fileno(), size, entry.offset + copied)
+                if written == 0:
+                    raise VPKError(tr("Unexpected end of VPK archive"))
+                # Charged after copy: bytes of failed copy are charged once by the fallback writes
+                if on_chunk:
+                    on_chunk(written)
+                copied += written
+        except OSError:
+            if copied:
+                # Continue from the start with regular writes
+                output.seek(start_position)
+                output.truncate()
+            return False
+        return True
+
+    def close(self):
+        with self._archives_lock:
+            for archive_file, archive_map in self._archives.values():
+                archive_map.close()
+                archive_file.close()
+            self._archives = {}
+        if getattr(self, '_dir_map', None) is not None:
+            self._dir_map.close()
+            self._dir_map = None
+        self._dir_file.close()
+
+def open_vpk(dir_path):
+    """Opens VPK archive by path to its _dir file (or single-file VPK)"""
+    return VPKArchive(dir_path)
@@ -1,83 +1,674 @@
+import asyncio
+import functools
+import concurrent.futures
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+from lxml import etree
 import re
+import threading
+from collections import OrderedDict
+import time
+from datetime import datetime
+from urllib.parse import unquote_plus, urlsplit
 from logger import log
 from i18n import tr, translator
+import metadata_cache
 
-def get_page_type(url):
+WORKSHOP_BASE_URL = "https://steamcommunity.com"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Number of threads for blocking page requests and local map checks (async resolver has its own limit)
+MAX_WORKERS = 5
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (5, 20)
+
+# Retries with exponential backoff for rate limiting and Steam server errors
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Async resolver: requests in flight per host start at RESOLVER_CONCURRENCY,
+# grow while Steam answers and are halved on every 429 response
+RESOLVER_CONCURRENCY = 8
+RESOLVER_MAX_CONCURRENCY = 32
+
+# Offline mode: records come only from memory and metadata cache (of any age), sessions refuse to be created
+OFFLINE_MODE = False
+
+class OfflineError(Exception):
+    pass
+
+_session = None
+_resolver_session = None
+_session_lock = threading.Lock()
+
+def _create_session(pool_size=None, retry_statuses=RETRY_STATUSES, respect_retry_after=True):
+    """Creates HTTP session with keep-alive connection pool and retry policy"""
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=retry_statuses,
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=respect_retry_after,
+        raise_on_status=False
+    )
+    # One pooled connection per worker thread so threads never wait for a socket
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size or MAX_WORKERS, max_retries=retry)
+    
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session():
     """
-    Determines page type by presence of specific substrings in HTML
-    Returns: 'collection', 'addon' or 'unknown'
+    Returns shared HTTP session
+    Session is created on first use and reused by all threads, so connections
+    to Steam are kept alive between requests instead of reconnecting every time
+    """
+    global _session
+    if OFFLINE_MODE:
+        raise OfflineError(tr("Network requests are disabled in offline mode"))
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+def get_resolver_session():
+    """
+    Returns shared HTTP session of async resolver
+    Its pool has a connection per request in flight, and 429 responses are not retried
+    inside requests (urllib3 retries any response with Retry-After header unless disabled):
+    the resolver handles them to lower its concurrency
+    """
+    global _resolver_session
+    if OFFLINE_MODE:
+        raise OfflineError(tr("Network requests are disabled in offline mode"))
+    if _resolver_session is None:
+        with _session_lock:
+            if _resolver_session is None:
+                statuses = tuple(status for status in RETRY_STATUSES if status != 429)
+                _resolver_session = _create_session(RESOLVER_MAX_CONCURRENCY, statuses, respect_retry_after=False)
+    return _resolver_session
+
+def close_session():
+    """Closes shared sessions and their pooled connections"""
+    global _session, _resolver_session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _resolver_session is not None:
+            _resolver_session.close()
+            _resolver_session = None
+
+def configure_session(base_url=None, timeout=None, max_retries=None, backoff=None, max_workers=None,
+                      max_concurrency=None, api_base_url=None, backend=None, offline=None):
     """
+    Changes HTTP settings. Current session is closed, next request creates a new one.
+    base_url and api_base_url allow pointing workshop and Steam Web API requests to a local stand-in server
+    backend: metadata backend name (see BACKENDS)
+    offline: enable offline mode (see OFFLINE_MODE)
+    """
+    global WORKSHOP_BASE_URL, REQUEST_TIMEOUT, MAX_RETRIES, RETRY_BACKOFF, MAX_WORKERS, RESOLVER_MAX_CONCURRENCY
+    global STEAM_API_BASE_URL, METADATA_BACKEND, OFFLINE_MODE
+    if offline is not None and bool(offline) != OFFLINE_MODE:
+        OFFLINE_MODE = bool(offline)
+        log.info(tr("Offline mode enabled") if OFFLINE_MODE else tr("Offline mode disabled"))
+    if base_url is not None:
+        WORKSHOP_BASE_URL = base_url.rstrip('/')
+    if api_base_url is not None:
+        STEAM_API_BASE_URL = api_base_url.rstrip('/')
+    if backend is not None:
+        METADATA_BACKEND = backend
+    if timeout is not None:
+        REQUEST_TIMEOUT = timeout
+    if max_retries is not None:
+        MAX_RETRIES = max_retries
+    if backoff is not None:
+        RETRY_BACKOFF = backoff
+    if max_workers is not None:
+        MAX_WORKERS = max_workers
+    if max_concurrency is not None:
+        RESOLVER_MAX_CONCURRENCY = max_concurrency
+    close_session()
+
+def http_get(url, **kwargs):
+    """
+    Performs GET request through shared session
+    Returns response, raises exception on HTTP error
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    response = get_session().get(url, **kwargs)
+    response.raise_for_status()
+    return response
+
+def addon_url(addon_id):
+    """Returns Steam Workshop page URL for addon ID"""
+    return f"{WORKSHOP_BASE_URL}/sharedfiles/filedetails/?id={addon_id}"
+
+# Parsed pages are kept for a short time, so a page downloaded to validate URL
+# is reused for addon title, collection items and map check
+RECORD_TTL = 300
+
+MAP_TAG = 'maps'
+
+# Records kept in memory at most, older ones are read from metadata cache
+MAX_RECORDS = 1000
+
+# Key -> (time fetched, record) in order of fetching, expired records are dropped on store
+_records = OrderedDict()
+_records_lock = threading.Lock()
+
+def _parse_page_type(html_content):
+    # Check if page is a Half-Life 2 collection
+    if 'myworkshopfiles/?section=collections&appid=220' in html_content:
+        return 'collection'
+    
+    # Check if page is a Half-Life 2 addon
+    if 'myworkshopfiles/?appid=220' in html_content:
+        return 'addon'
+    
+    return 'unknown'
+
+def _parse_tags(soup):
+    """Returns list of lowercase workshop tags from tag links on the page"""
+    tags = []
+    for link in soup.find_all('a', href=re.compile(r'requiredtags')):
+        match = re.search(r'requiredtags(?:%5B%5D|\[\])=([^&"]+)', link['href'])
+        if match:
+            tag = unquote_plus(match.group(1)).lower()
+            if tag not in tags:
+                tags.append(tag)
+    return tags
+
+def _parse_file_size(text):
+    """Converts size text like '12.345 MB' to bytes"""
+    match = re.search(r'([\d.,]+)\s*(B|KB|MB|GB)', text)
+    if not match:
+        return None
+    multipliers = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        html_content = response.text
+        value = float(match.group(1).replace(',', ''))
+    except ValueError:
+        return None
+    return int(value * multipliers[match.group(2)])
+
+def _parse_steam_date(text):
+    """Converts date like '17 Oct, 2023 @ 4:12pm' to unix time"""
+    text = text.strip()
+    formats = ['%d %b, %Y @ %I:%M%p', '%b %d, %Y @ %I:%M%p']
+    for date_format in formats:
+        try:
+            return int(datetime.strptime(text, date_format).timestamp())
+        except ValueError:
+            pass
+    
+    # Dates of the current year are shown without year
+    with_year = re.sub(r'^(\w+ \w+)', r'\1, {}'.format(datetime.now().year), text)
+    for date_format in formats:
+        try:
+            return int(datetime.strptime(with_year, date_format).timestamp())
+        except ValueError:
+            pass
+    return None
+
+def _parse_details_stats(soup):
+    """Returns tuple (file_size, time_updated) from page details block"""
+    stats = [element.get_text(strip=True) for element in soup.select('.detailsStatsContainerRight .detailsStatRight')]
+    if not stats:
+        return None, None
+    
+    file_size = _parse_file_size(stats[0])
+    # Stats are: size, posted, [updated]
+    time_updated = _parse_steam_date(stats[-1]) if len(stats) > 1 else None
+    return file_size, time_updated
+
+# Collection pages are read in chunks of this size
+COLLECTION_CHUNK_SIZE = 64 * 1024
+
+_ITEM_ID_RE = re.compile(r'"id":"(\d+)"')
+_ITEM_LINK_RE = re.compile(r'filedetails.*id=(\d+)')
+_TAG_LINK_RE = re.compile(r'requiredtags(?:%5B%5D|\[\])=([^&"]+)')
+
+class _CollectionPageTarget:
+    """
+    lxml parser target collecting collection page data from parser events, no tree is built
+    Gives the same data as BeautifulSoup parsing: first workshopItemTitle of the page, tag links
+    and collectionItem divs with ID (from item script, or from link) and title
+    Text is joined like get_text(strip=True): each piece between tags stripped
+    """
+    def __init__(self):
+        self.title = None
+        self.tags = []
+        self.items = []
+        self._seen_ids = set()
+        self._div_depth = 0
+        self._item = None
+        self._capture = None
+        self._capture_depth = 0
+        self._pieces = []
+        self._buffer = []
+
+    def _flush_text(self):
+        if self._buffer:
+            self._pieces.append(''.join(self._buffer).strip())
+            self._buffer = []
+
+    def start(self, tag, attrib):
+        if self._capture:
+            self._flush_text()
         
-        # Check if page is a Half-Life 2 collection
-        if 'myworkshopfiles/?section=collections&appid=220' in html_content:
-            return 'collection'
+        if tag == 'div':
+            self._div_depth += 1
+            classes = attrib.get('class', '').split()
+            if self._item is None and 'collectionItem' in classes:
+                self._item = {'depth': self._div_depth, 'id': None, 'link_id': None, 'title': None}
+            elif 'workshopItemTitle' in classes and self._capture is None:
+                if self.title is None or (self._item is not None and self._item['title'] is None):
+                    self._capture = 'title'
+                    self._capture_depth = self._div_depth
+                    self._pieces = []
+        elif tag == 'script' and self._item is not None and self._item['id'] is None and self._capture is None:
+            self._capture = 'script'
+            self._pieces = []
+        elif tag == 'a':
+            href = attrib.get('href', '')
+            if 'requiredtags' in href:
+                match = _TAG_LINK_RE.search(href)
+                if match:
+                    tag_name = unquote_plus(match.group(1)).lower()
+                    if tag_name not in self.tags:
+                        self.tags.append(tag_name)
+            if self._item is not None and self._item['link_id'] is None:
+                match = _ITEM_LINK_RE.search(href)
+                if match:
+                    self._item['link_id'] = match.group(1)
+
+    def data(self, text):
+        if self._capture:
+            self._buffer.append(text)
+
+    def end(self, tag):
+        if self._capture:
+            self._flush_text()
         
-        # Check if page is a Half-Life 2 addon
-        if 'myworkshopfiles/?appid=220' in html_content:
-            return 'addon'
+        if tag == 'script' and self._capture == 'script':
+            match = _ITEM_ID_RE.search(''.join(self._pieces))
+            if match:
+                self._item['id'] = match.group(1)
+            self._capture = None
+        elif tag == 'div':
+            if self._capture == 'title' and self._div_depth == self._capture_depth:
+                text = ''.join(self._pieces)
+                if self.title is None:
+                    self.title = text
+                if self._item is not None and self._item['title'] is None:
+                    self._item['title'] = text
+                self._capture = None
+            if self._item is not None and self._div_depth == self._item['depth']:
+                self._end_item()
+            self._div_depth -= 1
+
+    def _end_item(self):
+        item = self._item
+        self._item = None
+        addon_id = item['id'] or item['link_id']
+        if not addon_id or addon_id in self._seen_ids:
+            return
+        self._seen_ids.add(addon_id)
+        self.items.append((addon_id, item['title'] if item['title'] is not None else tr("Unknown title")))
+
+    def close(self):
+        return self
+
+def parse_collection_page(chunks, addon_id=None, encoding='utf-8'):
+    """
+    Parses collection page from iterable of text or bytes chunks (e.g. response.iter_content)
+    with lxml parser events, without building DOM
+    Returns record like parse_page; details stats are not read (they are used for addons only)
+    """
+    target = _CollectionPageTarget()
+    parser = None
+    markers = {'collection': 'myworkshopfiles/?section=collections&appid=220', 'addon': 'myworkshopfiles/?appid=220'}
+    found = set()
+    tail = ''
+    
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if parser is None:
+            parser = etree.HTMLParser(target=target, encoding=encoding if isinstance(chunk, bytes) else None)
+        parser.feed(chunk)
         
-        return 'unknown'
+        # Page type markers may be split between chunks
+        text = tail + (chunk.decode(encoding, 'ignore') if isinstance(chunk, bytes) else chunk)
+        found.update(page_type for page_type, marker in markers.items() if marker in text)
+        tail = text[-64:]
+    
+    if parser is not None:
+        parser.close()
+    
+    page_type = 'unknown'
+    if 'collection' in found:
+        page_type = 'collection'
+    elif 'addon' in found:
+        page_type = 'addon'
+    
+    return {
+        'id': addon_id,
+        'title': target.title if target.title is not None else tr("Unknown title"),
+        'page_type': page_type,
+        'tags': target.tags,
+        'is_map': MAP_TAG in target.tags,
+        'file_size': None,
+        'time_updated': None,
+        'items': target.items
+    }
+
+def parse_page(html_content, addon_id=None):
+    """
+    Parses Steam Workshop page HTML into metadata record
+    Returns dictionary with keys: id, title, page_type, tags, is_map, file_size, time_updated
+    Collection pages also have 'items' - list of tuples (id, title) in page order
+    """
+    page_type = _parse_page_type(html_content)
+    
+    # Collection pages can be huge, their items are read without building DOM
+    if page_type == 'collection':
+        return parse_collection_page([html_content], addon_id)
+    
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    title_element = soup.find('div', class_='workshopItemTitle')
+    title = title_element.get_text(strip=True) if title_element else tr("Unknown title")
+    
+    tags = _parse_tags(soup)
+    file_size, time_updated = _parse_details_stats(soup)
+    
+    record = {
+        'id': addon_id,
+        'title': title,
+        'page_type': page_type,
+        'tags': tags,
+        'is_map': MAP_TAG in tags,
+        'file_size': file_size,
+        'time_updated': time_updated
+    }
+    
+    return record
+
+def extract_id_from_url(url):
+    """Extracts workshop ID from page URL, returns None if not found"""
+    match = re.search(r'[?&]id=(\d+)', url)
+    return match.group(1) if match else None
+
+def get_addon_metadata(url, refresh=False):
+    """
+    Gets metadata record of Steam Workshop page (addon or collection) with one request
+    refresh: ignore previously fetched record
+    Returns dictionary (see parse_page) or None on error
+    """
+    addon_id = extract_id_from_url(url)
+    key = addon_id or url
+    
+    if not refresh:
+        with _records_lock:
+            cached = _records.get(key)
+        if cached and time.time() - cached[0] < RECORD_TTL:
+            return cached[1]
         
+        # Addon pages are also kept in persistent cache (collections need their items)
+        if addon_id:
+            record = metadata_cache.get_cache().get(addon_id, ('title', 'is_map'))
+            if record and record['page_type'] == 'addon':
+                return record
+    
+    return _fetch_record(url)
+
+def _conditional_headers(url):
+    """
+    Returns tuple (headers, record) for revalidating page downloaded before:
+    If-None-Match / If-Modified-Since from its stored response and record parsed from it
+    Headers are empty if page was not stored (server sent no validators)
+    """
+    page = metadata_cache.get_cache().get_page(url)
+    if not page:
+        return {}, None
+    headers = {}
+    if page['etag']:
+        headers['If-None-Match'] = page['etag']
+    if page['last_modified']:
+        headers['If-Modified-Since'] = page['last_modified']
+    return headers, page['record']
+
+def _remember_validators(url, response, record):
+    """
+    Stores ETag/Last-Modified of page response together with record parsed from it
+    Collection pages are stored without validators too, offline mode reads their items
+    """
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified or record['page_type'] == 'collection':
+        metadata_cache.get_cache().put_page(url, etag, last_modified, record)
+
+def _get_offline_record(url):
+    """Returns record known without network: from memory, stored page or metadata cache of any age"""
+    addon_id = extract_id_from_url(url)
+    with _records_lock:
+        cached = _records.get(addon_id or url)
+    if cached:
+        return cached[1]
+    
+    page = metadata_cache.get_cache().get_page(url)
+    if page:
+        return page['record']
+    
+    record = metadata_cache.get_cache().get(addon_id, ()) if addon_id else None
+    if record and record['page_type'] is None:
+        # Titles of collection items are stored without page type
+        record['page_type'] = 'addon'
+    return record
+
+def _fetch_record(url):
+    """
+    Downloads and parses page, stores record in memory and persistent cache
+    Page downloaded before is revalidated, 304 response reuses its stored record
+    In offline mode returns record known without network
+    """
+    if OFFLINE_MODE:
+        return _get_offline_record(url)
+    
+    addon_id = extract_id_from_url(url)
+    headers, stored_record = _conditional_headers(url)
+    try:
+        response = http_get(url, headers=headers)
+        if response.status_code == 304 and stored_record:
+            return _store_record(url, stored_record)
+        record = parse_page(response.text, addon_id)
     except Exception as e:
+        log.warning(tr("Failed to get workshop page {}: {}").format(url, e))
+        return None
+    _remember_validators(url, response, record)
+    return _store_record(url, record)
+
+def _store_record(url, record):
+    """Stores parsed record in memory and persistent cache"""
+    now = time.time()
+    with _records_lock:
+        key = record['id'] or url
+        _records.pop(key, None)
+        _records[key] = (now, record)
+        while _records:
+            fetched, _ = next(iter(_records.values()))
+            if now - fetched < RECORD_TTL and len(_records) <= MAX_RECORDS:
+                break
+            _records.popitem(last=False)
+    
+    if record['page_type'] == 'addon':
+        metadata_cache.get_cache().put(record)
+    elif record['page_type'] == 'collection':
+        metadata_cache.get_cache().put_titles(record['items'])
+    return record
+
+def get_page_type(url):
+    """
+    Determines page type by presence of specific substrings in HTML
+    Returns: 'collection', 'addon' or 'unknown'
+    """
+    record = get_addon_metadata(url)
+    if not record:
         return 'unknown'
+    return record['page_type']
+
+def _fetch_collection_record(url):
+    """Downloads collection page in chunks and parses it while downloading, stores record"""
+    addon_id = extract_id_from_url(url)
+    headers, stored_record = _conditional_headers(url)
+    try:
+        with get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            if response.status_code == 304 and stored_record:
+                log.info(tr("Collection page not changed: {}").format(url))
+                return _store_record(url, stored_record)
+            record = parse_collection_page(response.iter_content(chunk_size=COLLECTION_CHUNK_SIZE), addon_id,
+                                           response.encoding or 'utf-8')
+    except Exception as e:
+        log.warning(tr("Failed to get workshop page {}: {}").format(url, e))
+        return None
+    
+    if record['page_type'] != 'collection':
+        return record
+    _remember_validators(url, response, record)
+    return _store_record(url, record)
+
+def _get_collection_record(url):
+    """Returns collection record: fresh one fetched before (e.g. by URL validation) or streamed download"""
+    with _records_lock:
+        cached = _records.get(extract_id_from_url(url) or url)
+    if cached and time.time() - cached[0] < RECORD_TTL and 'items' in cached[1]:
+        return cached[1]
+    if OFFLINE_MODE:
+        record = _get_offline_record(url)
+        return record if record and 'items' in record else None
+    return _fetch_collection_record(url)
+
+def _nested_by_api(level, records):
+    """Returns {collection id: IDs of nested collections} told by Steam Web API (GetCollectionDetails)"""
+    nested = {}
+    api = SteamApiBackend()
+    for i in range(0, len(level), API_BATCH_SIZE):
+        batch = level[i:i + API_BATCH_SIZE]
+        try:
+            children = api.get_collection_children(batch)
+        except Exception as e:
+            log.warning(tr("Failed to check nested collections: {}").format(e))
+            children = {}
+        for collection_id in batch:
+            nested[collection_id] = [child_id for child_id, file_type in children.get(collection_id, [])
+                                     if file_type == COLLECTION_FILE_TYPE]
+    return nested
+
+def _nested_by_known_records(level, records):
+    """
+    Returns {collection id: IDs of nested collections} among page items known without requests:
+    records in memory, stored pages and metadata cache. Items of unknown type are kept as addons
+    """
+    nested = {}
+    unknown = 0
+    for collection_id in level:
+        item_ids = [addon_id for addon_id, title in records[collection_id]['items']]
+        cached = metadata_cache.get_cache().get_many(item_ids, ())
+        nested[collection_id] = []
+        for addon_id in item_ids:
+            with _records_lock:
+                record = _records.get(addon_id)
+            if record:
+                record = record[1]
+            else:
+                page = metadata_cache.get_cache().get_page(addon_url(addon_id))
+                record = page['record'] if page else cached.get(addon_id)
+            
+            if record and record['page_type'] == 'collection':
+                nested[collection_id].append(addon_id)
+            elif not record or record['page_type'] != 'addon':
+                unknown += 1
+    
+    if unknown:
+        log.warning(tr("Nested collections are recognized only by Steam Web API online, "
+                       "{} collection items of unknown type are added as addons").format(unknown))
+    return nested
+
+def _expand_collections(root_id, root_record, find_nested=_nested_by_api):
+    """
+    Replaces nested collections among items of root collection with their items, depth first
+    Nested collections are recognized by find_nested (_nested_by_api or _nested_by_known_records),
+    pages of one nesting level are downloaded concurrently. Every collection is downloaded once,
+    and a collection met again inside itself (cycle) is skipped
+    Returns list of tuples (id, title) in page order without repeated IDs
+    """
+    records = {root_id: root_record}
+    nested = {}
+    level = [root_id]
+    
+    while level:
+        nested.update(find_nested(level, records))
+        
+        next_level = list(dict.fromkeys(child_id for collection_id in level for child_id in nested[collection_id]
+                                        if child_id not in records))
+        if next_level:
+            log.info(tr("Loading {} nested collections").format(len(next_level)))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for child_id, record in zip(next_level, executor.map(lambda child_id: _get_collection_record(addon_url(child_id)), next_level)):
+                    records[child_id] = record if record and record['page_type'] == 'collection' else None
+        level = [child_id for child_id in next_level if records[child_id]]
+    
+    addons = []
+    seen_ids = set()
+    
+    def add_items(collection_id, path):
+        children = nested.get(collection_id, [])
+        listed = {addon_id for addon_id, title in records[collection_id]['items']}
+        # Nested collections missing from page items are expanded after them
+        items = records[collection_id]['items'] + [(child_id, None) for child_id in children if child_id not in listed]
+        for addon_id, title in items:
+            if addon_id not in children:
+                if addon_id not in seen_ids:
+                    seen_ids.add(addon_id)
+                    addons.append((addon_id, title))
+            elif addon_id in path:
+                log.warning(tr("Collection {} contains itself, skipped").format(addon_id))
+            elif records.get(addon_id):
+                add_items(addon_id, path | {addon_id})
+    
+    add_items(root_id, {root_id})
+    return addons
 
 def get_collection_addons(collection_url):
     """
-    Gets addons list from Steam Workshop collection
-    Returns list of tuples (id, title)
+    Gets addons list from Steam Workshop collection, nested collections are replaced with their items
+    Steam Web API tells collections from addons with 'api' metadata backend online, otherwise only
+    items already known as collections are expanded
+    Returns list of tuples (id, title) in reverse page order
     """
     try:
         log.info(tr("Getting addons from collection: {}").format(collection_url))
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(collection_url, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        collection_items = soup.find_all('div', class_='collectionItem')
+        record = _get_collection_record(collection_url)
+        if not record or record['page_type'] != 'collection':
+            return []
         
-        addons = []
-        seen_ids = set()
-        
-        for item in collection_items:
-            addon_id = None
-            
-            # Extract ID from script
-            script_tag = item.find('script')
-            if script_tag and script_tag.string:
-                match = re.search(r'"id":"(\d+)"', script_tag.string)
-                if match:
-                    addon_id = match.group(1)
-            
-            # Alternative method from link
-            if not addon_id:
-                link = item.find('a', href=re.compile(r'filedetails.*id=\d+'))
-                if link and link.get('href'):
-                    match = re.search(r'id=(\d+)', link['href'])
-                    if match:
-                        addon_id = match.group(1)
-            
-            if not addon_id or addon_id in seen_ids:
-                continue
-                
-            seen_ids.add(addon_id)
-            
-            # Extract title
-            title_element = item.find('div', class_='workshopItemTitle')
-            title = title_element.get_text(strip=True) if title_element else tr("Unknown title")
-            addons.append((addon_id, title))
+        if METADATA_BACKEND == 'api' and not OFFLINE_MODE:
+            find_nested = _nested_by_api
+        else:
+            find_nested = _nested_by_known_records
+        addons = _expand_collections(record['id'] or collection_url, record, find_nested)
         
         # REVERSE THE ORDER OF ADDONS
         addons.reverse()
@@ -94,28 +685,10 @@ def get_single_addon(addon_url):
     Gets information about a single addon from Steam Workshop
     Returns tuple (id, title) or (None, None) on error
     """
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(addon_url, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract ID from URL
-        match = re.search(r'id=(\d+)', addon_url)
-        if not match:
-            return None, None
-        addon_id = match.group(1)
-        
-        # Extract title
-        title_element = soup.find('div', class_='workshopItemTitle')
-        title = title_element.get_text(strip=True) if title_element else tr("Unknown title")
-        return addon_id, title
-        
-    except Exception as e:
+    record = get_addon_metadata(addon_url)
+    if not record or not record['id']:
         return None, None
+    return record['id'], record['title']
 
 def validate_workshop_url(url, expected_type):
     """
@@ -132,6 +705,9 @@ def validate_workshop_url(url, expected_type):
     # Determine page type by specific substrings in HTML
     page_type = get_page_type(url)
     
+    if page_type == 'unknown' and OFFLINE_MODE:
+        return False, tr("Page is not available offline")
+    
     if page_type == 'unknown':
         return False, tr("Failed to determine page")
     
@@ -143,33 +719,403 @@ def validate_workshop_url(url, expected_type):
     
     return True, ""
 
-def get_addon_by_id(addon_id):
+def get_cached_titles(addon_ids):
+    """
+    Returns dictionary {id: title} of addons with fresh title in metadata cache
+    In offline mode titles of any age are returned
+    """
+    cached = metadata_cache.get_cache().get_many(addon_ids, () if OFFLINE_MODE else ('title',))
+    return {addon_id: record['title'] for addon_id, record in cached.items()}
+
+def get_addon_by_id(addon_id, refresh=False):
     """
     Gets addon information by its ID
+    refresh: ignore metadata cache and download page
     Returns tuple (id, title) or (None, None) on error
     """
     try:
-        url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={addon_id}"
-        return get_single_addon(url)
+        if not refresh:
+            cached = metadata_cache.get_cache().get(addon_id, ('title',))
+            if cached:
+                return cached['id'], cached['title']
+        
+        record = _fetch_record(addon_url(addon_id))
+        if not record or not record['id']:
+            return None, None
+        return record['id'], record['title']
     except Exception as e:
         return None, None
     
-def is_addon_map(addon_url):
+def is_addon_map(addon_url, refresh=False):
     """
-    Checks if addon is a map by presence of specific substring in HTML
+    Checks if addon is a map by its workshop tags
+    refresh: ignore metadata cache and download page
     Returns True or False
     """
+    addon_id = extract_id_from_url(addon_url)
+    if addon_id and not refresh:
+        cached = metadata_cache.get_cache().get(addon_id, ('is_map',))
+        if cached:
+            return cached['is_map']
+    
+    record = _fetch_record(addon_url)
+    if not record:
+        return False
+    return record['is_map']
+
+# === ASYNC RESOLVER ===
+
+def _retry_after(response, default):
+    """Returns delay in seconds from Retry-After header of 429 response"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(addon_url, headers=headers)
-        response.raise_for_status()
+        return max(float(response.headers.get('Retry-After', default)), 0)
+    except ValueError:
+        return default
+
+class _HostLimiter:
+    """
+    Limits requests in flight to one host: the limit grows by one after as many successful
+    responses as the limit itself, and is halved on 429 response, when all requests
+    to the host also wait for Retry-After
+    """
+    def __init__(self, limit, max_limit):
+        self.limit = limit
+        self.max_limit = max_limit
+        self.active = 0
+        self._successes = 0
+        self._resume_at = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        while self._resume_at > loop.time():
+            await asyncio.sleep(self._resume_at - loop.time())
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def succeeded(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+
+    def rate_limited(self, delay):
+        self.limit = max(self.limit // 2, 1)
+        self._successes = 0
+        self._resume_at = max(self._resume_at, asyncio.get_running_loop().time() + delay)
+        log.info(tr("Steam rate limit, {} requests in flight, waiting {:.1f} s").format(self.limit, delay))
+
+class WorkshopResolver:
+    """
+    Downloads addon pages with asyncio, keeping up to RESOLVER_MAX_CONCURRENCY requests in flight
+    per host (see _HostLimiter). IDs requested twice share one request, pages downloaded before
+    are revalidated with conditional requests
+    requests has no asyncio API, so its calls run in resolver's own thread pool sized to the
+    concurrency limit: threads only wait for sockets, the limiter decides how many are busy
+    """
+    def __init__(self, concurrency=None, max_concurrency=None):
+        self.max_concurrency = max_concurrency or RESOLVER_MAX_CONCURRENCY
+        self.concurrency = min(concurrency or RESOLVER_CONCURRENCY, self.max_concurrency)
+        self._limiters = {}
+        self._tasks = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+    def close(self):
+        """Stops thread pool, requests still running are finished in background and discarded"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = _HostLimiter(self.concurrency, self.max_concurrency)
+        return limiter
+
+    async def _run(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def _fetch(self, addon_id):
+        url = addon_url(addon_id)
+        limiter = self._limiter(url)
+        session = get_resolver_session()
+        try:
+            headers, stored_record = _conditional_headers(url)
+            for attempt in range(MAX_RETRIES + 1):
+                async with limiter:
+                    response = await self._run(session.get, url, headers=headers, timeout=REQUEST_TIMEOUT)
+                    if response.status_code == 429:
+                        limiter.rate_limited(_retry_after(response, RETRY_BACKOFF * 2 ** attempt))
+                        continue
+                    limiter.succeeded()
+                
+                response.raise_for_status()
+                if response.status_code == 304 and stored_record:
+                    return _store_record(url, stored_record)
+                record = await self._run(parse_page, response.text, addon_id)
+                _remember_validators(url, response, record)
+                return _store_record(url, record)
+            
+            log.warning(tr("Failed to get workshop page {}: {}").format(url, tr("rate limit exceeded")))
+        except Exception as e:
+            log.warning(tr("Failed to get workshop page {}: {}").format(url, e))
+        return None
+
+    def _task(self, addon_id):
+        task = self._tasks.get(addon_id)
+        if task is None:
+            task = self._tasks[addon_id] = asyncio.ensure_future(self._fetch(addon_id))
+        return task
+
+    async def resolve(self, addon_ids, progress=None):
+        """
+        Downloads records of addon_ids concurrently
+        progress: callback(addon_id, record, done, total) called as pages arrive,
+                  returning False cancels remaining requests
+        Returns list of records (None for failed or cancelled) in order of addon_ids
+        """
+        tasks = [self._task(str(addon_id)) for addon_id in addon_ids]
+        pending = {task: str(addon_id) for addon_id, task in zip(addon_ids, tasks)}
+        total = len(pending)
         
-        # Check for substring indicating a map
-        map_indicator = "https://steamcommunity.com/workshop/browse/?appid=220&browsesort=toprated&section=readytouseitems&requiredtags%5B%5D=maps"
-        return map_indicator in response.text
+        while pending:
+            finished, _ = await asyncio.wait(set(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                addon_id = pending.pop(task)
+                if progress and progress(addon_id, task.result(), total - len(pending), total) is False:
+                    for remaining in pending:
+                        remaining.cancel()
+                    pending = {}
+                    break
         
-    except Exception as e:
-        print(f"Error checking if addon is a map: {e}")
-        return False
\ No newline at end of file
+        return [task.result() if task.done() and not task.cancelled() else None for task in tasks]
+
+# === METADATA BACKENDS ===
+
+# Steam Web API host, public workshop files need no API key
+STEAM_API_BASE_URL = "https://api.steampowered.com"
+
+# Published file IDs per Steam Web API request
+API_BATCH_SIZE = 100
+
+# 'api' - batched Steam Web API, IDs it could not resolve are scraped from pages
+# 'html' - one page per ID only
+METADATA_BACKEND = 'api'
+
+APP_ID = 220
+
+# GetCollectionDetails file type of nested collection
+COLLECTION_FILE_TYPE = 2
+
+# Workshop collections are created by this app, not by the game
+COLLECTION_CREATOR_APP_ID = 766
+
+def http_post(url, data, **kwargs):
+    """
+    Performs POST request through shared session
+    Returns response, raises exception on HTTP error
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    response = get_session().post(url, data=data, **kwargs)
+    response.raise_for_status()
+    return response
+
+def _parse_api_details(details):
+    """Converts GetPublishedFileDetails item into metadata record (see parse_page)"""
+    tags = []
+    for tag in details.get('tags') or []:
+        name = str(tag.get('tag', '')).lower()
+        if name and name not in tags:
+            tags.append(name)
+    
+    try:
+        file_size = int(details['file_size'])
+    except (KeyError, TypeError, ValueError):
+        file_size = None
+    
+    return {
+        'id': str(details['publishedfileid']),
+        'title': details.get('title') or tr("Unknown title"),
+        'page_type': 'addon' if details.get('consumer_app_id') == APP_ID else 'unknown',
+        'tags': tags,
+        'is_map': MAP_TAG in tags,
+        'file_size': file_size,
+        'time_updated': details.get('time_updated')
+    }
+
+def _may_be_collection(details):
+    """
+    Tells if GetPublishedFileDetails item can be a collection: collection file type, no game app,
+    created by collections app or without file. Only these items are checked with GetCollectionDetails
+    """
+    if 'file_type' in details:
+        return details['file_type'] == COLLECTION_FILE_TYPE
+    if details.get('consumer_app_id') != APP_ID or details.get('creator_app_id') == COLLECTION_CREATOR_APP_ID:
+        return True
+    try:
+        return int(details['file_size']) == 0
+    except (KeyError, TypeError, ValueError):
+        return True
+
+class HtmlBackend:
+    """Downloads one workshop page per ID through WorkshopResolver"""
+    name = 'html'
+
+    def fetch_records(self, addon_ids, report=None):
+        """
+        report: callback(addon_id, record) for every ID, returning False cancels remaining requests
+        Returns dictionary {id: record} of resolved IDs
+        """
+        def progress(addon_id, record, done, total):
+            return report(addon_id, record) if report else None
+        
+        async def download():
+            resolver = WorkshopResolver()
+            try:
+                return await resolver.resolve(addon_ids, progress)
+            finally:
+                resolver.close()
+        
+        return {addon_id: record for addon_id, record in zip(addon_ids, asyncio.run(download())) if record}
+
+class SteamApiBackend:
+    """
+    Gets records of up to API_BATCH_SIZE IDs per POST to ISteamRemoteStorage/GetPublishedFileDetails,
+    batches are sent in parallel. Items that may be collections (see _may_be_collection) are checked
+    with GetCollectionDetails, collections are left unresolved: their pages also have items
+    """
+    name = 'api'
+
+    def _call(self, method, data):
+        response = http_post(f"{STEAM_API_BASE_URL}/ISteamRemoteStorage/{method}/v1/", data)
+        return response.json()['response']
+
+    def get_collection_children(self, collection_ids):
+        """
+        Returns dictionary {collection id: list of (child id, file type)} in collection order,
+        IDs that are not collections are missing. File type is 0 for addon, 2 for collection
+        """
+        data = {'collectioncount': len(collection_ids)}
+        data.update((f'publishedfileids[{i}]', addon_id) for i, addon_id in enumerate(collection_ids))
+        
+        collections = {}
+        for details in self._call('GetCollectionDetails', data).get('collectiondetails') or []:
+            if details.get('result') != 1 or 'children' not in details:
+                continue
+            children = sorted(details['children'], key=lambda child: child.get('sortorder', 0))
+            collections[str(details['publishedfileid'])] = [(str(child['publishedfileid']), child.get('filetype', 0))
+                                                           for child in children]
+        return collections
+
+    def _fetch_batch(self, addon_ids):
+        data = {'itemcount': len(addon_ids)}
+        data.update((f'publishedfileids[{i}]', addon_id) for i, addon_id in enumerate(addon_ids))
+        items = [details for details in self._call('GetPublishedFileDetails', data).get('publishedfiledetails') or []
+                 if details.get('result') == 1]
+        
+        candidates = [str(details['publishedfileid']) for details in items if _may_be_collection(details)]
+        collections = set()
+        if candidates:
+            try:
+                collections = set(self.get_collection_children(candidates))
+            except Exception as e:
+                # Records of other items are kept, unchecked ones are left to page download
+                log.warning(tr("Steam Web API collection check failed for {} items: {}").format(len(candidates), e))
+                collections = set(candidates)
+        
+        records = {}
+        for details in items:
+            if str(details['publishedfileid']) not in collections:
+                record = _parse_api_details(details)
+                records[record['id']] = _store_record(addon_url(record['id']), record)
+        return records
+
+    def fetch_records(self, addon_ids, report=None):
+        """
+        report: callback(addon_id, record) for resolved IDs, returning False cancels remaining batches
+        Returns dictionary {id: record} of resolved IDs, failed batches are logged and skipped
+        """
+        batches = [addon_ids[i:i + API_BATCH_SIZE] for i in range(0, len(addon_ids), API_BATCH_SIZE)]
+        records = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            future_to_batch = {executor.submit(self._fetch_batch, batch): batch for batch in batches}
+            for future in concurrent.futures.as_completed(future_to_batch):
+                try:
+                    batch_records = future.result()
+                except Exception as e:
+                    log.warning(tr("Steam Web API request failed for {} addons: {}").format(len(future_to_batch[future]), e))
+                    continue
+                
+                for addon_id in future_to_batch[future]:
+                    if addon_id not in batch_records:
+                        continue
+                    records[addon_id] = batch_records[addon_id]
+                    if report and report(addon_id, records[addon_id]) is False:
+                        for pending in future_to_batch:
+                            pending.cancel()
+                        return records
+        return records
+
+BACKENDS = {
+    'api': SteamApiBackend,
+    'html': HtmlBackend
+}
+
+def get_backends():
+    """Returns backends in order they are tried: configured one, then page scraping for the rest"""
+    backends = [BACKENDS.get(METADATA_BACKEND, HtmlBackend)()]
+    if backends[0].name != HtmlBackend.name:
+        backends.append(HtmlBackend())
+    return backends
+
+def resolve_records(addon_ids, refresh=False, fields=('title',), progress=None):
+    """
+    Gets metadata records of many addons: fresh ones from metadata cache, others downloaded
+    by backends (see get_backends). Runs its own event loop, so it is called from worker or GUI thread
+    In offline mode only metadata cache (of any age) is used
+    fields: fields that must be fresh in metadata cache to skip download
+    refresh: ignore metadata cache and download all records
+    progress: callback(addon_id, record, done, total) called in caller thread for downloaded
+              addons only, record is None if all backends failed; returning False cancels download
+    Returns list of records (None for failed) in order of addon_ids
+    """
+    addon_ids = [str(addon_id) for addon_id in addon_ids]
+    if OFFLINE_MODE:
+        records = metadata_cache.get_cache().get_many(addon_ids, ())
+        return [records.get(addon_id) for addon_id in addon_ids]
+    
+    records = {} if refresh else metadata_cache.get_cache().get_many(addon_ids, fields)
+    to_fetch = [addon_id for addon_id in dict.fromkeys(addon_ids) if addon_id not in records]
+    
+    done = 0
+    cancelled = False
+    backends = get_backends()
+    
+    def report(addon_id, record, final):
+        nonlocal done, cancelled
+        # Failures of a backend with fallback are reported by the next one
+        if record is None and not final:
+            return None
+        done += 1
+        if progress and progress(addon_id, record, done, len(to_fetch)) is False:
+            cancelled = True
+            return False
+    
+    for position, backend in enumerate(backends):
+        remaining = [addon_id for addon_id in to_fetch if addon_id not in records]
+        if not remaining or cancelled:
+            break
+        
+        final = position == len(backends) - 1
+        started = time.perf_counter()
+        fetched = backend.fetch_records(remaining, lambda addon_id, record: report(addon_id, record, final))
+        records.update(fetched)
+        log.info(tr("Metadata backend {}: {} of {} addons in {:.1f} s").format(
+            backend.name, len(fetched), len(remaining), time.perf_counter() - started))
+    
+    return [records.get(addon_id) for addon_id in addon_ids]
@@ -0,0 +1,130 @@
+import os
+import threading
+from logger import log
+from i18n import tr
+
+VPK_NAME = "workshop_dir.vpk"
+FOLDER_NAME = "workshop_dir"
+
+class WorkshopIndex:
+    """
+    Snapshot of workshop/content/220 built with os.scandir: for each addon ID, files and folders
+    inside its folder (workshop_dir.vpk, workshop_dir, other archives) with sizes and mtimes
+    File information comes from directory entries, so on Windows no per-file stat is needed
+    refresh() rescans only addon folders whose mtime changed (a file was added, removed or replaced)
+    and folders passed in rescan, e.g. when a file inside was rewritten in place
+    """
+    def __init__(self, workshop_path):
+        self.workshop_path = workshop_path
+        self.root = os.path.normcase(os.path.abspath(workshop_path))
+        self.addons = {}
+        self.rescanned = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _scan_addon(self, path, mtime):
+        files = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files[os.path.normcase(entry.name)] = {
+                        'name': entry.name,
+                        'is_dir': is_dir,
+                        'size': 0 if is_dir else stat.st_size,
+                        'mtime': stat.st_mtime_ns
+                    }
+        except OSError as e:
+            log.warning(tr("Failed to read workshop folder {}: {}").format(path, e))
+        return {'path': path, 'mtime': mtime, 'files': files}
+
+    def refresh(self, rescan=()):
+        """Rescans workshop folder, reusing records of addon folders that did not change and are not in rescan"""
+        with self._lock:
+            addons = {}
+            rescanned = 0
+            try:
+                with os.scandir(self.workshop_path) as entries:
+                    for entry in entries:
+                        if not entry.name.isdigit():
+                            continue
+                        try:
+                            if not entry.is_dir():
+                                continue
+                            mtime = entry.stat().st_mtime_ns
+                        except OSError:
+                            continue
+
+                        record = self.addons.get(entry.name)
+                        if record is None or record['mtime'] != mtime or entry.name in rescan:
+                            record = self._scan_addon(entry.path, mtime)
+                            rescanned += 1
+                        addons[entry.name] = record
+            except OSError:
+                # Missing workshop folder means no addons are installed
+                pass
+
+            self.addons = addons
+            self.rescanned = rescanned
+        return rescanned
+
+    def get_file(self, addon_id, name):
+        """Returns dictionary (name, is_dir, size, mtime) of file in addon folder, None if missing"""
+        record = self.addons.get(str(addon_id))
+        if record is None:
+            return None
+        return record['files'].get(os.path.normcase(name))
+
+    def has_vpk(self, addon_id):
+        info = self.get_file(addon_id, VPK_NAME)
+        return info is not None and not info['is_dir']
+
+    def has_folder(self, addon_id):
+        info = self.get_file(addon_id, FOLDER_NAME)
+        return info is not None and info['is_dir']
+
+    def archives(self, addon_id):
+        """Returns list of file dictionaries of VPK archives in addon folder"""
+        record = self.addons.get(str(addon_id))
+        if record is None:
+            return []
+        return [info for info in record['files'].values() if not info['is_dir'] and info['name'].lower().endswith('.vpk')]
+
+    def extracted_folders(self):
+        """Returns list of (addon ID, path to workshop_dir folder)"""
+        return [(addon_id, os.path.join(record['path'], self.get_file(addon_id, FOLDER_NAME)['name']))
+                for addon_id, record in self.addons.items() if self.has_folder(addon_id)]
+
+    def exists(self, path):
+        """
+        os.path.exists for files directly inside addon folders answered from the index,
+        other paths are checked on disk
+        """
+        normalized = os.path.normcase(os.path.abspath(path))
+        addon_folder, name = os.path.split(normalized)
+        root, addon_id = os.path.split(addon_folder)
+        if root != self.root or not addon_id.isdigit():
+            return os.path.exists(path)
+        return self.get_file(addon_id, name) is not None
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(workshop_path, refresh=True):
+    """
+    Returns shared index of workshop folder, refreshed incrementally if it was built before
+    refresh=False returns index as it is, e.g. right after file watcher refreshed it
+    """
+    key = os.path.normcase(os.path.abspath(workshop_path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = WorkshopIndex(workshop_path)
+            return index
+    if refresh:
+        index.refresh()
+    return index